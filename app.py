@@ -79,6 +79,36 @@ def load_cached_json(filename):
         return []
 
 
+@st.cache_data(ttl=3600)
+def load_compiled_attractions(filename):
+    """
+    Load attractions and resolve derived fields once (must-see flags, etc.)
+    
+    Args:
+        filename: Name of the attractions JSON file
+        
+    Returns:
+        List of compiled POI dicts
+    """
+    from dataset_compiler import compile_attractions
+    return compile_attractions(load_cached_json(filename))
+
+
+@st.cache_data(ttl=3600)
+def load_compiled_restaurants(filename):
+    """
+    Load restaurants and derive typed attributes once (meal flags, reviews, price tier, quality)
+    
+    Args:
+        filename: Name of the restaurants JSON file
+        
+    Returns:
+        List of compiled restaurant dicts
+    """
+    from dataset_compiler import compile_restaurants
+    return compile_restaurants(load_cached_json(filename))
+
+
 def show_my_trips():
     """Display saved trips"""
     trips_dir = "trips"
@@ -293,9 +323,9 @@ def main():
     
     # ✅ OPTIMIZED: Load data using cache
     # This will only load once per hour instead of on every page interaction
-    attractions_data = load_cached_json("andalusia_attractions_filtered.json")
+    attractions_data = load_compiled_attractions("andalusia_attractions_filtered.json")
     hotels_data = load_cached_json("andalusia_hotels_osm.json")
-    restaurants_data = load_cached_json("restaurants_andalusia.json")
+    restaurants_data = load_compiled_restaurants("restaurants_andalusia.json")
     
     # Validate critical data
     if not attractions_data:
@@ -0,0 +1,82 @@
+"""
+Benchmark: event aggregation against the local stub server (no network)
+
+Scenarios:
+- fast sources: all feeds answer, complete result
+- slow Junta feed: deadline hit, partial result returned on time
+- failing Eventbrite: circuit breaker opens, later calls skip it at no cost
+- warm disk cache: a "restarted process" (memory caches cleared) makes no requests
+- offline snapshot: feeds served from a captured snapshot, network never touched
+
+Run from the repository root:
+    python benchmarks/bench_event_aggregator.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from event_aggregator import CircuitBreaker, EventAggregator  # noqa: E402
+import feed_cache  # noqa: E402
+from events_service import clear_event_caches  # noqa: E402
+from events_stub_server import start_stub_server  # noqa: E402
+
+CITIES = ['Granada', 'Sevilla', 'Córdoba', 'Málaga', 'Cádiz', 'Jerez', 'Ronda']
+START, END = '2026-06-15', '2026-06-22'
+TOKEN = 'stub-token'
+
+
+def run(label, server_kwargs, deadline=1.0, calls=1, cold_disk=True):
+    if cold_disk:
+        feed_cache.clear_disk_cache()
+    server, base_url = start_stub_server(**server_kwargs)
+    breakers = {'junta': CircuitBreaker(), 'eventbrite': CircuitBreaker()}
+    try:
+        for call in range(1, calls + 1):
+            clear_event_caches()
+            aggregator = EventAggregator(
+                deadline=deadline, eventbrite_token=TOKEN, breakers=breakers,
+                junta_url=f"{base_url}/junta", eventbrite_url=f"{base_url}/eventbrite",
+            )
+            started = time.perf_counter()
+            result = aggregator.collect(CITIES, START, END)
+            elapsed = time.perf_counter() - started
+
+            skipped = sum(s.skipped for s in result.statuses)
+            timed_out = sum(s.timed_out for s in result.statuses)
+            failed = sum(bool(s.error) and not s.skipped and not s.timed_out for s in result.statuses)
+            print(f"{label:<22} call {call}: {elapsed * 1000:7.1f} ms  events={len(result.events):<3} "
+                  f"partial={result.partial!s:<5} failed={failed} timed_out={timed_out} skipped={skipped} "
+                  f"breaker[eventbrite]={breakers['eventbrite'].state}")
+        print(f"{'':<22} stub requests: {server.hits}")
+    finally:
+        server.shutdown()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        feed_cache.set_cache_dir(cache_dir)
+
+        run('fast sources', {})
+        run('slow junta (3 s)', {'junta_delay': 3.0}, deadline=1.0)
+        run('failing eventbrite', {'eventbrite_fail': True}, calls=3)
+
+        # Fill the disk cache, then "restart" (memory caches are cleared per call)
+        run('warm disk cache', {}, calls=2, cold_disk=False)
+
+        snapshot = os.path.join(cache_dir, 'snapshot.json')
+        print(f"{'':<22} captured {feed_cache.capture_snapshot(snapshot)} feed entries")
+        feed_cache.load_offline_snapshot(snapshot)
+        try:
+            run('offline snapshot', {'junta_fail': True, 'eventbrite_fail': True})
+        finally:
+            feed_cache.disable_offline_snapshot()
+
+
+if __name__ == '__main__':
+    main()
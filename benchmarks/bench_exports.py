@@ -0,0 +1,387 @@
+"""
+Benchmark: export pipeline across trip sizes
+
+Builds synthetic itineraries (3, 7, 14 and 30 days, with and without POI
+photos) from the real attraction, hotel and restaurant data, then times
+each exporter:
+    build_pdf, build_word_doc, build_excel, render_poi_cards,
+    generate_poi_slideshow_from_pois
+
+For every exporter × trip it records wall time (median of --repeat runs),
+peak Python memory (tracemalloc, measured in a separate run because tracing
+slows everything down) and output size. Each run is appended to a local
+JSON history file (not committed: timings only mean something on the machine
+that took them) and compared against the latest entry from the same machine
+(host, Python, platform, CPU count); changes beyond the thresholds are
+flagged (exit code 1 with --fail-on-regression).
+
+"Without photos" trips use the same POIs with their photo identifiers
+(place_id, local_photo_path, photo_references) removed, so nothing resolves
+in the photo manifest. The document model cache is cleared before every
+run, so each export pays its own itinerary resolution. The photo derivative
+cache is used as is (pass --cold-derivatives for an empty one).
+
+Run from the repository root:
+    python benchmarks/bench_exports.py
+    python benchmarks/bench_exports.py --sizes 3 7 --skip slideshow --repeat 3
+    python benchmarks/bench_exports.py --report-only
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from text_norm import CITY_ALIASES, norm_key  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, 'data')
+HISTORY_PATH = os.path.join(ROOT, 'benchmarks', 'export_bench_history.json')
+
+SIZES = (3, 7, 14, 30)
+EXPORTERS = ('pdf', 'docx', 'xlsx', 'cards', 'slideshow')
+
+# Trip route (cycled for long trips) and nights per city
+ROUTE = ('Málaga', 'Granada', 'Córdoba', 'Seville', 'Cádiz', 'Jerez de la Frontera', 'Ronda', 'Marbella')
+NIGHTS_PER_CITY = 3
+POIS_PER_DAY = 5
+START_DATE = date(2026, 6, 15)
+
+PHOTO_KEYS = ('place_id', 'local_photo_path', 'photo_references')
+
+# Relative change vs. the previous run that counts as a regression
+THRESHOLDS = {'seconds': 0.20, 'peak_mb': 0.20, 'bytes': 0.10}
+
+
+# ============================================================================
+# SYNTHETIC TRIPS
+# ============================================================================
+
+def city_key(city):
+    key = norm_key(city)
+    return norm_key(CITY_ALIASES.get(key, city))
+
+
+def load_dataset():
+    """{city_key: [records]} for attractions (best rated first), hotels and restaurants"""
+    dataset = {}
+    for name, filename in (('attractions', 'andalusia_attractions_filtered.json'),
+                           ('hotels', 'andalusia_hotels_osm.json'),
+                           ('restaurants', 'restaurants_andalusia.json')):
+        with open(os.path.join(DATA_DIR, filename), 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        by_city = {}
+        for record in records:
+            if record.get('city') and record.get('name'):
+                by_city.setdefault(city_key(record['city']), []).append(record)
+        for items in by_city.values():
+            items.sort(key=lambda r: (-(r.get('rating') or 0), r['name']))
+        dataset[name] = by_city
+    return dataset
+
+
+def make_itinerary(dataset, days, with_photos=True):
+    """Deterministic itinerary of `days` days along ROUTE"""
+    itinerary = []
+    used = {}
+    for index in range(days):
+        city = ROUTE[(index // NIGHTS_PER_CITY) % len(ROUTE)]
+        key = city_key(city)
+        day_in_city = index % NIGHTS_PER_CITY + 1
+        total_in_city = min(NIGHTS_PER_CITY, days - (index - day_in_city + 1))
+
+        pool = dataset['attractions'].get(key, [])
+        start = used.get(key, 0)
+        pois = [dict(pool[(start + i) % len(pool)]) for i in range(min(POIS_PER_DAY, len(pool)))]
+        used[key] = start + len(pois)
+        if not with_photos:
+            for poi in pois:
+                for photo_key in PHOTO_KEYS:
+                    poi.pop(photo_key, None)
+
+        restaurants = dataset['restaurants'].get(key, [])
+        lunch = restaurants[(2 * index) % len(restaurants)] if restaurants else None
+        dinner = restaurants[(2 * index + 1) % len(restaurants)] if len(restaurants) > 1 else None
+
+        itinerary.append({
+            'day': index + 1,
+            'city': city,
+            'overnight_city': city,
+            'day_in_city': day_in_city,
+            'total_days_in_city': total_in_city,
+            'driving_km': 130 if day_in_city == 1 and index else 0,
+            'driving_hours': 1.6 if day_in_city == 1 and index else 0,
+            'cities': [{'city': city, 'attractions': pois}],
+            'hotels': [dict(h) for h in dataset['hotels'].get(key, [])[:3]],
+            'lunch_restaurant': dict(lunch) if lunch else None,
+            'dinner_restaurant': dict(dinner) if dinner else None,
+        })
+    return itinerary
+
+
+def export_args(itinerary):
+    ordered_cities = list(dict.fromkeys(day['city'] for day in itinerary))
+    result = {'itinerary': itinerary, 'start_date': START_DATE, 'events': []}
+    return dict(
+        itinerary=itinerary,
+        hop_kms=[130] * (len(ordered_cities) - 1),
+        maps_link='',
+        ordered_cities=ordered_cities,
+        days=len(itinerary),
+        prefs={'budget': 'mid', 'pace': 'medium'},
+        parsed_requests={},
+        is_car_mode=True,
+        result=result,
+    )
+
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+
+def run_exporter(name, args, workdir):
+    """Run one exporter; returns output size in bytes"""
+    if name == 'pdf':
+        from pdf_generator import build_pdf
+        return len(build_pdf(**args).getvalue())
+
+    if name == 'docx':
+        from document_generator import build_word_doc
+        return len(build_word_doc(**args).getvalue())
+
+    if name == 'xlsx':
+        from excel_generator import build_excel
+        return len(build_excel(
+            args['itinerary'], args['hop_kms'], args['maps_link'], args['ordered_cities'],
+            args['days'], args['prefs'], args['is_car_mode'], result=args['result'],
+        ).getvalue())
+
+    pois = [poi for day in args['itinerary'] for stop in day['cities'] for poi in stop['attractions']]
+
+    if name == 'cards':
+        from fpdf import FPDF
+        from pdf_generator import safe_text
+        from photo_manifest import get_photo_path
+        from poi_cards_pdf import render_poi_cards
+        pdf = FPDF()
+        pdf.add_page()
+        render_poi_cards(pdf=pdf, pois=pois, get_photo_path=get_photo_path, safe_text=safe_text,
+                         cards_per_page=4, max_cards=len(pois))
+        return len(bytes(pdf.output()))
+
+    if name == 'slideshow':
+        from poi_video_generator import generate_poi_slideshow_from_pois
+        output_file = os.path.join(workdir, 'bench_slideshow.mp4')
+        video_path = generate_poi_slideshow_from_pois(pois, output_file)
+        size = os.path.getsize(video_path) if video_path and os.path.exists(video_path) else 0
+        if video_path and os.path.exists(video_path):
+            os.remove(video_path)
+        return size
+
+    raise ValueError(f"Unknown exporter: {name}")
+
+
+def measure(name, args, repeat, workdir):
+    """{'seconds', 'peak_mb', 'bytes'} for one exporter on one trip"""
+    from document_model import clear_document_models
+
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        clear_document_models()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            size = run_exporter(name, args, workdir)
+            timings.append(time.perf_counter() - started)
+
+    clear_document_models()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_exporter(name, args, workdir)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': round(statistics.median(timings), 4), 'peak_mb': round(peak / 1e6, 2), 'bytes': size}
+
+
+# ============================================================================
+# HISTORY + REPORT
+# ============================================================================
+
+def load_history(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('runs', [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_history(path, runs):
+    # One run per line keeps the history diffable
+    lines = ',\n'.join(json.dumps(run, ensure_ascii=False, sort_keys=True) for run in runs)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"runs": [\n' + lines + '\n]}\n')
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def case_name(exporter, days, with_photos):
+    return f"{exporter}/{days}d/{'photos' if with_photos else 'no-photos'}"
+
+
+def compare(current, previous, thresholds=THRESHOLDS):
+    """Report lines and the list of regressed (case, metric) pairs"""
+    header = (f"{'case':<28} {'time':>9} {'Δ':>7}  {'peak MB':>8} {'Δ':>7}  {'size':>11} {'Δ':>7}")
+    lines = [header, '-' * len(header)]
+    regressions = []
+    previous_results = previous['results'] if previous else {}
+
+    def delta(metric, value, before):
+        if not before:
+            return '', False
+        change = (value - before) / before
+        return f"{change:+.0%}", change > thresholds[metric]
+
+    for case, metrics in current['results'].items():
+        before = previous_results.get(case, {})
+        cells = []
+        flagged = []
+        for metric in ('seconds', 'peak_mb', 'bytes'):
+            text, regressed = delta(metric, metrics[metric], before.get(metric))
+            cells.append(text + (' !' if regressed else ''))
+            if regressed:
+                flagged.append(metric)
+        regressions.extend((case, metric) for metric in flagged)
+        lines.append(
+            f"{case:<28} {metrics['seconds']:8.2f}s {cells[0]:>7}  {metrics['peak_mb']:8.1f} {cells[1]:>7}  "
+            f"{metrics['bytes']:>11,} {cells[2]:>7}"
+        )
+    return lines, regressions
+
+
+def machine_info():
+    """Fields that must match for two runs to be comparable"""
+    return {
+        'node': platform.node(),
+        'python': platform.python_version(),
+        'platform': platform.platform(terse=True),
+        'cpus': os.cpu_count(),
+    }
+
+
+def previous_run(runs, current):
+    """Latest run before current taken on the same machine, or None"""
+    for run in reversed(runs):
+        if run is not current and run.get('machine') == current['machine']:
+            return run
+    return None
+
+
+def describe_run(run):
+    return f"{run['timestamp']} @ {run.get('revision') or '?'} ({run['machine']['cpus']} CPUs)"
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the export pipeline across trip sizes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help="Trip lengths in days")
+    parser.add_argument('--skip', nargs='*', default=[], choices=EXPORTERS, help="Exporters to skip")
+    parser.add_argument('--no-photos-only', action='store_true', help="Only the trips without photos")
+    parser.add_argument('--photos-only', action='store_true', help="Only the trips with photos")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per case (median is kept)")
+    parser.add_argument('--cold-derivatives', action='store_true', help="Use an empty photo derivative cache")
+    parser.add_argument('--history', default=HISTORY_PATH, help="JSON history file")
+    parser.add_argument('--no-save', action='store_true', help="Do not append this run to the history")
+    parser.add_argument('--report-only', action='store_true',
+                        help="Compare the last saved run with the one before it from the same machine")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit 1 if a threshold is exceeded")
+    args = parser.parse_args()
+
+    runs = load_history(args.history)
+    if args.report_only:
+        if not runs:
+            print(f"No runs in {args.history}")
+            return 0
+        current = runs[-1]
+        previous = previous_run(runs[:-1], current)
+    else:
+        photo_modes = [True, False]
+        if args.photos_only:
+            photo_modes = [True]
+        elif args.no_photos_only:
+            photo_modes = [False]
+        exporters = [name for name in EXPORTERS if name not in args.skip]
+
+        workdir = tempfile.mkdtemp(prefix='bench_exports_')
+        if args.cold_derivatives:
+            from photo_derivatives import set_cache_dir
+            set_cache_dir(os.path.join(workdir, 'derivatives'))
+
+        dataset = load_dataset()
+
+        # Untimed warm-up so the first case does not pay for imports (pandas, fpdf, docx)
+        warmup = export_args(make_itinerary(dataset, 1))
+        for exporter in exporters:
+            if exporter != 'slideshow':
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run_exporter(exporter, warmup, workdir)
+
+        results = {}
+        for days in args.sizes:
+            for with_photos in photo_modes:
+                trip = export_args(make_itinerary(dataset, days, with_photos))
+                for exporter in exporters:
+                    case = case_name(exporter, days, with_photos)
+                    results[case] = measure(exporter, trip, max(1, args.repeat), workdir)
+                    m = results[case]
+                    print(f"  {case:<28} {m['seconds']:7.2f}s {m['peak_mb']:8.1f} MB {m['bytes']:>11,} bytes",
+                          file=sys.stderr)
+
+        current = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'machine': machine_info(),
+            'options': {'repeat': args.repeat, 'cold_derivatives': args.cold_derivatives},
+            'results': results,
+        }
+        previous = previous_run(runs, current)
+        if not args.no_save:
+            save_history(args.history, runs + [current])
+
+    print(f"\nCurrent:  {describe_run(current)}")
+    print(f"Previous: {describe_run(previous) if previous else '(none from this machine)'}\n")
+    lines, regressions = compare(current, previous)
+    print('\n'.join(lines))
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} regression(s) above thresholds "
+              f"(time {THRESHOLDS['seconds']:.0%}, memory {THRESHOLDS['peak_mb']:.0%}, size {THRESHOLDS['bytes']:.0%}):")
+        for case, metric in regressions:
+            print(f"   {case}: {metric}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
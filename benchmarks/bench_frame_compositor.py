@@ -0,0 +1,99 @@
+"""
+Benchmark: slideshow frame compositing at 720p and 1080p
+
+Frames per second (no encoding) for:
+- crossfade, previous code: cv2.addWeighted allocating a new frame each time
+- crossfade, FrameCompositor.blend into the preallocated output buffer
+- Ken Burns hold frame: one affine warp from the pre-upscaled photo + title overlay
+- Ken Burns crossfade: two warps + blend
+
+Each row also shows the memory newly allocated per frame (tracemalloc sees
+NumPy buffers), which is ~0 for the compositor paths.
+
+Run from the repository root:
+    python benchmarks/bench_frame_compositor.py
+    python benchmarks/bench_frame_compositor.py --frames 400
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+from frame_compositor import FrameCompositor, Slide  # noqa: E402
+from photo_derivatives import open_derivative, video_frame_spec  # noqa: E402
+from photo_manifest import get_manifest  # noqa: E402
+from poi_video_generator import SlideshowConfig, add_text_overlay  # noqa: E402
+
+SIZES = {'720p': (1280, 720), '1080p': (1920, 1080)}
+
+
+def make_slides(width, height, zoom):
+    """Two static and two moving slides from the first photos of the manifest"""
+    from PIL import Image
+
+    config = SlideshowConfig(width=width, height=height)
+    paths = [info.path for info in list(get_manifest().by_filename.values())[:2]]
+    static, moving = [], []
+    for index, path in enumerate(paths):
+        photo = open_derivative(path, video_frame_spec(width, height))
+        static.append(Slide(frame=np.asarray(add_text_overlay(photo, 'Seville', 'Real Alcázar', config))))
+
+        source = open_derivative(path, video_frame_spec(round(width * zoom), round(height * zoom)))
+        layer = add_text_overlay(Image.new('RGBA', (width, height), (0, 0, 0, 0)), 'Seville', 'Real Alcázar', config)
+        moving.append(Slide.ken_burns(np.asarray(source), np.asarray(layer), index, zoom))
+    return static, moving
+
+
+def run(name, frames, step):
+    """(frames per second, bytes allocated per frame)"""
+    step(0)     # Warm-up
+    started = time.perf_counter()
+    for i in range(frames):
+        step(i)
+    fps = frames / (time.perf_counter() - started)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sampled = min(frames, 50)
+    allocated = 0
+    for i in range(sampled):
+        tracemalloc.reset_peak()
+        step(i)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return fps, allocated / sampled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark slideshow frame compositing")
+    parser.add_argument('--frames', type=int, default=200, help="Frames per measurement")
+    parser.add_argument('--zoom', type=float, default=SlideshowConfig.ken_burns_zoom, help="Ken Burns zoom")
+    args = parser.parse_args()
+
+    print(f"{'size':<6} {'case':<34} {'fps':>8} {'alloc/frame':>12}")
+    for label, (width, height) in SIZES.items():
+        (a, b), (ma, mb) = make_slides(width, height, args.zoom)
+        compositor = FrameCompositor(width, height)
+        n = args.frames
+
+        cases = {
+            'crossfade, addWeighted (previous)': lambda i: cv2.addWeighted(a.frame, 1 - i / n, b.frame, i / n, 0),
+            'crossfade, compositor buffer': lambda i: compositor.blend(a.frame, b.frame, i / n),
+            'Ken Burns hold (warp + overlay)': lambda i: compositor.render(ma, i / n),
+            'Ken Burns crossfade (2 warps)': lambda i: compositor.crossfade(ma, i / n, mb, i / n, i / n),
+        }
+        for case, step in cases.items():
+            fps, allocated = run(case, n, step)
+            print(f"{label:<6} {case:<34} {fps:8.1f} {allocated / 1e6:10.2f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: photo decode + resize, full decode vs JPEG draft (DCT-scaled) decode
+
+For every photo in data/photos and each exporter target, times
+open → decode → LANCZOS resize, and records the largest decoded pixel
+buffer. Each mode also runs in its own subprocess to report peak RSS.
+
+Draft decoding only engages when the target is at most half the source in
+both dimensions (JPEG DCT scaling is 1/2, 1/4 or 1/8). The current photo
+set is ~800 px wide, so the Word/PDF/card targets decode at full size
+either way; the thumbnail target shows the effect.
+
+Run from the repository root:
+    python benchmarks/bench_photo_decode.py
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from photo_derivatives import (  # noqa: E402
+    DOCX_PHOTO, PDF_PHOTO, VIDEO_FRAME, DerivativeSpec, open_for_spec, render_derivative,
+)
+from photo_manifest import get_manifest  # noqa: E402
+from poi_cards_pdf import card_photo_spec  # noqa: E402
+
+TARGETS = {
+    'docx': DOCX_PHOTO,
+    'pdf': PDF_PHOTO,
+    'card': card_photo_spec(),
+    'video': VIDEO_FRAME,
+    'thumb': DerivativeSpec('thumb', 240, 160),
+}
+
+
+def open_full(path, spec):
+    """Previous behaviour: decode every pixel, then resample"""
+    from PIL import Image
+    return Image.open(path)
+
+
+def run_mode(mode):
+    """{target: (seconds, largest decoded buffer bytes, draft-decoded photos)} for one mode"""
+    opener = open_for_spec if mode == 'draft' else open_full
+    photos = list(get_manifest().by_filename.values())
+
+    results = {}
+    for name, spec in TARGETS.items():
+        largest = 0
+        reduced = 0
+        started = time.perf_counter()
+        for info in photos:
+            with opener(info.path, spec) as img:
+                img.load()
+                largest = max(largest, img.width * img.height * len(img.getbands()))
+                reduced += img.width < info.width
+                render_derivative(img, spec)
+        results[name] = (time.perf_counter() - started, largest, reduced)
+    return results
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--mode':
+        # Child process: one mode, report results and peak RSS as JSON
+        results = run_mode(sys.argv[2])
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(json.dumps({'results': results, 'peak_rss_kb': peak_kb}))
+        return
+
+    manifest = get_manifest()
+    total_mb = sum(info.size for info in manifest.by_filename.values()) / 1e6
+    print(f"{len(manifest)} photos ({total_mb:.1f} MB)\n")
+
+    runs = {}
+    for mode in ('full', 'draft'):
+        out = subprocess.run([sys.executable, __file__, '--mode', mode], capture_output=True, text=True, check=True)
+        runs[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"{'target':<7} {'size':>10}  {'full':>9} {'draft':>9} {'speedup':>8}  "
+          f"{'max buffer full':>16} {'draft':>9}  {'reduced':>8}")
+    for name, spec in TARGETS.items():
+        full_s, full_buf, _ = runs['full']['results'][name]
+        draft_s, draft_buf, reduced = runs['draft']['results'][name]
+        size = f"{spec.width}x{spec.height or '-'}"
+        print(f"{name:<7} {size:>10}  {full_s:8.2f}s {draft_s:8.2f}s {full_s / draft_s:7.2f}x  "
+              f"{full_buf / 1e6:14.1f}MB {draft_buf / 1e6:7.1f}MB  {reduced:>8}")
+
+    print(f"\npeak RSS: full {runs['full']['peak_rss_kb'] / 1024:.0f} MB, "
+          f"draft {runs['draft']['peak_rss_kb'] / 1024:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: special-request parsing over the notes corpus
+
+Times a cold parse (cache cleared before every pass) against memoized
+lookups, and prints the constraints extracted from each note.
+
+Run from the repository root:
+    python benchmarks/bench_special_requests.py
+"""
+
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from special_requests import parse_special_requests, clear_parse_cache  # noqa: E402
+
+CORPUS_PATH = os.path.join(ROOT, 'benchmarks', 'special_requests_corpus.txt')
+ATTRACTIONS_PATH = os.path.join(ROOT, 'data', 'andalusia_attractions_filtered.json')
+REPEATS = 200
+
+
+def load_corpus():
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def load_known_cities():
+    with open(ATTRACTIONS_PATH, 'r', encoding='utf-8') as f:
+        return sorted({a.get('city') for a in json.load(f) if a.get('city')})
+
+
+def time_passes(notes_list, known_cities, cold):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        if cold:
+            clear_parse_cache()
+        for notes in notes_list:
+            parse_special_requests(notes, known_cities)
+    return (time.perf_counter() - start) / (REPEATS * len(notes_list))
+
+
+def main():
+    notes_list = load_corpus()
+    known_cities = load_known_cities()
+
+    for notes in notes_list:
+        c = parse_special_requests(notes, known_cities)
+        print(f"{notes!r}\n    avoid={list(c.avoid_cities)} must_see={list(c.must_see_cities)} "
+              f"stay={c.durations()}")
+
+    cold = time_passes(notes_list, known_cities, cold=True)
+    warm = time_passes(notes_list, known_cities, cold=False)
+    print(f"\n{len(notes_list)} notes, {len(known_cities)} known cities, {REPEATS} passes")
+    print(f"  cold parse:     {cold * 1e6:8.1f} µs/note")
+    print(f"  memoized parse: {warm * 1e6:8.1f} µs/note")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Local stub for the event APIs - replays recorded responses
+
+Serves benchmarks/recorded_events/*.json for the Junta de Andalucía and
+Eventbrite endpoints, with optional latency and failure injection, so the
+event aggregator can be exercised with no network.
+
+Run standalone:
+    python benchmarks/events_stub_server.py --port 8765 --junta-delay 0.2 --eventbrite-fail
+
+Or from Python:
+    from events_stub_server import start_stub_server
+    server, base_url = start_stub_server(junta_delay=6.0)
+    EventAggregator(junta_url=f"{base_url}/junta", eventbrite_url=f"{base_url}/eventbrite", ...)
+    server.shutdown()
+"""
+
+import argparse
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recorded_events')
+
+# Path prefix → recorded response file
+ROUTES = {
+    '/junta': 'junta_datastore_search.json',
+    '/eventbrite': 'eventbrite_events_search.json',
+}
+
+
+def load_recordings(recordings_dir=RECORDINGS_DIR):
+    """{path prefix: response bytes}"""
+    recordings = {}
+    for prefix, filename in ROUTES.items():
+        with open(os.path.join(recordings_dir, filename), 'rb') as f:
+            recordings[prefix] = f.read()
+    return recordings
+
+
+def make_handler(recordings, delays, failing):
+    """Request handler class bound to recordings, per-route delays and failing routes"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = urlparse(self.path).path
+            prefix = next((p for p in recordings if path.startswith(p)), None)
+            if prefix is None:
+                self.send_error(404)
+                return
+
+            self.server.hits[prefix] = self.server.hits.get(prefix, 0) + 1
+            time.sleep(delays.get(prefix, 0))
+            if prefix in failing:
+                self.send_error(503, 'stub: injected failure')
+                return
+
+            body = recordings[prefix]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep benchmark output clean
+
+    return StubHandler
+
+
+def start_stub_server(port=0, junta_delay=0.0, eventbrite_delay=0.0,
+                      junta_fail=False, eventbrite_fail=False, recordings_dir=RECORDINGS_DIR):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        port: TCP port (0 = pick a free one)
+        junta_delay / eventbrite_delay: Seconds to wait before answering
+        junta_fail / eventbrite_fail: Answer 503 instead of the recording
+
+    Returns:
+        (server, base_url): call server.shutdown() when done; server.hits counts requests
+    """
+    delays = {'/junta': junta_delay, '/eventbrite': eventbrite_delay}
+    failing = {p for p, fail in (('/junta', junta_fail), ('/eventbrite', eventbrite_fail)) if fail}
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(load_recordings(recordings_dir), delays, failing))
+    server.daemon_threads = True
+    server.hits = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--junta-delay', type=float, default=0.0)
+    parser.add_argument('--eventbrite-delay', type=float, default=0.0)
+    parser.add_argument('--junta-fail', action='store_true')
+    parser.add_argument('--eventbrite-fail', action='store_true')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(
+        args.port, args.junta_delay, args.eventbrite_delay, args.junta_fail, args.eventbrite_fail
+    )
+    print(f"Serving recorded event feeds at {base_url}/junta and {base_url}/eventbrite (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,14 @@ Maps database POI categories (from JSON) to app UI categories (from multiselect)
 
 This ensures that when users select "history" in preferences, they get POIs
 that are categorized as "Historic Site", "Monument", etc. in the database.
+
+App categories form a fixed vocabulary with integer codes (APP_CATEGORIES), so
+preference filtering and per-day diversity caps run on integer arrays and
+bitmasks instead of repeated string comparisons.
 """
 
+import numpy as np
+
 # Database → App UI category mapping
 CATEGORY_MAPPING = {
     # History-related
@@ -75,6 +81,54 @@ for db_cat, app_cat in CATEGORY_MAPPING.items():
     APP_TO_DATABASE[app_cat].append(db_cat)
 
 
+# ============================================================================
+# CATEGORY VOCABULARY (integer codes + bitmasks)
+# ============================================================================
+
+# Fixed app category vocabulary. A category's position is its integer code and
+# its bit in a preference mask is (1 << code).
+# ⚠️ Append new categories at the END so existing codes stay stable, then map
+# database categories onto them in CATEGORY_MAPPING above.
+# Database categories missing from CATEGORY_MAPPING get UNMAPPED_CATEGORY_CODE,
+# which has no bit, so (as before) they never match a preference filter.
+APP_CATEGORIES = (
+    "other",
+    "history",
+    "architecture",
+    "palaces",
+    "castles",
+    "museums",
+    "art",
+    "religious",
+    "nature",
+    "parks",
+    "gardens",
+    "beaches",
+    "viewpoints",
+    "neighborhoods",
+    "markets",
+    "entertainment",
+    "activities",
+    "food & tapas",
+    "wine & bodegas",
+    "music & flamenco",
+)
+
+CATEGORY_CODES = {app_cat: code for code, app_cat in enumerate(APP_CATEGORIES)}
+UNMAPPED_CATEGORY_CODE = len(APP_CATEGORIES)
+
+# Bit for each code, indexable by an array of codes (the unmapped code has none)
+CATEGORY_BITS = np.append(
+    np.left_shift(np.int64(1), np.arange(len(APP_CATEGORIES), dtype=np.int64)), np.int64(0)
+)
+
+# Lowercase database category → app category (replaces per-lookup lowercase scans)
+_DB_CATEGORY_BY_LOWER = {db_cat.lower(): app_cat for db_cat, app_cat in CATEGORY_MAPPING.items()}
+
+# Lowercase database category → integer code
+_CODE_BY_KEY = {db_lower: CATEGORY_CODES[app_cat] for db_lower, app_cat in _DB_CATEGORY_BY_LOWER.items()}
+
+
 def normalize_poi_category(db_category):
     """
     Convert database category to app UI category.
@@ -93,14 +147,103 @@ def normalize_poi_category(db_category):
         return CATEGORY_MAPPING[db_category]
     
     # Try case-insensitive match
-    for db_cat, app_cat in CATEGORY_MAPPING.items():
-        if db_cat.lower() == db_category.lower():
-            return app_cat
+    app_cat = _DB_CATEGORY_BY_LOWER.get(db_category.lower())
+    if app_cat:
+        return app_cat
     
     # Unknown category - return as-is but lowercase
     return db_category.lower()
 
 
+def category_code(db_category):
+    """
+    Convert a database category to its integer code (case-insensitive).
+    
+    Args:
+        db_category: Category from JSON database (e.g. "Historic Site")
+    
+    Returns:
+        int: Code in APP_CATEGORIES, or UNMAPPED_CATEGORY_CODE for empty or
+             unmapped categories
+    """
+    if not db_category:
+        return UNMAPPED_CATEGORY_CODE
+    return _CODE_BY_KEY.get(str(db_category).lower(), UNMAPPED_CATEGORY_CODE)
+
+
+def category_codes(pois):
+    """
+    Integer category codes for a list of POIs.
+    
+    Args:
+        pois: List of POI dicts with 'category' field
+    
+    Returns:
+        np.ndarray: int64 array of codes, aligned with pois
+    """
+    return np.fromiter(
+        (category_code(poi.get('category')) for poi in pois),
+        dtype=np.int64,
+        count=len(pois)
+    )
+
+
+def raw_category_codes(pois):
+    """
+    Integer codes for the POIs' raw database categories (one code per distinct
+    string, assigned in order of first appearance).
+
+    Unlike category_codes(), "Historic Site" and "Monument" get different codes,
+    so per-day diversity caps keep the granularity of the database categories.
+
+    Args:
+        pois: List of POI dicts with 'category' field
+
+    Returns:
+        tuple: (np.ndarray int64 codes aligned with pois, number of distinct codes)
+    """
+    vocabulary = {}
+    codes = np.fromiter(
+        (vocabulary.setdefault(poi.get('category', 'Other'), len(vocabulary)) for poi in pois),
+        dtype=np.int64,
+        count=len(pois)
+    )
+    return codes, len(vocabulary)
+
+
+def categories_to_mask(app_categories):
+    """
+    Convert app UI categories to a bitmask (computed once per preference set).
+    
+    Args:
+        app_categories: List of app UI categories (e.g. ["history", "museums"])
+    
+    Returns:
+        int: Bitmask with one bit per selected category (unknown names ignored)
+    """
+    mask = 0
+    for app_cat in app_categories or []:
+        code = CATEGORY_CODES.get(str(app_cat).strip().lower())
+        if code is not None:
+            mask |= 1 << code
+    return mask
+
+
+def category_filter_mask(pois, preferred_app_categories):
+    """
+    Boolean array telling which POIs match the preferred app categories.
+    
+    Args:
+        pois: List of POI dicts with 'category' field
+        preferred_app_categories: List of app UI categories
+    
+    Returns:
+        np.ndarray: bool array aligned with pois
+    """
+    mask = categories_to_mask(preferred_app_categories)
+    return (CATEGORY_BITS[category_codes(pois)] & mask) != 0
+
+
 def get_database_categories_for_filter(app_categories):
     """
     Convert app UI category filters to database category filters.
@@ -135,18 +278,8 @@ def apply_category_filter(attractions, preferred_app_categories):
     if not preferred_app_categories:
         return attractions  # No filter
     
-    # Get corresponding database categories
-    db_categories = get_database_categories_for_filter(preferred_app_categories)
-    db_categories_lower = [cat.lower() for cat in db_categories]
-    
-    # Filter attractions
-    filtered = []
-    for attraction in attractions:
-        db_cat = attraction.get('category', '')
-        if db_cat.lower() in db_categories_lower:
-            filtered.append(attraction)
-    
-    return filtered
+    keep = category_filter_mask(attractions, preferred_app_categories)
+    return [attraction for attraction, ok in zip(attractions, keep) if ok]
 
 
 # For debugging: show the mapping
@@ -176,3 +309,4 @@ if __name__ == "__main__":
     app_prefs = ["history", "nature", "museums"]
     print(f"\nUser selects: {app_prefs}")
     print(f"Database categories to query: {get_database_categories_for_filter(app_prefs)}")
+    print(f"Preference bitmask: {categories_to_mask(app_prefs):#b}")
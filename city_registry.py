@@ -0,0 +1,269 @@
+# coding: utf-8
+"""
+City Registry - prebuilt lookup structure for city names
+
+Built once per set of known city labels and shared by the planner form,
+the validation system and the star/hub base parser:
+- exact map (case/accent/space insensitive, plus CITY_ALIASES)
+- prefix trie (gentle typo fallback + autocomplete)
+- BK-tree (edit distance) and trigram index for ranked "did you mean" suggestions
+
+Usage:
+    from city_registry import get_city_registry
+    registry = get_city_registry(known_cities)
+    registry.canonicalize("malaga")      # → "Málaga"
+    registry.complete("gra")             # → ["Granada", "Grazalema", ...]
+    registry.suggest("Sevile")           # → ["Seville", ...]
+"""
+
+from text_norm import norm_key, CITY_ALIASES
+
+# Max number of registries kept (one per distinct set of known city labels)
+REGISTRY_CACHE_SIZE = 8
+
+_REGISTRY_CACHE = {}
+
+
+# ============================================================================
+# STRING DISTANCE HELPERS
+# ============================================================================
+
+def levenshtein(a, b):
+    """Edit distance between two strings (insert/delete/substitute = 1)"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,                # deletion
+                current[j - 1] + 1,             # insertion
+                previous[j - 1] + (ca != cb),   # substitution
+            ))
+        previous = current
+    return previous[-1]
+
+
+def trigrams(key):
+    """Set of character trigrams of a normalized key (padded with spaces)"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _BKTree:
+    """Burkhard-Keller tree over normalized keys for edit-distance search"""
+
+    def __init__(self, keys):
+        self.root = None
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        if self.root is None:
+            self.root = (key, {})
+            return
+        node = self.root
+        while True:
+            distance = levenshtein(key, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (key, {})
+                return
+            node = child
+
+    def search(self, key, max_distance):
+        """Return [(distance, key)] for keys within max_distance"""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_key, children = stack.pop()
+            distance = levenshtein(key, node_key)
+            if distance <= max_distance:
+                found.append((distance, node_key))
+            # Triangle inequality: only children in [d - max, d + max] can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class CityRegistry:
+    """Lookup structure over a fixed set of dataset city labels"""
+
+    def __init__(self, known_city_labels, aliases=None):
+        aliases = CITY_ALIASES if aliases is None else aliases
+
+        # 1) Exact map: normalized key → label (first label wins, sorted for determinism)
+        self.labels = sorted({label for label in known_city_labels if label})
+        self.exact = {}
+        for label in self.labels:
+            self.exact.setdefault(norm_key(label), label)
+
+        # Aliases resolved up front (alias key → label), only if the target exists
+        self.aliases = {}
+        for alias, target in aliases.items():
+            label = self.exact.get(norm_key(target))
+            if label:
+                self.aliases[norm_key(alias)] = label
+
+        # 2) Prefix trie: each node holds its children and the labels below it,
+        #    best first (shortest name, then alphabetical)
+        ranked = sorted(self.exact.items(), key=lambda kv: (len(kv[0]), kv[0]))
+        self._trie = {'children': {}, 'labels': [label for _, label in ranked]}
+        for key, label in ranked:
+            node = self._trie
+            for ch in key:
+                node = node['children'].setdefault(ch, {'children': {}, 'labels': []})
+                node['labels'].append(label)
+
+        # 3) Fuzzy structures
+        self._bktree = _BKTree(self.exact.keys())
+        self._trigram_index = {}
+        for key in self.exact:
+            for gram in trigrams(key):
+                self._trigram_index.setdefault(gram, set()).add(key)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _prefix_node(self, key):
+        node = self._trie
+        for ch in key:
+            node = node['children'].get(ch)
+            if node is None:
+                return None
+        return node
+
+    def lookup(self, user_city):
+        """
+        Strict lookup: alias → exact (case/accent/space insensitive), no prefix fallback.
+
+        Use for city names extracted from free text, where a prefix match
+        would turn ordinary words into cities.
+
+        Returns:
+            Canonical city label or None if not found
+        """
+        if not user_city:
+            return None
+        key = norm_key(user_city)
+        return self.aliases.get(key) or self.exact.get(key)
+
+    def canonicalize(self, user_city):
+        """
+        Convert user input to canonical city name from dataset.
+
+        Order: alias → exact (case/accent/space insensitive) → prefix match
+
+        Returns:
+            Canonical city label or None if not found
+        """
+        if not user_city:
+            return None
+
+        key = norm_key(user_city)
+        if not key:
+            return None
+
+        label = self.lookup(key)
+        if label:
+            return label
+
+        node = self._prefix_node(key)
+        if node and node['labels']:
+            return node['labels'][0]
+
+        return None
+
+    def complete(self, prefix, limit=10):
+        """
+        Autocomplete: dataset labels starting with prefix (best first).
+
+        Args:
+            prefix: Partial user input
+            limit: Max number of labels
+
+        Returns:
+            list: Matching city labels
+        """
+        node = self._prefix_node(norm_key(prefix))
+        if not node:
+            return []
+        return node['labels'][:limit]
+
+    def suggest(self, user_city, limit=3, max_distance=None):
+        """
+        Ranked "did you mean" suggestions for an unknown city.
+
+        Candidates come from edit distance (BK-tree), shared trigrams and
+        substring containment; ranked by edit distance, then trigram similarity.
+
+        Args:
+            user_city: User-provided city name
+            limit: Max number of suggestions
+            max_distance: Max edit distance (default scales with input length)
+
+        Returns:
+            list: City labels, best first
+        """
+        key = norm_key(user_city)
+        if not key:
+            return []
+
+        if max_distance is None:
+            max_distance = max(2, len(key) // 3)
+
+        candidates = {known for _, known in self._bktree.search(key, max_distance)}
+
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for known in self._trigram_index.get(gram, ()):
+                shared[known] = shared.get(known, 0) + 1
+
+        def similarity(known):
+            known_grams = len(trigrams(known))
+            count = shared.get(known, 0)
+            return count / (len(grams) + known_grams - count)
+
+        for known in shared:
+            if similarity(known) >= 0.3 or key in known or known in key:
+                candidates.add(known)
+
+        ranked = sorted(
+            candidates,
+            key=lambda known: (levenshtein(key, known), -similarity(known), len(known), known)
+        )
+        return [self.exact[known] for known in ranked[:limit]]
+
+
+def get_city_registry(known_city_labels):
+    """
+    Get the (cached) registry for a set of known city labels.
+
+    Args:
+        known_city_labels: Iterable of city names in the dataset
+
+    Returns:
+        CityRegistry
+    """
+    cache_key = frozenset(known_city_labels)
+    registry = _REGISTRY_CACHE.get(cache_key)
+    if registry is None:
+        if len(_REGISTRY_CACHE) >= REGISTRY_CACHE_SIZE:
+            _REGISTRY_CACHE.pop(next(iter(_REGISTRY_CACHE)))
+        registry = CityRegistry(cache_key)
+        _REGISTRY_CACHE[cache_key] = registry
+    return registry
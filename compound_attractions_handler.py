@@ -1,12 +1,19 @@
 """
 Compound Attractions Handler
 Ensures attractions that are part of the same complex are grouped on the same day.
+
+COMPOUND_CONFIG is compiled once at import into a per-city index
+(normalized attraction name → groups), so group lookups are dictionary hits
+and integrity enforcement is a lookup plus a set union.
 """
 
 import json
+from functools import lru_cache
 from pathlib import Path
 import os
 
+from text_norm import norm_key
+
 # Load compound attractions configuration
 # Try multiple possible locations
 POSSIBLE_PATHS = [
@@ -38,6 +45,66 @@ if not COMPOUND_CONFIG:
     print(f"   Compound attraction grouping disabled.")
 
 
+def _compile_compound_config(config):
+    """
+    Compile COMPOUND_CONFIG into a per-city index.
+    
+    Returns:
+        dict: {normalized city: {
+            'groups': [group, ...] (config order),
+            'by_name': {normalized attraction name: (group, ...)}
+        }}
+    """
+    index = {}
+    for city, city_config in config.items():
+        if not isinstance(city_config, dict):
+            continue
+        
+        groups = []
+        by_name = {}
+        for group_name, group_config in city_config.items():
+            if not isinstance(group_config, dict) or 'included_attractions' not in group_config:
+                continue
+            
+            group = {
+                'name': group_name,
+                'core': group_config.get('core_attraction'),
+                'attractions': group_config['included_attractions'],
+                'excluded': group_config.get('excluded_attractions', []),
+                'must_group': group_config.get('must_visit_together', False),
+                'visit_duration': group_config.get('visit_duration_hours', 2),
+                'neighborhood': group_config.get('neighborhood', '')
+            }
+            groups.append(group)
+            
+            # An attraction can belong to several groups (e.g. Gibralfaro)
+            for attraction in group['attractions']:
+                key = norm_key(attraction)
+                by_name[key] = by_name.get(key, ()) + (group,)
+        
+        if groups:
+            index[norm_key(city)] = {'groups': groups, 'by_name': by_name}
+    
+    return index
+
+
+COMPOUND_INDEX = _compile_compound_config(COMPOUND_CONFIG)
+
+
+def _city_index(city):
+    return COMPOUND_INDEX.get(norm_key(city)) if city else None
+
+
+def _copy_group(group):
+    """Caller-owned copy of an indexed group (the index and caches stay unmodified)"""
+    if group is None:
+        return None
+    copied = dict(group)
+    copied['attractions'] = list(group['attractions'])
+    copied['excluded'] = list(group['excluded'])
+    return copied
+
+
 def get_compound_groups(city):
     """
     Get all compound attraction groups for a city.
@@ -59,23 +126,11 @@ def get_compound_groups(city):
             }
         ]
     """
-    if city not in COMPOUND_CONFIG:
+    city_index = _city_index(city)
+    if not city_index:
         return []
     
-    groups = []
-    for group_name, config in COMPOUND_CONFIG[city].items():
-        if 'included_attractions' in config:
-            groups.append({
-                'name': group_name,
-                'core': config.get('core_attraction'),
-                'attractions': config['included_attractions'],
-                'excluded': config.get('excluded_attractions', []),
-                'must_group': config.get('must_visit_together', False),
-                'visit_duration': config.get('visit_duration_hours', 2),
-                'neighborhood': config.get('neighborhood', '')
-            })
-    
-    return groups
+    return [_copy_group(group) for group in city_index['groups']]
 
 
 def find_compound_group(poi_name, city):
@@ -89,21 +144,60 @@ def find_compound_group(poi_name, city):
     Returns:
         dict or None: Compound group info if POI belongs to a group, None otherwise
     """
-    groups = get_compound_groups(city)
-    
-    for group in groups:
-        # Check if POI is in the included list
-        if poi_name in group['attractions']:
-            return group
-        
-        # Check if POI name contains any of the attraction names (partial match)
+    return _copy_group(_find_indexed_group(poi_name, city))
+
+
+@lru_cache(maxsize=4096)
+def _find_indexed_group(poi_name, city):
+    """find_compound_group() lookup returning the shared indexed group (memoized)"""
+    city_index = _city_index(city)
+    if not city_index or not poi_name:
+        return None
+    
+    # Exact (normalized) name hit
+    groups = city_index['by_name'].get(norm_key(poi_name))
+    if groups:
+        return groups[0]
+    
+    # Fallback: partial match either way (memoized per name)
+    poi_lower = poi_name.lower()
+    for group in city_index['groups']:
         for attraction in group['attractions']:
-            if attraction.lower() in poi_name.lower() or poi_name.lower() in attraction.lower():
+            if attraction.lower() in poi_lower or poi_lower in attraction.lower():
                 return group
     
     return None
 
 
+def build_compound_poi_index(pois, city):
+    """
+    Reverse index: compound group name → POIs from the dataset that belong to it.
+    
+    Args:
+        pois (list): POI dictionaries (e.g. all available POIs for a city)
+        city (str): City name
+    
+    Returns:
+        dict: {group_name: [poi, ...]} in the group's attraction order
+    """
+    city_index = _city_index(city)
+    if not city_index:
+        return {}
+    
+    # First POI per normalized name (same as scanning the list in order)
+    first_by_name = {}
+    for poi in pois:
+        first_by_name.setdefault(norm_key(poi.get('name', '')), poi)
+    
+    index = {}
+    for group in city_index['groups']:
+        members = [first_by_name[key] for key in (norm_key(a) for a in group['attractions']) if key in first_by_name]
+        if members:
+            index[group['name']] = members
+    
+    return index
+
+
 def group_pois_by_compound(pois, city):
     """
     Group POIs by their compound attractions.
@@ -123,7 +217,7 @@ def group_pois_by_compound(pois, city):
     
     for poi in pois:
         poi_name = poi.get('name', '')
-        group = find_compound_group(poi_name, city)
+        group = _find_indexed_group(poi_name, city)
         
         if group and group['must_group']:
             group_name = group['name']
@@ -152,32 +246,35 @@ def ensure_compound_integrity(selected_pois, available_pois, city):
     Returns:
         list: Updated selected_pois with complete compound groups
     """
-    groups = get_compound_groups(city)
-    
-    for group in groups:
-        if not group['must_group']:
+    city_index = _city_index(city)
+    if not city_index:
+        return selected_pois
+    
+    by_name = city_index['by_name']
+    selected_keys = {norm_key(poi.get('name', '')) for poi in selected_pois}
+    
+    # Groups touched by the selection (dictionary lookups)
+    touched = set()
+    for key in selected_keys:
+        for group in by_name.get(key, ()):
+            if group['must_group']:
+                touched.add(group['name'])
+    
+    if not touched:
+        return selected_pois
+    
+    # Union of the touched groups' members, minus what is already selected
+    members_by_group = build_compound_poi_index(available_pois, city)
+    for group in city_index['groups']:
+        if group['name'] not in touched:
             continue
-        
-        # Check if any POI from this compound is selected
-        group_pois_in_selection = []
-        for poi in selected_pois:
-            if poi.get('name') in group['attractions']:
-                group_pois_in_selection.append(poi)
-        
-        # If we have at least one, add all missing ones from the compound
-        if group_pois_in_selection:
-            # Find all POIs from this compound in available_pois
-            for attraction_name in group['attractions']:
-                # Skip if already selected
-                if any(p.get('name') == attraction_name for p in selected_pois):
-                    continue
-                
-                # Find in available_pois and add
-                for poi in available_pois:
-                    if poi.get('name') == attraction_name:
-                        selected_pois.append(poi)
-                        print(f"  ✅ Added '{attraction_name}' to complete {group['name']}")
-                        break
+        for poi in members_by_group.get(group['name'], []):
+            key = norm_key(poi.get('name', ''))
+            if key in selected_keys:
+                continue
+            selected_pois.append(poi)
+            selected_keys.add(key)
+            print(f"  ✅ Added '{poi.get('name')}' to complete {group['name']}")
     
     return selected_pois
 
@@ -0,0 +1,60 @@
+"""
+Dataset Compiler for Andalusia Travel App
+
+Resolves derived per-record fields once, when a dataset is loaded, so the
+itinerary generator reads precomputed values instead of re-deriving them
+for every POI on every request.
+
+Usage:
+    from dataset_compiler import compile_attractions, compile_restaurants
+    attractions = compile_attractions(load_cached_json("andalusia_attractions_filtered.json"))
+    restaurants = compile_restaurants(load_cached_json("restaurants_andalusia.json"))
+"""
+
+from must_see_landmarks import compile_must_see_flags
+from restaurant_service import compile_restaurant_attributes
+from weighted_poi_scoring import register_dataset
+
+
+def compile_attractions(attractions):
+    """
+    Compile the attractions dataset (the POI dicts are left unchanged).
+    
+    Resolves must-see status into a side table keyed by place_id (see
+    must_see_landmarks) and registers the dataset version used to key the
+    POI ranking cache (see weighted_poi_scoring.register_dataset).
+    
+    Args:
+        attractions: List of POI dictionaries
+    
+    Returns:
+        list: The same list
+    """
+    if not attractions:
+        return attractions
+    
+    compile_must_see_flags(attractions)
+    register_dataset(attractions)
+    
+    return attractions
+
+
+def compile_restaurants(restaurants):
+    """
+    Compile the restaurants dataset in place.
+    
+    Adds to each restaurant:
+        _lunch_ok / _dinner_ok / _reviews / _price_tier / _quality (see restaurant_service)
+    
+    Args:
+        restaurants: List of restaurant dictionaries
+    
+    Returns:
+        list: The same list, with derived fields added
+    """
+    if not restaurants:
+        return restaurants
+    
+    compile_restaurant_attributes(restaurants)
+    
+    return restaurants
@@ -380,7 +380,7 @@ def get_cities_for_trip_length(total_days: int, start_city: str = None, end_city
     return cities
 
 
-def parse_user_duration_requests(special_requests: str) -> dict:
+def parse_user_duration_requests(special_requests: str, known_cities=()) -> dict:
     """
     Parse user's special requests for specific city durations
     
@@ -392,81 +392,16 @@ def parse_user_duration_requests(special_requests: str) -> dict:
         
     Args:
         special_requests: Free-text special requests
+        known_cities: City labels of the trip's dataset - pass the same labels
+            as the route generator so both resolve city names identically
         
     Returns:
         Dict of {city: days}
     """
-    import re
-    
-    if not special_requests:
-        return {}
-    
-    overrides = {}
-    text = special_requests.lower()
-    
-    # Convert word numbers to digits (order matters - longer phrases first!)
-    word_to_num = [
-        ('only one', '1'),
-        ('just one', '1'),
-        ('a single', '1'),
-        ('single', '1'),
-        ('one', '1'),
-        ('two', '2'),
-        ('three', '3'),
-        ('four', '4'),
-        ('five', '5'),
-        ('six', '6'),
-        ('seven', '7'),
-        ('eight', '8'),
-        ('nine', '9'),
-        ('ten', '10'),
-        # Don't include 'a' alone - it breaks 'day' → 'd1y'
-    ]
-    
-    for word, num in word_to_num:
-        text = text.replace(word, num)
-    
-    # Known city names to search for
-    cities = ['seville', 'sevilla', 'granada', 'cordoba', 'córdoba', 'malaga', 'málaga',
-              'ronda', 'cadiz', 'cádiz', 'jerez', 'marbella', 'nerja', 'tarifa', 'antequera']
-    
-    # Pattern: "X days in CITY" or "CITY for X days" or "stay in CITY X days/nights"
-    patterns = [
-        r'(\d+)\s*days?\s*(?:in|at)\s*(\w+)',  # "3 days in Seville"
-        r'(\w+)\s*(?:for|:)\s*(?:only\s*)?(\d+)\s*days?',  # "Seville for 3 days" or "Seville for only 1 day"
-        r'stay\s*(?:in|at)?\s*(\w+)\s*(?:for)?\s*(\d+)\s*(?:days?|nights?)',  # "stay in Granada 4 nights"
-        r'(\w+)\s*(\d+)\s*(?:days?|nights?)',  # "Granada 4 days"
-        r'spend\s*(\d+)\s*days?\s*(?:in|at)\s*(\w+)',  # "spend 3 days in Seville"
-        r'(\w+)\s*for\s*(?:only\s*)?(\d+)\s*day',  # "Seville for only 1 day"
-        r'only\s*(\d+)\s*days?\s*(?:in|at|for)\s*(\w+)',  # "only 1 day in Seville"
-        r'(\w+)\s*(?:just|only)\s*(\d+)\s*days?',  # "Seville just 1 day"
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        for match in matches:
-            # Determine which group is city and which is number
-            if match[0].isdigit():
-                days = int(match[0])
-                city = match[1]
-            else:
-                city = match[0]
-                if match[1].isdigit():
-                    days = int(match[1])
-                else:
-                    continue  # Skip if no valid number
-            
-            # Check if it's a known city
-            city_lower = city.lower()
-            for known_city in cities:
-                if known_city.startswith(city_lower) or city_lower.startswith(known_city[:4]):
-                    # Normalize the city name
-                    city_norm = normalize_city_for_allocation(known_city)
-                    if city_norm:
-                        overrides[city_norm] = days
-                    break
+    # Shared compiled parser (imported here: it builds on this module)
+    from special_requests import parse_special_requests
     
-    return overrides
+    return parse_special_requests(special_requests, known_cities).durations()
 
 
 def get_allocation_summary(allocation: dict, total_days: int) -> str:
@@ -516,7 +451,7 @@ if __name__ == "__main__":
     
     # Test with user override
     cities = ['Málaga', 'Granada', 'Seville']
-    overrides = parse_user_duration_requests("Must see Seville for 4 days")
+    overrides = parse_user_duration_requests("Must see Seville for 4 days", cities)
     print(f"User overrides: {overrides}")
     allocation = allocate_days_for_route(cities, 7, overrides)
     print(get_allocation_summary(allocation, 7))
@@ -14,6 +14,9 @@ import os
 from urllib.parse import quote_plus
 from datetime import datetime, timedelta
 from youtube_helper import add_youtube_section_to_doc, get_video_for_city
+from photo_manifest import get_manifest
+from photo_derivatives import DOCX_EVENT_PHOTO, DOCX_PHOTO, get_derivative
+from document_model import get_document_model
 
 # ============================================================================
 # PATH CONFIGURATION - PORTABLE (works on any computer/cloud deployment)
@@ -30,7 +33,7 @@ EVENT_PHOTOS_DIR = os.path.join(BASE_DIR, 'event_photos')
 # Check if photos directory exists (for debugging deployment issues)
 PHOTOS_AVAILABLE = os.path.exists(PHOTOS_DIR) and os.path.isdir(PHOTOS_DIR)
 if PHOTOS_AVAILABLE:
-    photo_count = len([f for f in os.listdir(PHOTOS_DIR) if f.endswith(('.jpg', '.jpeg', '.png'))])
+    photo_count = len(get_manifest(PHOTOS_DIR))
     # print(f"✅ Photos directory found: {PHOTOS_DIR} ({photo_count} images)")
 else:
     photo_count = 0
@@ -99,6 +102,35 @@ def get_hotel_booking_link(city_name, hotel_name=None, checkin_date=None, checko
 # ============================================================================
 
 
+class DocxImages:
+    """
+    Photo placements of one Word document.
+
+    Photos go in as pre-sized derivatives from the shared cache (DOCX_PHOTO,
+    DOCX_EVENT_PHOTO), never the original files. python-docx keeps one image
+    part per distinct image (matched by SHA-1), so placing the same photo again
+    reuses the part already in the document.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.placements = 0
+
+    def add(self, run, photo_path, spec, width):
+        """Place a photo in a run (raises like run.add_picture)"""
+        run.add_picture(get_derivative(photo_path, spec) or photo_path, width=width)
+        self.placements += 1
+
+    def report(self):
+        """{'placements', 'images', 'bytes'} - images and bytes as stored in the document"""
+        parts = list(self.doc.part.package.image_parts)
+        return {
+            'placements': self.placements,
+            'images': len(parts),
+            'bytes': sum(len(part.blob) for part in parts),
+        }
+
+
 def normalize_city_name(city_name):
     """Normalize city name for matching"""
     if not city_name:
@@ -512,10 +544,12 @@ def get_poi_description_fallback(poi_name, category):
     return description
 
 
-def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed_requests, is_car_mode=False, result=None):
+def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed_requests, is_car_mode=False, result=None, progress=None):
     """
     Build BEAUTIFUL travel magazine-style Word document
     
+    progress: optional callback(days_done, total_days), called after each day
+    
     Features:
     - Colorful headers with emojis
     - Travel-themed styling
@@ -574,6 +608,7 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
     #             city_stop["attractions"] = merge_city_pois(attractions, city_name)
     
     doc = Document()
+    images = DocxImages(doc)
     
     # ========================================================================
     # 🎨 STUNNING COVER PAGE
@@ -1067,11 +1102,15 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
     doc.add_paragraph('─' * 50)
     doc.add_paragraph()
     
-    visited_cities = set()
+    # ✅ NEW: Tips, photos, videos, routes and booking links resolved once (shared with PDF/Excel)
+    model = get_document_model(itinerary, result=result, start_date=start_date)
     
-    for idx, day in enumerate(itinerary):
-        city = day.get("city", "?")
-        city_norm = normalize_city_name(city)
+    for entry in model.days:
+        day, idx = entry.day, entry.index
+        if progress:
+            progress(idx, len(itinerary))
+        city = entry.city
+        city_info = model.city(entry)
         is_must_see = day.get("is_must_see", False)
         driving_km = day.get("driving_km", 0)
         driving_hours = day.get("driving_hours", 0)
@@ -1080,11 +1119,9 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
         # CITY GUIDE (only once per city)
         # ═══════════════════════════════════════════════════════════════
         
-        if city_norm not in visited_cities:
-            visited_cities.add(city_norm)
-            
+        if entry.first_visit:
             # Don't add page break before first city
-            if len(visited_cities) > 1:
+            if idx > 0:
                 doc.add_page_break()
             
             # Big colorful city header
@@ -1107,7 +1144,7 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                 must_see_run.bold = True
             
             # City description
-            city_desc = get_city_prefix(city_norm)
+            city_desc = city_info.description
             if city_desc:
                 desc_para = doc.add_paragraph()
                 desc_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
@@ -1119,7 +1156,9 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
             doc.add_paragraph()
             # 🎬 YOUTUBE VIDEO PREVIEW
             try:
-                video_added = add_youtube_section_to_doc(doc, city, add_hyperlink)
+                video_added = city_info.video and add_youtube_section_to_doc(
+                    doc, city, add_hyperlink, video=city_info.video
+                )
                 if video_added:
                     doc.add_paragraph()
             except Exception as e:
@@ -1128,7 +1167,7 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
             doc.add_paragraph()
             
             # City tips in colored box
-            city_tips = get_city_tips(city_norm)
+            city_tips = city_info.tips
             if city_tips:
                 tips_header = doc.add_heading('', 2)
                 tips_run = tips_header.add_run('💡  LOCAL INSIDER TIPS')
@@ -1200,65 +1239,31 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
         # GOOGLE MAPS LINK - Route for the day
         # ═══════════════════════════════════════════════════════════════
         
-        # Collect all stops for the day
-        day_attractions = []
-        for city_stop in day.get("cities", []):
-            day_attractions.extend(city_stop.get("attractions", []))
-        
-        day_restaurants = [
-            day.get("lunch_restaurant"),
-            day.get("dinner_restaurant")
-        ]
-        day_restaurants = [r for r in day_restaurants if r]  # Remove None values
-        
-        # Get previous city for driving days
-        prev_city = None
-        if day.get("day", 1) > 1:
-            # Find previous day's city
-            for prev_day in itinerary:
-                if prev_day.get("day") == day.get("day") - 1:
-                    prev_city = prev_day.get("overnight_city") or prev_day.get("city")
-                    break
-        
-        # ✅ FIX: Detect if this is last day of circular trip
-        is_last_day = (idx == len(itinerary) - 1)
-        overnight = day.get("overnight_city", city)
-        is_circular_return = (is_last_day and city != overnight)
-        
-        # Generate map URL
-        if day_attractions or day_restaurants:
-            map_url = generate_daily_map_url(
-                prev_city, 
-                city, 
-                day_attractions, 
-                day_restaurants,
-                is_circular=is_circular_return,
-                return_to_city=overnight if is_circular_return else None
-            )
+        # Route from the previous city through the day's POIs and restaurants
+        # (returns to the start city on the last day of a circular trip)
+        map_url = entry.route_url
+        if map_url:
+            map_para = doc.add_paragraph()
+            map_para.paragraph_format.left_indent = Inches(0.3)
             
-            if map_url:
-                map_para = doc.add_paragraph()
-                map_para.paragraph_format.left_indent = Inches(0.3)
-                
-                map_icon = map_para.add_run('🗺️  ')
-                map_icon.font.size = Pt(11)
-                
-                map_label = map_para.add_run('Today\'s Route:  ')
-                map_label.font.size = Pt(10)
-                map_label.font.color.rgb = RGBColor(52, 73, 94)
-                
-                # Add hyperlink
-                add_hyperlink(map_para, map_url, 'Open in Google Maps')
-                
-                doc.add_paragraph()
+            map_icon = map_para.add_run('🗺️  ')
+            map_icon.font.size = Pt(11)
+            
+            map_label = map_para.add_run('Today\'s Route:  ')
+            map_label.font.size = Pt(10)
+            map_label.font.color.rgb = RGBColor(52, 73, 94)
+            
+            # Add hyperlink
+            add_hyperlink(map_para, map_url, 'Open in Google Maps')
+            
+            doc.add_paragraph()
         
         # ═══════════════════════════════════════════════════════════════
         # ATTRACTIONS - Beautiful cards
         # ═══════════════════════════════════════════════════════════════
         
-        cities_list = day.get("cities", [])
-        for city_stop in cities_list:
-            attractions = city_stop.get("attractions", [])
+        for stop in entry.stops:
+            attractions = stop.pois
             
             if attractions:
                 attr_header = doc.add_heading('', 3)
@@ -1266,66 +1271,28 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                 attr_run.font.size = Pt(14)
                 attr_run.font.color.rgb = RGBColor(155, 89, 182)
                 
-                for idx, attr in enumerate(attractions, 1):
-                    attr_name = attr.get('name', '?')
-                    if attr.get('is_must_see_attraction'):
-                        attr_name += ' ⭐'
+                for number, poi in enumerate(attractions, 1):
+                    attr = poi.poi
+                    attr_name = poi.title
                     
                     # Attraction name - bold and colorful
                     attr_para = doc.add_paragraph()
                     
-                    number = attr_para.add_run(f'{idx}. ')
-                    number.font.size = Pt(12)
-                    number.font.color.rgb = RGBColor(52, 152, 219)
-                    number.bold = True
+                    number_run = attr_para.add_run(f'{number}. ')
+                    number_run.font.size = Pt(12)
+                    number_run.font.color.rgb = RGBColor(52, 152, 219)
+                    number_run.bold = True
                     
                     name_run = attr_para.add_run(attr_name)
                     name_run.bold = True
                     name_run.font.size = Pt(12)
                     name_run.font.color.rgb = RGBColor(44, 62, 80)
                     
-                    # ✅ NEW: Add photo if available
-                    # Try local_photo_path first, then construct from photo_references
-                    photo_path = None
-                    
-                    # Option 1: Use local_photo_path if available
-                    if attr.get('local_photo_path'):
-                        relative_path = attr['local_photo_path']
-                        
-                        # ✅ FIX: Normalize path separators (Windows \ to Unix /)
-                        relative_path = relative_path.replace('\\', '/')
-                        
-                        # Convert relative path to absolute
-                        if not os.path.isabs(relative_path):
-                            # It's relative (like "photos/ChIJ...jpg")
-                            # Convert using DATA_DIR (portable!)
-                            photo_path = os.path.join(DATA_DIR, relative_path)
-                        else:
-                            # Already absolute
-                            photo_path = relative_path
-                        
-                    
-                    # Option 2: Construct path from photo_references (SMART!)
-                    elif attr.get('photo_references'):
-                        # Use place_id to find the photo file
-                        place_id = attr.get('place_id')
-                        if place_id:
-                            # Photo filename is place_id + .jpg
-                            photo_filename = f"{place_id}.jpg"
-                            
-                            # PORTABLE PATH - Works on any system!
-                            photo_path = os.path.join(PHOTOS_DIR, photo_filename)
-                    
-                    # ✅ FIX: Also try just the filename in PHOTOS_DIR as fallback
-                    if photo_path and not os.path.exists(photo_path):
-                        # Try extracting just the filename and looking in PHOTOS_DIR
-                        filename_only = os.path.basename(photo_path)
-                        fallback_path = os.path.join(PHOTOS_DIR, filename_only)
-                        if os.path.exists(fallback_path):
-                            photo_path = fallback_path
+                    # ✅ NEW: Add photo if available (resolved from the shared photo manifest)
+                    photo_path = poi.photo_path
                     
                     # Add photo if we found it
-                    if photo_path and os.path.exists(photo_path):
+                    if photo_path:
                         try:
                             
                             photo_para = doc.add_paragraph()
@@ -1333,9 +1300,9 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                             photo_para.paragraph_format.space_before = Pt(6)
                             photo_para.paragraph_format.space_after = Pt(6)
                             
-                            # Add picture with width of 4.5 inches
+                            # Add picture with width of 4.5 inches (120 dpi copy, not the original)
                             run = photo_para.add_run()
-                            run.add_picture(photo_path, width=Inches(4.5))
+                            images.add(run, photo_path, DOCX_PHOTO, Inches(4.5))
                             
                             
                         except Exception as e:
@@ -1345,10 +1312,8 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                     # elif photo_path:
                       #  print(f"DEBUG: Photo path exists but file not found: {photo_path}")
                     
-                    # Description
-                    description = attr.get('description')
-                    if not description or description.strip() == '':
-                        description = get_poi_description_fallback(attr_name, attr.get('category'))
+                    # Description (generic fallback when missing)
+                    description = poi.description
                     
                     if description:
                         desc_para = doc.add_paragraph()
@@ -1397,7 +1362,7 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                         details_run.font.color.rgb = RGBColor(149, 165, 166)
                     
                     # POI tip
-                    poi_tip = get_poi_tip(attr_name)
+                    poi_tip = poi.tip
                     if poi_tip:
                         tip_para = doc.add_paragraph()
                         tip_para.paragraph_format.left_indent = Inches(0.3)
@@ -1416,14 +1381,12 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
         # HOTELS - Colorful recommendation boxes
         # ═══════════════════════════════════════════════════════════════
         
-        hotels = day.get("hotels", [])
-        overnight = day.get("overnight_city", city)
+        overnight = entry.overnight
         
         # ✅ FIX: For circular trips, detect if this is the last day returning to start
-        is_last_day = (idx == len(itinerary) - 1)
-        is_return_to_start = (is_last_day and city != overnight)
+        is_return_to_start = entry.is_circular_return
         
-        if hotels and any(h.get('name') and 'Hotels in' not in h.get('name', '') for h in hotels):
+        if entry.hotels:
             hotel_header = doc.add_heading('', 3)
             
             # ✅ FIX: Better wording for circular trip return
@@ -1447,9 +1410,8 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                 return_text.font.color.rgb = RGBColor(52, 152, 219)
                 doc.add_paragraph()  # Spacing
             
-            for hotel in hotels[:3]:
-                if not hotel.get('name') or 'Hotels in' in hotel.get('name', ''):
-                    continue
+            for hotel_entry in entry.hotels:
+                hotel = hotel_entry.hotel
                 
                 hotel_para = doc.add_paragraph()
                 hotel_para.paragraph_format.left_indent = Inches(0.3)
@@ -1492,55 +1454,8 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                     note.italic = True
                     note.font.color.rgb = RGBColor(149, 165, 166)
                 
-                # ✅ NEW: Add clickable booking link
-                city_name = day.get('city', '')
-                
-                # Calculate check-in/check-out dates
-                checkin = None
-                checkout = None
-                
-                # Get number of nights from day data
-                day_in_city = day.get('day_in_city', 1)
-                total_days_in_city = day.get('total_days_in_city', 1)
-                
-                # Only calculate booking dates for first day in city
-                if day_in_city == 1:
-                    # Nights = days in city (same for ALL cities)
-                    nights = total_days_in_city
-                    
-                    # Try to get date from the day object first (most reliable)
-                    day_date_obj = day.get('date_obj')  # datetime object added by trip_planner_page
-                    day_date_str = day.get('date')  # String format "2026-04-10"
-                    
-                    if day_date_obj:
-                        # Best case: we have a datetime object
-                        checkin = day_date_obj
-                        checkout = checkin + timedelta(days=nights)
-                    elif day_date_str:
-                        # Parse the date string
-                        try:
-                            from datetime import datetime
-                            checkin = datetime.strptime(day_date_str, '%Y-%m-%d')
-                            checkout = checkin + timedelta(days=nights)
-                        except:
-                            pass
-                    
-                    # Fallback: calculate from start_date if available
-                    if not checkin and start_date:
-                        try:
-                            # Check-in is the night of this day (idx is 0-based)
-                            checkin = start_date + timedelta(days=idx)
-                            checkout = checkin + timedelta(days=nights)
-                        except:
-                            pass
-                
-                # Generate booking link
-                booking_url = get_hotel_booking_link(
-                    city_name,
-                    hotel_name=hotel.get('name'),
-                    checkin_date=checkin,
-                    checkout_date=checkout
-                )
+                # ✅ NEW: Add clickable booking link (dated for the first night in a city)
+                booking_url = hotel_entry.booking_url
                 
                 # Add booking link as clickable hyperlink
                 link_para = doc.add_paragraph()
@@ -1631,7 +1546,7 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                         addr_text.font.color.rgb = RGBColor(127, 140, 141)
                     elif not any(x in address for x in ['Andalusia', 'Spain']):
                         # Just restaurant name with city - add city
-                        city_name = lunch.get('city', current_city)
+                        city_name = lunch.get('city', city)
                         full_address = f"{address}, {city_name}"
                         addr_para = doc.add_paragraph()
                         addr_para.paragraph_format.left_indent = Inches(0.5)
@@ -2229,43 +2144,22 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
     if start_date:
         try:
             # Import events service
-            from events_service import get_events_for_trip
+            from events_service import get_trip_events
             from datetime import timedelta
             
             # Get end date
             end_date = start_date + timedelta(days=days - 1)
             
-            # ✅ UPDATED: Check ALL major Andalusia cities (same as UI)
+            # ✅ UPDATED: Check ALL major Andalusia cities (same as UI, shares its cache)
             major_cities = ['Seville', 'Granada', 'Córdoba', 'Málaga', 'Cádiz', 'Jerez', 'Ronda']
-            cities_to_check = list(set([c.title() for c in ordered_cities] + major_cities))
+            cities_to_check = [c.title() for c in ordered_cities] + major_cities
             
-            # Fetch events for each city
-            for city in cities_to_check:
-                try:
-                    city_events = get_events_for_trip(
-                        city,
-                        start_date.strftime('%Y-%m-%d'),
-                        end_date.strftime('%Y-%m-%d'),
-                        eventbrite_token=None
-                    )
-                    events_list.extend(city_events)
-                except Exception as e:
-                    # print(f"⚠️ Error fetching events for {city} in document: {e}")
-                    continue
-            
-            # Remove duplicates by name+date
-            seen = set()
-            unique_events = []
-            for event in events_list:
-                key = (event.get('name'), event.get('date'))
-                if key not in seen:
-                    seen.add(key)
-                    unique_events.append(event)
-            events_list = unique_events
-            
-            # Sort by tier (tier_1 first) then by date
-            tier_order = {'tier_1': 0, 'tier_2': 1, 'tier_3': 2}
-            events_list.sort(key=lambda x: (tier_order.get(x.get('tier', 'tier_3'), 3), x.get('date', '')))
+            events_list = get_trip_events(
+                cities_to_check,
+                start_date.strftime('%Y-%m-%d'),
+                end_date.strftime('%Y-%m-%d'),
+                eventbrite_token=None
+            )
             
         except Exception as e:
             # print(f"⚠️ Could not fetch events for document: {e}")
@@ -2347,7 +2241,7 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
                     photo_para.paragraph_format.space_after = Pt(6)
                     
                     photo_run = photo_para.add_run()
-                    photo_run.add_picture(event_photo_path, width=Inches(5.0))
+                    images.add(photo_run, event_photo_path, DOCX_EVENT_PHOTO, Inches(5.0))
                     
                     # Photo caption
                     caption_para = doc.add_paragraph()
@@ -2462,6 +2356,10 @@ def build_word_doc(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, p
     footer_run.font.size = Pt(8)
     footer_run.font.color.rgb = RGBColor(189, 195, 199)
     
+    image_report = images.report()
+    print(f"[DOCX] {image_report['placements']} photo placements, {image_report['images']} distinct images "
+          f"({image_report['bytes'] / 1e6:.1f} MB)")
+    
     # Save to BytesIO
     bio = io.BytesIO()
     doc.save(bio)
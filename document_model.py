@@ -0,0 +1,406 @@
+"""
+Document Model - one resolved view of an itinerary for all exporters
+
+The Word, PDF and Excel exporters used to walk the itinerary separately and
+each recompute the same lookups: city descriptions and tips, POI tips and
+fallback descriptions, photo paths, YouTube videos, daily Google Maps
+routes, hotel booking links and restaurant links. This module does that
+resolution once per itinerary; the exporters only lay the result out.
+
+Models are cached by content hash, so exporting the same trip to several
+formats (or re-exporting it) resolves it once per process.
+
+Usage:
+    from document_model import get_document_model
+    model = get_document_model(itinerary, result=result)
+    for entry in model.days:
+        entry.city, entry.date, entry.route_url
+        for stop in entry.stops:
+            for poi in stop.pois:
+                poi.title, poi.photo_path, poi.description, poi.tip
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+# Resolved models kept per process (one entry per distinct itinerary + start date)
+DOCUMENT_MODEL_CACHE_SIZE = 8
+
+# Google Maps allows at most 10 waypoints in a directions URL
+MAX_ROUTE_WAYPOINTS = 10
+
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+
+
+# ============================================================================
+# MODEL
+# ============================================================================
+
+@dataclass(frozen=True)
+class PoiEntry:
+    """One attraction with its photo, description and tip resolved"""
+    poi: Dict
+    name: str
+    title: str                     # Name with ⭐ for must-see attractions
+    photo_path: Optional[str]
+    description: str               # POI description, or the generic fallback
+    tip: Optional[str]
+
+
+@dataclass(frozen=True)
+class StopEntry:
+    """One city stop of a day and its attractions"""
+    city: str
+    pois: Tuple[PoiEntry, ...]
+
+
+@dataclass(frozen=True)
+class HotelEntry:
+    """Hotel recommendation with its Booking.com link (dated on the first night in a city)"""
+    hotel: Dict
+    name: str
+    booking_url: str
+
+
+@dataclass(frozen=True)
+class RestaurantEntry:
+    meal: str                      # 'Lunch' or 'Dinner'
+    restaurant: Dict
+    name: str
+    maps_url: str
+
+
+@dataclass(frozen=True)
+class CityEntry:
+    """City-level content shown once per city"""
+    name: str
+    key: str                       # Accent-free lower-case name
+    description: str
+    tips: Tuple[str, ...]
+    video: Optional[Dict]          # YouTube video dict, or None
+    video_search_url: str          # YouTube search fallback when there is no video
+
+
+@dataclass(frozen=True)
+class DayEntry:
+    """One itinerary day with everything the exporters need resolved"""
+    day: Dict
+    index: int
+    number: int
+    city: str
+    city_key: str
+    overnight: str
+    date: Optional[date]
+    first_visit: bool              # First day of the trip in this city
+    is_circular_return: bool       # Last day of a circular trip (drive back to overnight city)
+    stops: Tuple[StopEntry, ...]
+    route_url: Optional[str]       # Driving route: previous city, POIs, restaurants
+    walking_route_url: Optional[str]
+    checkin: Optional[date]
+    checkout: Optional[date]
+    hotels: Tuple[HotelEntry, ...]
+    restaurants: Tuple[RestaurantEntry, ...]
+    events: Tuple[Dict, ...]
+
+    @property
+    def pois(self) -> List[PoiEntry]:
+        """All attractions of the day, in stop order"""
+        return [poi for stop in self.stops for poi in stop.pois]
+
+    def photo_path(self, attr: Dict) -> Optional[str]:
+        """Resolved photo for one of this day's attraction dicts (drop-in for photo_manifest.get_photo_path)"""
+        for poi in self.pois:
+            if poi.poi is attr:
+                return poi.photo_path
+        return None
+
+
+@dataclass(frozen=True)
+class DocumentModel:
+    key: str
+    start_date: Optional[date]
+    days: Tuple[DayEntry, ...]
+    cities: Dict[str, CityEntry] = field(default_factory=dict)
+    events: Tuple[Dict, ...] = ()
+
+    def city(self, entry: DayEntry) -> CityEntry:
+        return self.cities[entry.city_key]
+
+
+# ============================================================================
+# RESOLUTION
+# ============================================================================
+
+def as_date(value) -> Optional[date]:
+    """date from a date, datetime, "YYYY-MM-DD" or "DD/MM/YYYY" value (None if unparseable)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+def walking_route_url(day: Dict) -> Optional[str]:
+    """Walking route through the day's attractions, searched by "name city" (no coordinates)"""
+    waypoints = []
+    seen_names = set()
+    for city_stop in day.get('cities', []):
+        for attr in city_stop.get('attractions', []):
+            attr_name = attr.get('name', '')
+            if attr_name and attr_name not in seen_names:
+                seen_names.add(attr_name)
+                attr_city = city_stop.get('city', day.get('city', ''))
+                waypoints.append(f"{attr_name} {attr_city}".strip())
+    waypoints = waypoints[:MAX_ROUTE_WAYPOINTS]
+
+    if not waypoints:
+        return None
+    if len(waypoints) == 1:
+        return f"https://www.google.com/maps/search/?api=1&query={quote_plus(waypoints[0])}"
+
+    url = (f"https://www.google.com/maps/dir/?api=1&origin={quote_plus(waypoints[0])}"
+           f"&destination={quote_plus(waypoints[-1])}&travelmode=walking")
+    if len(waypoints) > 2:
+        url += f"&waypoints={quote_plus('|'.join(waypoints[1:-1]))}"
+    return url
+
+
+def restaurant_maps_url(restaurant: Dict) -> str:
+    """Google Maps link for a restaurant: place_id when known, else name + city search"""
+    name = restaurant.get('name', 'Restaurant')
+    place_id = restaurant.get('place_id')
+    if place_id:
+        return f"https://www.google.com/maps/search/?api=1&query={quote_plus(name)}&query_place_id={place_id}"
+    search_query = f"{name} {restaurant.get('city', '')}".strip()
+    return f"https://www.google.com/maps/search/?api=1&query={quote_plus(search_query)}"
+
+
+def _city_entry(city):
+    from document_generator import get_city_prefix, get_city_tips, normalize_city_name
+    from youtube_helper import get_video_for_city
+
+    key = normalize_city_name(city)
+    try:
+        videos = get_video_for_city(city, max_videos=1)
+    except Exception as e:
+        print(f"⚠️ Could not look up YouTube video for {city}: {e}")
+        videos = []
+    return CityEntry(
+        name=city,
+        key=key,
+        description=get_city_prefix(key),
+        tips=tuple(get_city_tips(key)),
+        video=videos[0] if videos else None,
+        video_search_url=f"https://www.youtube.com/results?search_query={quote_plus(f'{city} Spain travel guide 4K')}",
+    )
+
+
+def _poi_entry(attr):
+    from document_generator import get_poi_description_fallback, get_poi_tip
+    from photo_manifest import get_photo_path
+
+    name = attr.get('name', '?')
+    title = name + ' ⭐' if attr.get('is_must_see_attraction') else name
+    description = attr.get('description')
+    if not description or description.strip() == '':
+        description = get_poi_description_fallback(title, attr.get('category'))
+    return PoiEntry(
+        poi=attr,
+        name=name,
+        title=title,
+        photo_path=get_photo_path(attr),
+        description=description,
+        tip=get_poi_tip(title),
+    )
+
+
+def _stay_dates(day, index, start_date):
+    """(checkin, checkout) for the first day in a city: day date, else start_date + index"""
+    if day.get('day_in_city', 1) != 1:
+        return None, None
+    checkin = as_date(day.get('date_obj')) or as_date(day.get('date'))
+    if checkin is None and start_date:
+        checkin = start_date + timedelta(days=index)
+    if checkin is None:
+        return None, None
+    return checkin, checkin + timedelta(days=day.get('total_days_in_city', 1))
+
+
+def _day_events(day, city, all_events):
+    """Events on the day or its stops, else the trip events mentioning the city"""
+    events = day.get('events', [])
+    if not events:
+        for city_stop in day.get('cities', []):
+            if city_stop.get('events'):
+                events = city_stop['events']
+                break
+    if not events and all_events:
+        city_lower = city.lower()
+        events = [e for e in all_events if city_lower in str(e.get('city', '')).lower()
+                  or city_lower in str(e.get('location', '')).lower()]
+    return tuple(events)
+
+
+def build_document_model(itinerary: List[Dict], result: Optional[Dict] = None, start_date=None) -> DocumentModel:
+    """
+    Resolve an itinerary for export (uncached - see get_document_model).
+
+    Args:
+        itinerary: Itinerary days (copied - later edits do not leak into the model)
+        result: Trip result dict (start_date, events)
+        start_date: Trip start; overrides result['start_date']
+
+    Returns:
+        DocumentModel
+    """
+    from document_generator import generate_daily_map_url, get_hotel_booking_link, normalize_city_name
+
+    itinerary = copy.deepcopy(itinerary)
+    result = result or {}
+    start_date = as_date(start_date if start_date is not None else result.get('start_date'))
+    all_events = tuple(result.get('events', []) or result.get('seasonal_events', []) or [])
+
+    by_number = {}
+    for day in itinerary:
+        by_number.setdefault(day.get('day'), day)
+
+    cities = {}
+    days = []
+    for index, day in enumerate(itinerary):
+        city = day.get('city', '?')
+        city_key = normalize_city_name(city)
+        first_visit = city_key not in cities
+        if first_visit:
+            cities[city_key] = _city_entry(city)
+
+        number = day.get('day', 0)
+        overnight = day.get('overnight_city', city)
+        is_circular_return = index == len(itinerary) - 1 and city != overnight
+
+        # Older itineraries keep the attractions on the day itself
+        city_stops = day.get('cities') or [{'city': city, 'attractions': day.get('attractions', [])}]
+        stops = tuple(
+            StopEntry(
+                city=city_stop.get('city', city),
+                pois=tuple(_poi_entry(attr) for attr in city_stop.get('attractions', [])),
+            )
+            for city_stop in city_stops
+        )
+
+        restaurants = tuple(
+            RestaurantEntry(meal, restaurant, restaurant.get('name', 'Restaurant'), restaurant_maps_url(restaurant))
+            for meal, restaurant in (('Lunch', day.get('lunch_restaurant')), ('Dinner', day.get('dinner_restaurant')))
+            if restaurant
+        )
+
+        # Driving route starts from the previous day's overnight city
+        previous = by_number.get(number - 1) if number > 1 else None
+        prev_city = previous and (previous.get('overnight_city') or previous.get('city'))
+        attractions = [poi.poi for stop in stops for poi in stop.pois]
+        route_url = None
+        if attractions or restaurants:
+            route_url = generate_daily_map_url(
+                prev_city,
+                city,
+                attractions,
+                [r.restaurant for r in restaurants],
+                is_circular=is_circular_return,
+                return_to_city=overnight if is_circular_return else None,
+            )
+
+        checkin, checkout = _stay_dates(day, index, start_date)
+        hotels = tuple(
+            HotelEntry(
+                hotel=hotel,
+                name=hotel['name'],
+                booking_url=get_hotel_booking_link(
+                    overnight, hotel_name=hotel['name'], checkin_date=checkin, checkout_date=checkout
+                ),
+            )
+            for hotel in day.get('hotels', [])[:3]
+            if hotel.get('name') and 'Hotels in' not in hotel['name']
+        )
+
+        days.append(DayEntry(
+            day=day,
+            index=index,
+            number=number,
+            city=city,
+            city_key=city_key,
+            overnight=overnight,
+            date=start_date + timedelta(days=number - 1) if start_date and number else None,
+            first_visit=first_visit,
+            is_circular_return=is_circular_return,
+            stops=stops,
+            route_url=route_url,
+            walking_route_url=walking_route_url(day),
+            checkin=checkin,
+            checkout=checkout,
+            hotels=hotels,
+            restaurants=restaurants,
+            events=_day_events(day, city, all_events),
+        ))
+
+    return DocumentModel(
+        key=document_model_key(itinerary, start_date, all_events),
+        start_date=start_date,
+        days=tuple(days),
+        cities=cities,
+        events=all_events,
+    )
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def document_model_key(itinerary, start_date=None, events=()) -> str:
+    """Content hash of everything the model is resolved from"""
+    payload = json.dumps([itinerary, start_date, events], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def get_document_model(itinerary: List[Dict], result: Optional[Dict] = None, start_date=None) -> DocumentModel:
+    """Resolved model for an itinerary, cached by content hash"""
+    result = result or {}
+    resolved_start = as_date(start_date if start_date is not None else result.get('start_date'))
+    events = tuple(result.get('events', []) or result.get('seasonal_events', []) or [])
+    key = document_model_key(itinerary, resolved_start, events)
+
+    with _LOCK:
+        model = _CACHE.get(key)
+        if model is not None:
+            _CACHE.move_to_end(key)
+            return model
+
+    model = build_document_model(itinerary, result, resolved_start)
+    put_document_model(model)
+    return model
+
+
+def put_document_model(model: DocumentModel):
+    """Seed this process's cache with a model resolved elsewhere (e.g. by a parent export process)"""
+    with _LOCK:
+        _CACHE[model.key] = model
+        _CACHE.move_to_end(model.key)
+        while len(_CACHE) > DOCUMENT_MODEL_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+
+def clear_document_models():
+    with _LOCK:
+        _CACHE.clear()
@@ -0,0 +1,289 @@
+"""
+Event Aggregator - concurrent event sources under one deadline
+
+Queries the Junta de Andalucía feed, Eventbrite (one request per city) and
+the curated festival list concurrently. Whatever has arrived when the
+deadline hits is returned (partial results). Slow requests keep running in
+the background and land in the events_service feed cache for the next call.
+
+Each remote source has a circuit breaker: after repeated failures or
+timeouts the source is skipped outright until a cool-down has passed.
+
+Usage:
+    from event_aggregator import EventAggregator
+    result = EventAggregator(deadline=4.0).collect(["Granada", "Seville"], "2026-06-15", "2026-06-22")
+    result.events      # merged, deduplicated, tier_1 first
+    result.partial     # True if a source timed out, failed or was skipped
+
+Offline: point junta_url / eventbrite_url at a local stub server
+(see benchmarks/events_stub_server.py).
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Iterable, List
+
+from events_service import (
+    eventbrite_token_configured,
+    get_curated_events_by_city,
+    load_eventbrite_events,
+    load_junta_index,
+)
+from text_norm import norm_key
+
+# Shared deadline for one aggregation (seconds)
+EVENTS_DEADLINE_SECONDS = 4.0
+
+# Consecutive failures/timeouts before a source is skipped, and for how long
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_SECONDS = 300
+
+# Blocking HTTP calls run here (not the loop's default executor, so asyncio.run()
+# does not wait for requests that outlived the deadline)
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='events')
+
+_BREAKERS = {}
+
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive failures.
+    Open → one trial call allowed after `reset_seconds` (half-open);
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """True if a call may be attempted now (only one trial while half-open)"""
+        state = self.state
+        if state == 'half-open':
+            # Re-arm: further calls wait for the trial's outcome
+            self.opened_at = time.monotonic()
+        return state != 'open'
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # Half-open trial failed, or threshold reached: (re)open
+            self.opened_at = time.monotonic()
+
+    def reset(self):
+        self.record_success()
+
+
+def get_breaker(source):
+    """Process-wide circuit breaker for a source name (created on first use)"""
+    breaker = _BREAKERS.get(source)
+    if breaker is None:
+        breaker = _BREAKERS[source] = CircuitBreaker()
+    return breaker
+
+
+def reset_breakers():
+    """Close all circuit breakers"""
+    for breaker in _BREAKERS.values():
+        breaker.reset()
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+@dataclass
+class SourceStatus:
+    """Outcome of one source request"""
+    source: str
+    ok: bool = False
+    skipped: bool = False      # Circuit breaker open
+    timed_out: bool = False    # Still running at the deadline
+    error: str = ''
+    elapsed: float = 0.0
+
+
+@dataclass
+class AggregatedEvents:
+    """Merged events plus per-request status"""
+    events: List[Dict] = field(default_factory=list)
+    by_city: Dict[str, List[Dict]] = field(default_factory=dict)
+    statuses: List[SourceStatus] = field(default_factory=list)
+
+    @property
+    def partial(self):
+        """True if any source did not contribute (timeout, error or open breaker)"""
+        return any(not status.ok for status in self.statuses)
+
+
+# ============================================================================
+# AGGREGATOR
+# ============================================================================
+
+class EventAggregator:
+    """Concurrent Junta + Eventbrite + curated lookup for a set of cities"""
+
+    def __init__(self, deadline=EVENTS_DEADLINE_SECONDS, eventbrite_token=None,
+                 junta_url=None, eventbrite_url=None, breakers=None, executor=None):
+        self.deadline = deadline
+        self.eventbrite_token = eventbrite_token
+        self.junta_url = junta_url
+        self.eventbrite_url = eventbrite_url
+        self.breakers = breakers if breakers is not None else {}
+        self.executor = executor or _EXECUTOR
+
+    def _breaker(self, source):
+        if source not in self.breakers:
+            self.breakers[source] = get_breaker(source)
+        return self.breakers[source]
+
+    async def _call(self, source, status, func):
+        """Run a blocking source call in the executor, updating status and breaker"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            value = await loop.run_in_executor(self.executor, func)
+        except Exception as e:
+            status.error = str(e) or type(e).__name__
+            self._breaker(source).record_failure()
+            raise
+        finally:
+            status.elapsed = time.perf_counter() - started
+        status.ok = True
+        self._breaker(source).record_success()
+        return value
+
+    async def gather(self, cities: Iterable[str], start_date: str, end_date: str) -> AggregatedEvents:
+        """
+        Query all sources concurrently; return what arrived before the deadline.
+
+        Args:
+            cities: City names
+            start_date: Trip start "YYYY-MM-DD"
+            end_date: Trip end "YYYY-MM-DD"
+
+        Returns:
+            AggregatedEvents
+        """
+        city_list = sorted({c for c in cities if c}, key=norm_key)
+        timeout = max(self.deadline, 0.1)
+        result = AggregatedEvents()
+        tasks = {}
+
+        def schedule(source, label, func):
+            status = SourceStatus(label)
+            result.statuses.append(status)
+            if not self._breaker(source).allow():
+                status.skipped = True
+                status.error = 'circuit open'
+                return
+            task = asyncio.ensure_future(self._call(source, status, func))
+            tasks[task] = (label, status)
+
+        schedule('junta', 'junta', partial(
+            load_junta_index, start_date, end_date, self.junta_url, timeout
+        ))
+        if eventbrite_token_configured(self.eventbrite_token):
+            for city in city_list:
+                schedule('eventbrite', f'eventbrite:{city}', partial(
+                    load_eventbrite_events, city, start_date, end_date,
+                    self.eventbrite_token, self.eventbrite_url, timeout
+                ))
+
+        # Curated festivals are local - no executor, no breaker
+        curated = get_curated_events_by_city(city_list, start_date, end_date)
+
+        done = set()
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            for task in pending:
+                label, status = tasks[task]
+                status.timed_out = True
+                status.error = f'deadline ({self.deadline:g}s)'
+                self._breaker(label.split(':')[0]).record_failure()
+                task.cancel()
+
+        junta_index = None
+        eventbrite = {}
+        for task in done:
+            if task.exception() is not None:
+                continue
+            label = tasks[task][0]
+            if label == 'junta':
+                junta_index = task.result()
+            else:
+                eventbrite[label.split(':', 1)[1]] = task.result()
+
+        per_city = {}
+        for city in city_list:
+            events = []
+            if junta_index is not None:
+                events.extend(dict(event) for event in junta_index.query(city, start_date, end_date))
+            events.extend(eventbrite.get(city, []))
+            events.extend(curated[city])
+            per_city[city] = merge_city_events(events)
+
+        result.by_city = per_city
+        result.events = merge_trip_events(per_city, city_list)
+        return result
+
+    def collect(self, cities: Iterable[str], start_date: str, end_date: str) -> AggregatedEvents:
+        """Synchronous gather() (safe to call from Streamlit scripts)"""
+        coro = self.gather(cities, start_date, end_date)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Already inside an event loop (e.g. a notebook): run on a helper thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, coro).result()
+
+
+def merge_city_events(events: List[Dict]) -> List[Dict]:
+    """One city's events: duplicates removed by name (first source wins), sorted by date"""
+    seen_names = set()
+    unique_events = []
+    for event in events:
+        name_lower = event['name'].lower()
+        if name_lower not in seen_names:
+            seen_names.add(name_lower)
+            unique_events.append(event)
+    unique_events.sort(key=lambda x: x.get('date', ''))
+    return unique_events
+
+
+def merge_trip_events(per_city: Dict[str, List[Dict]], city_order: List[str]) -> List[Dict]:
+    """All cities' merged events: deduplicated by (name, date), tier_1 first then by date"""
+    seen = set()
+    unique_events = []
+    for city in city_order:
+        for event in per_city.get(city, []):
+            key = (event.get('name'), event.get('date'))
+            if key not in seen:
+                seen.add(key)
+                unique_events.append(event)
+
+    tier_order = {'tier_1': 0, 'tier_2': 1, 'tier_3': 2}
+    unique_events.sort(key=lambda x: (tier_order.get(x.get('tier', 'tier_3'), 3), x.get('date', '')))
+    return unique_events
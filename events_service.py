@@ -1,14 +1,204 @@
 # Events Service for Andalusia Trip Planner
 # Uses FREE APIs to find events during user's trip
 
-import requests
+import hashlib
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import Iterable, List, Dict, Optional
+
+import requests
+
+from feed_cache import cached_fetch
+from text_norm import CITY_ALIASES, norm_key
+
+# ============================================================================
+# FEED CACHE + EVENT INDEX
+# ============================================================================
+
+# Remote feeds are fetched at most once per date window within this TTL
+FEED_TTL_SECONDS = 3600
+FEED_CACHE_SIZE = 128
+TRIP_EVENTS_CACHE_SIZE = 64
+
+_FEED_CACHE = OrderedDict()
+_TRIP_EVENTS_CACHE = OrderedDict()
+
+# Feeds may be stored from aggregator worker threads
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(cache, key, ttl):
+    """Value for key if cached less than ttl seconds ago, else None"""
+    with _CACHE_LOCK:
+        entry = cache.get(key)
+        if entry is None or time.time() - entry[0] >= ttl:
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(cache, key, value, max_size):
+    with _CACHE_LOCK:
+        cache[key] = (time.time(), value)
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+    return value
+
+
+def _token_digest(api_token: Optional[str]) -> str:
+    """Short hash of an API token for cache keys (the token itself is never stored)"""
+    if not api_token:
+        return ''
+    return hashlib.blake2b(api_token.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def clear_event_caches():
+    """Drop all cached feeds and per-trip results (forces re-download)"""
+    with _CACHE_LOCK:
+        _FEED_CACHE.clear()
+        _TRIP_EVENTS_CACHE.clear()
+
+
+class EventIndex:
+    """
+    Events indexed by municipality and date.
+
+    Each municipality keeps its events sorted by date, so a (city, date range)
+    lookup is a substring match over municipality names plus a bisect.
+    """
+
+    def __init__(self, events):
+        by_municipality = {}
+        for event in events:
+            key = norm_key(event.get('location', ''))
+            by_municipality.setdefault(key, []).append(event)
+
+        self._dates = {}
+        self._events = {}
+        for key, items in by_municipality.items():
+            items.sort(key=lambda ev: ev.get('date', ''))
+            self._dates[key] = [ev.get('date', '') for ev in items]
+            self._events[key] = items
+
+    def __len__(self):
+        return sum(len(items) for items in self._events.values())
+
+    def query(self, city, start_date, end_date):
+        """
+        Events in municipalities matching city (fuzzy) between two "YYYY-MM-DD" dates.
+
+        Returns:
+            list: Event dicts (shared - copy before modifying)
+        """
+        city_key = norm_key(city)
+        found = []
+        for key, dates in self._dates.items():
+            if city_key and city_key in key:
+                lo = bisect_left(dates, start_date)
+                hi = bisect_right(dates, end_date)
+                found.extend(self._events[key][lo:hi])
+        return found
+
 
 # ============================================================================
 # TIER 1: JUNTA DE ANDALUCÍA API (100% FREE FOREVER)
 # ============================================================================
 
+JUNTA_API_URL = "https://www.juntadeandalucia.es/datosabiertos/portal/api/3/action/datastore_search"
+
+# Resource ID for Junta events
+JUNTA_RESOURCE_ID = "d94fb9e3-f5c8-457e-9833-9067d6fa811e"  # JSON endpoint
+
+
+def fetch_junta_records(url: Optional[str] = None, timeout: float = 10) -> List[Dict]:
+    """
+    Download the raw Junta de Andalucía event records (one HTTP request).
+
+    Args:
+        url: Endpoint override (e.g. a local stub server); defaults to JUNTA_API_URL
+        timeout: Request timeout in seconds
+
+    Raises:
+        requests.RequestException / ValueError on network or payload errors
+    """
+    params = {
+        'resource_id': JUNTA_RESOURCE_ID,
+        'limit': 100  # Get up to 100 events
+    }
+    response = requests.get(url or JUNTA_API_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json().get('result', {}).get('records', [])
+
+
+def junta_events_from_records(records, start_date: str, end_date: str) -> List[Dict]:
+    """Convert raw Junta records to event dicts, keeping those within the date range"""
+    events = []
+    for record in records:
+        event_date_str = record.get('fecha_inicio', '')
+        event_city = record.get('municipio', '')
+
+        # Parse date (records with malformed dates are skipped)
+        try:
+            event_date = datetime.strptime(event_date_str, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except (TypeError, ValueError):
+            continue
+
+        # Check if event is during trip
+        if start_date <= event_date <= end_date:
+            events.append({
+                'name': record.get('titulo', 'Event'),
+                'date': event_date,
+                'location': event_city,
+                'description': record.get('descripcion', ''),
+                'type': 'Cultural',
+                'source': 'Junta de Andalucía',
+                'url': record.get('enlace', '')
+            })
+    return events
+
+
+def load_junta_index(start_date: str, end_date: str, url: Optional[str] = None,
+                     timeout: float = 10) -> EventIndex:
+    """
+    Junta events for a date window, indexed by municipality and date.
+
+    The index is built once per date window (cached FEED_TTL_SECONDS in
+    memory) from raw records kept in the disk feed cache.
+
+    Raises:
+        On download errors with no usable cached feed (nothing is cached then)
+    """
+    key = ('junta', url, start_date, end_date)
+    index = _cache_get(_FEED_CACHE, key, FEED_TTL_SECONDS)
+    if index is not None:
+        return index
+
+    # Raw records persist on disk (TTL + stale-while-revalidate, see feed_cache)
+    feed_key = f"datastore_search?resource_id={JUNTA_RESOURCE_ID}"
+    if url:
+        feed_key += f"|{url}"
+    records = cached_fetch(
+        'junta', feed_key,
+        lambda: fetch_junta_records(url, timeout)
+    )
+    index = EventIndex(junta_events_from_records(records, start_date, end_date))
+    return _cache_put(_FEED_CACHE, key, index, FEED_CACHE_SIZE)
+
+
+def get_junta_index(start_date: str, end_date: str) -> EventIndex:
+    """Like load_junta_index(), but returns an empty index on errors"""
+    try:
+        return load_junta_index(start_date, end_date)
+    except Exception as e:
+        print(f"⚠️ Error fetching Junta events: {e}")
+        return EventIndex([])
+
+
 def get_junta_events(city: str, start_date: str, end_date: str) -> List[Dict]:
     """
     Get official events from Junta de Andalucía Open Data
@@ -23,65 +213,91 @@ def get_junta_events(city: str, start_date: str, end_date: str) -> List[Dict]:
     - description
     - type
     """
-    
-    # Resource ID for Junta events
-    resource_id = "d94fb9e3-f5c8-457e-9833-9067d6fa811e"  # JSON endpoint
-    
-    url = "https://www.juntadeandalucia.es/datosabiertos/portal/api/3/action/datastore_search"
-    
-    try:
-        params = {
-            'resource_id': resource_id,
-            'limit': 100  # Get up to 100 events
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            records = data.get('result', {}).get('records', [])
-            
-            # Filter by date range and city
-            filtered_events = []
-            for record in records:
-                event_date_str = record.get('fecha_inicio', '')
-                event_city = record.get('municipio', '')
-                
-                # Parse date
-                try:
-                    event_date = datetime.strptime(event_date_str, '%Y-%m-%d')
-                    start = datetime.strptime(start_date, '%Y-%m-%d')
-                    end = datetime.strptime(end_date, '%Y-%m-%d')
-                    
-                    # Check if event is during trip
-                    if start <= event_date <= end:
-                        # Check if event is in this city (fuzzy match)
-                        if city.lower() in event_city.lower():
-                            filtered_events.append({
-                                'name': record.get('titulo', 'Event'),
-                                'date': event_date_str,
-                                'location': event_city,
-                                'description': record.get('descripcion', ''),
-                                'type': 'Cultural',
-                                'source': 'Junta de Andalucía',
-                                'url': record.get('enlace', '')
-                            })
-                except:
-                    continue
-            
-            return filtered_events
-    
-    except Exception as e:
-        print(f"⚠️ Error fetching Junta events: {e}")
-        return []
-    
-    return []
+    return [dict(event) for event in get_junta_index(start_date, end_date).query(city, start_date, end_date)]
 
 
 # ============================================================================
 # TIER 2: EVENTBRITE API (1,000 free requests/day)
 # ============================================================================
 
+EVENTBRITE_API_URL = "https://www.eventbriteapi.com/v3/events/search/"
+
+
+def fetch_eventbrite_events(city: str, start_date: str, end_date: str, api_token: str,
+                            url: Optional[str] = None, timeout: float = 10) -> List[Dict]:
+    """
+    Query Eventbrite for one city and date window (one HTTP request).
+
+    Args:
+        url: Endpoint override (e.g. a local stub server); defaults to EVENTBRITE_API_URL
+        timeout: Request timeout in seconds
+
+    Raises:
+        requests.RequestException / ValueError on network or payload errors
+    """
+    # Convert dates to ISO format
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+    
+    params = {
+        'location.address': f'{city}, Andalusia, Spain',
+        'start_date.range_start': start_dt.strftime('%Y-%m-%dT00:00:00'),
+        'start_date.range_end': end_dt.strftime('%Y-%m-%dT23:59:59'),
+        'expand': 'venue',
+        'sort_by': 'date'
+    }
+    
+    headers = {
+        'Authorization': f'Bearer {api_token}'
+    }
+    
+    response = requests.get(url or EVENTBRITE_API_URL, params=params, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    
+    events_list = []
+    for event in response.json().get('events', []):
+        events_list.append({
+            'name': event.get('name', {}).get('text', 'Event'),
+            'date': event.get('start', {}).get('local', '')[:10],
+            'location': city,
+            'description': (event.get('description', {}).get('text') or '')[:200] + '...',
+            'type': 'Event',
+            'source': 'Eventbrite',
+            'url': event.get('url', ''),
+            'is_free': event.get('is_free', False)
+        })
+    return events_list
+
+
+def load_eventbrite_events(city: str, start_date: str, end_date: str, api_token: str,
+                           url: Optional[str] = None, timeout: float = 10) -> List[Dict]:
+    """
+    Eventbrite events for one city and date window (memory cache for
+    FEED_TTL_SECONDS over the disk feed cache).
+
+    Raises:
+        On download errors with no usable cached feed (nothing is cached then)
+    """
+    token = _token_digest(api_token)
+    key = ('eventbrite', url, token, norm_key(city), start_date, end_date)
+    events = _cache_get(_FEED_CACHE, key, FEED_TTL_SECONDS)
+    if events is None:
+        feed_key = f"{norm_key(city)}|{start_date}|{end_date}|{token}"
+        if url:
+            feed_key += f"|{url}"
+        events = cached_fetch(
+            'eventbrite', feed_key,
+            lambda: fetch_eventbrite_events(city, start_date, end_date, api_token, url, timeout)
+        )
+        _cache_put(_FEED_CACHE, key, events, FEED_CACHE_SIZE)
+    return [dict(event) for event in events]
+
+
+def eventbrite_token_configured(api_token: Optional[str]) -> bool:
+    """True if an Eventbrite token was provided (not the placeholder)"""
+    return bool(api_token) and api_token != "YOUR_TOKEN_HERE"
+
+
 def get_eventbrite_events(city: str, start_date: str, end_date: str, api_token: str) -> List[Dict]:
     """
     Get events from Eventbrite API
@@ -89,58 +305,21 @@ def get_eventbrite_events(city: str, start_date: str, end_date: str, api_token:
     Sign up: https://www.eventbrite.com/platform/api
     Free tier: 1,000 requests/day
     
+    Responses are cached per (city, date window) for FEED_TTL_SECONDS.
+    
     Args:
         api_token: Your Eventbrite private token
     """
     
-    if not api_token or api_token == "YOUR_TOKEN_HERE":
+    if not eventbrite_token_configured(api_token):
         print("⚠️ Eventbrite API token not configured")
         return []
     
-    url = "https://www.eventbriteapi.com/v3/events/search/"
-    
     try:
-        # Convert dates to ISO format
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-        
-        params = {
-            'location.address': f'{city}, Andalusia, Spain',
-            'start_date.range_start': start_dt.strftime('%Y-%m-%dT00:00:00'),
-            'start_date.range_end': end_dt.strftime('%Y-%m-%dT23:59:59'),
-            'expand': 'venue',
-            'sort_by': 'date'
-        }
-        
-        headers = {
-            'Authorization': f'Bearer {api_token}'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            events_list = []
-            
-            for event in data.get('events', []):
-                events_list.append({
-                    'name': event.get('name', {}).get('text', 'Event'),
-                    'date': event.get('start', {}).get('local', '')[:10],
-                    'location': city,
-                    'description': event.get('description', {}).get('text', '')[:200] + '...',
-                    'type': 'Event',
-                    'source': 'Eventbrite',
-                    'url': event.get('url', ''),
-                    'is_free': event.get('is_free', False)
-                })
-            
-            return events_list
-        
+        return load_eventbrite_events(city, start_date, end_date, api_token)
     except Exception as e:
         print(f"⚠️ Error fetching Eventbrite events: {e}")
         return []
-    
-    return []
 
 
 # ============================================================================
@@ -416,64 +595,130 @@ CURATED_FESTIVALS = [
     }
 ]
 
-def get_curated_events(city: str, start_date: str, end_date: str) -> List[Dict]:
+def curated_city_id(city: str) -> str:
+    """Canonical city ID: accent/case-insensitive, aliases folded ("Jerez" → "jerez de la frontera")"""
+    key = norm_key(city)
+    return norm_key(CITY_ALIASES.get(key, key))
+
+
+class CuratedFestivalIndex:
     """
-    Check curated database of major festivals
-    
-    This is a fallback that always works, no API needed!
+    CURATED_FESTIVALS resolved for one year into date intervals.
+
+    Festivals are stored as (day-of-year start, day-of-year end) intervals,
+    sorted by start, globally and per canonical city ID. An overlap query is
+    a bisect on the start column, bounded by the longest festival duration.
+    """
+
+    def __init__(self, year: int, festivals=None):
+        festivals = CURATED_FESTIVALS if festivals is None else festivals
+        self.year = year
+        jan1 = datetime(year, 1, 1)
+
+        intervals = []
+        for festival in festivals:
+            # Estimate start day (week 1 = day 1, week 2 = day 8, etc.)
+            estimated_day = (festival['week'] - 1) * 7 + 1
+            try:
+                festival_start = datetime(year, festival['month'], estimated_day)
+            except ValueError:
+                continue
+            start_day = (festival_start - jan1).days
+            intervals.append((start_day, start_day + festival['duration'], curated_city_id(festival['city']), festival))
+
+        intervals.sort(key=lambda item: item[0])
+        self._starts = [item[0] for item in intervals]
+        self._intervals = intervals
+        self._max_duration = max((item[1] - item[0] for item in intervals), default=0)
+        self.city_ids = frozenset(item[2] for item in intervals)
+        self._jan1 = jan1
+
+    def query(self, start_dt: datetime, end_dt: datetime, city_ids=None):
+        """
+        Festivals overlapping [start_dt, end_dt] (inclusive), optionally limited to city IDs.
+
+        Returns:
+            list: (festival_start datetime, city_id, festival dict), by start date
+        """
+        first = (start_dt - self._jan1).days
+        last = (end_dt - self._jan1).days
+        lo = bisect_left(self._starts, first - self._max_duration)
+        hi = bisect_right(self._starts, last)
+
+        found = []
+        for start_day, end_day, city_id, festival in self._intervals[lo:hi]:
+            if end_day >= first and (city_ids is None or city_id in city_ids):
+                found.append((self._jan1 + timedelta(days=start_day), city_id, festival))
+        return found
+
+
+@lru_cache(maxsize=16)
+def get_curated_index(year: int) -> CuratedFestivalIndex:
+    """Year-specific curated festival index (cached)"""
+    return CuratedFestivalIndex(year)
+
+
+@lru_cache(maxsize=256)
+def _matching_curated_ids(city_id: str) -> frozenset:
+    """Curated city IDs that a (possibly partial) city ID refers to"""
+    festival_ids = {curated_city_id(festival['city']) for festival in CURATED_FESTIVALS}
+    return frozenset(fid for fid in festival_ids if city_id and (city_id in fid or fid in city_id))
+
+
+def _curated_event(festival_start: datetime, festival: Dict) -> Dict:
+    return {
+        'name': festival['name'],
+        'date': festival_start.strftime('%Y-%m-%d'),
+        'city': festival['city'],
+        'location': festival['city'],
+        'description': festival['description'],
+        'type': festival['type'],
+        'tier': festival.get('tier', 'tier_2'),
+        'source': 'Curated',
+        'duration': festival['duration']
+    }
+
+
+def get_curated_events_by_city(cities: Iterable[str], start_date: str, end_date: str) -> Dict[str, List[Dict]]:
     """
-    import unicodedata
+    Curated festivals for several cities with one range query per calendar year.
     
-    def normalize_city(name: str) -> str:
-        """Remove accents and lowercase for comparison"""
-        # Normalize unicode and remove accents
-        normalized = unicodedata.normalize('NFD', name)
-        without_accents = ''.join(c for c in normalized if unicodedata.category(c) != 'Mn')
-        return without_accents.lower()
+    Args:
+        cities: City names
+        start_date: Trip start "YYYY-MM-DD"
+        end_date: Trip end "YYYY-MM-DD"
     
+    Returns:
+        Dict of {city: events sorted by tier (tier_1 first) then date}
+    """
     start_dt = datetime.strptime(start_date, '%Y-%m-%d')
     end_dt = datetime.strptime(end_date, '%Y-%m-%d')
     
-    matching_events = []
+    wanted = {city: _matching_curated_ids(curated_city_id(city)) for city in cities}
+    all_ids = frozenset().union(*wanted.values()) if wanted else frozenset()
     
-    for festival in CURATED_FESTIVALS:
-        # Estimate festival dates (approximate)
-        festival_year = start_dt.year
-        festival_month = festival['month']
-        festival_week = festival['week']
-        
-        # Estimate start day (week 1 = day 1, week 2 = day 8, etc.)
-        estimated_day = (festival_week - 1) * 7 + 1
-        
-        try:
-            festival_start = datetime(festival_year, festival_month, estimated_day)
-            festival_end = festival_start + timedelta(days=festival['duration'])
-            
-            # Check if festival overlaps with trip
-            if (festival_start <= end_dt and festival_end >= start_dt):
-                # Check if city matches (normalized for accents)
-                city_norm = normalize_city(city)
-                festival_city_norm = normalize_city(festival['city'])
-                if city_norm in festival_city_norm or festival_city_norm in city_norm or ('jerez' in city_norm and 'jerez' in festival_city_norm):
-                    matching_events.append({
-                        'name': festival['name'],
-                        'date': festival_start.strftime('%Y-%m-%d'),
-                        'city': festival['city'],
-                        'location': festival['city'],
-                        'description': festival['description'],
-                        'type': festival['type'],
-                        'tier': festival.get('tier', 'tier_2'),
-                        'source': 'Curated',
-                        'duration': festival['duration']
-                    })
-        except:
-            continue
+    # Previous year too: a festival may start before January 1st and run into the trip
+    found = []
+    for year in range(start_dt.year - 1, end_dt.year + 1):
+        found.extend(get_curated_index(year).query(start_dt, end_dt, all_ids))
     
-    # Sort by tier (tier_1 first) then date
     tier_order = {'tier_1': 0, 'tier_2': 1, 'tier_3': 2}
-    matching_events.sort(key=lambda x: (tier_order.get(x.get('tier', 'tier_3'), 3), x.get('date', '')))
+    by_city = {}
+    for city, ids in wanted.items():
+        events = [_curated_event(festival_start, festival) for festival_start, city_id, festival in found if city_id in ids]
+        # Sort by tier (tier_1 first) then date
+        events.sort(key=lambda x: (tier_order.get(x.get('tier', 'tier_3'), 3), x.get('date', '')))
+        by_city[city] = events
+    return by_city
+
+
+def get_curated_events(city: str, start_date: str, end_date: str) -> List[Dict]:
+    """
+    Check curated database of major festivals
     
-    return matching_events
+    This is a fallback that always works, no API needed!
+    """
+    return get_curated_events_by_city([city], start_date, end_date)[city]
 
 
 # ============================================================================
@@ -485,6 +730,8 @@ def get_events_for_trip(city: str, start_date: str, end_date: str,
     """
     Get all events during the trip using multiple sources
     
+    Sources are queried concurrently under a shared deadline (see event_aggregator).
+    
     Args:
         city: City name (e.g., "Granada")
         start_date: Trip start "YYYY-MM-DD"
@@ -494,36 +741,44 @@ def get_events_for_trip(city: str, start_date: str, end_date: str,
     Returns:
         List of events sorted by date
     """
+    from event_aggregator import EventAggregator
     
-    all_events = []
-    
-    # Tier 1: Official government events (always try first)
-    junta_events = get_junta_events(city, start_date, end_date)
-    all_events.extend(junta_events)
+    result = EventAggregator(eventbrite_token=eventbrite_token).collect([city], start_date, end_date)
+    return next(iter(result.by_city.values()), [])
+
+
+def get_trip_events(cities: Iterable[str], start_date: str, end_date: str,
+                    eventbrite_token: Optional[str] = None) -> List[Dict]:
+    """
+    Get all events for a whole trip (every city at once).
     
-    # Tier 2: Eventbrite (if token provided)
-    if eventbrite_token:
-        eventbrite_events = get_eventbrite_events(city, start_date, end_date, eventbrite_token)
-        all_events.extend(eventbrite_events)
+    All sources are queried concurrently under one deadline; each remote feed
+    is fetched once per date window and queried per city through its index.
+    Complete results are cached per (cities, dates); partial ones (a source
+    timed out or failed) are not, so the next call picks up late feeds.
     
-    # Tier 3: Curated festivals (always check)
-    curated_events = get_curated_events(city, start_date, end_date)
-    all_events.extend(curated_events)
+    Args:
+        cities: City names to check (route cities, major cities, ...)
+        start_date: Trip start "YYYY-MM-DD"
+        end_date: Trip end "YYYY-MM-DD"
+        eventbrite_token: Optional Eventbrite API token
     
-    # Remove duplicates (by name)
-    seen_names = set()
-    unique_events = []
-    for event in all_events:
-        name_lower = event['name'].lower()
-        if name_lower not in seen_names:
-            seen_names.add(name_lower)
-            unique_events.append(event)
+    Returns:
+        List of events (deduplicated by name and date), tier_1 first then by date
+    """
+    from event_aggregator import EventAggregator
     
-    # Sort by date
-    unique_events.sort(key=lambda x: x.get('date', ''))
+    city_list = sorted({c for c in cities if c}, key=norm_key)
+    key = (tuple(norm_key(c) for c in city_list), start_date, end_date, _token_digest(eventbrite_token))
     
+    cached = _cache_get(_TRIP_EVENTS_CACHE, key, FEED_TTL_SECONDS)
+    if cached is not None:
+        return [dict(event) for event in cached]
     
-    return unique_events
+    result = EventAggregator(eventbrite_token=eventbrite_token).collect(city_list, start_date, end_date)
+    if not result.partial:
+        _cache_put(_TRIP_EVENTS_CACHE, key, result.events, TRIP_EVENTS_CACHE_SIZE)
+    return [dict(event) for event in result.events]
 
 
 # ============================================================================
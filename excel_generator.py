@@ -0,0 +1,76 @@
+"""
+Excel Generator for Andalusia Travel App
+Builds the day-by-day itinerary spreadsheet (Itinerary + Summary sheets)
+"""
+
+
+def build_excel(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, is_car_mode=False, result=None):
+    """Build Excel export with car-specific columns"""
+    import pandas as pd
+    import io
+    from document_model import get_document_model
+    
+    # Same resolved model as the Word/PDF exports (cached per itinerary)
+    model = get_document_model(itinerary, result=result)
+    
+    rows = []
+    for entry in model.days:
+        d = entry.day
+        day_type = d.get("type", "base_city")
+        city_visited = d.get("city", "?")
+        base = d.get("base", city_visited)
+        
+        poi_names = ", ".join(poi.name for poi in entry.pois if poi.poi.get("name"))
+        hotel_names = ", ".join(h.get("name") or "?" for h in d.get("hotels", []) if h.get("name"))
+        
+        meals = {r.meal: r.restaurant.get("name", "") for r in entry.restaurants}
+        lunch_name = meals.get("Lunch", "")
+        dinner_name = meals.get("Dinner", "")
+        
+        driving_km = d.get("driving_km", 0)
+        driving_hours = d.get("driving_hours", 0)
+        
+        row_data = {
+            "Day": d["day"],
+            "City": city_visited,
+            "POIs": poi_names,
+            "Hotels": hotel_names,
+            "Lunch": lunch_name,
+            "Dinner": dinner_name
+        }
+        
+        if is_car_mode:
+            row_data["Type"] = day_type.replace("_", " ").title()
+            row_data["Base"] = base
+            row_data["Driving (km)"] = driving_km
+            row_data["Drive Time (h)"] = driving_hours
+        
+        rows.append(row_data)
+    
+    df = pd.DataFrame(rows)
+    
+    # Reorder columns for car mode
+    if is_car_mode:
+        col_order = ["Day", "Type", "Base", "City", "Driving (km)", "Drive Time (h)", "POIs", "Hotels", "Lunch", "Dinner"]
+        df = df[[c for c in col_order if c in df.columns]]
+    
+    bio = io.BytesIO()
+    with pd.ExcelWriter(bio, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Itinerary")
+        
+        # Summary sheet
+        summary_data = {
+            "Trip Type": ["Road Trip (Car)" if is_car_mode else "Walking/Transit"],
+            "Start": [ordered_cities[0] if ordered_cities else "?"],
+            "End": [ordered_cities[-1] if len(ordered_cities) > 1 else ordered_cities[0]],
+            "Days": [days],
+            "Base Cities": [len(ordered_cities) if is_car_mode else "N/A"],
+            "Total Driving (km)": [sum(d.get('driving_km', 0) for d in itinerary)] if is_car_mode else ["N/A"],
+            "Budget": [prefs.get("budget", "?")],
+            "Pace": [prefs.get("pace", "?")]
+        }
+        summary_df = pd.DataFrame(summary_data)
+        summary_df.to_excel(writer, index=False, sheet_name="Summary")
+    
+    bio.seek(0)
+    return bio
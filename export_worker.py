@@ -0,0 +1,626 @@
+"""
+Export Worker - PDF, Word and slideshow generation off the Streamlit thread
+
+Exports run in separate worker processes, so a long export neither blocks
+the page nor competes with other users for the Streamlit process's GIL.
+- each worker is a fresh interpreter running this module
+  (`python -m export_worker`), so it never re-imports the app script and the
+  server's own __main__ is left alone
+- at most EXPORT_MAX_WORKERS exports run at once; others wait in a queue
+- identical requests (same kind + same itinerary data) share one job
+- workers report progress (pages, days or frames done) back to the queue
+- a job can be cancelled, and is stopped when it exceeds its timeout
+  (the worker process is terminated, so a 30-day slideshow cannot hold a
+  slot forever)
+- finished results are kept as bytes for download
+- a 'bundle' job renders several formats side by side (one child process
+  per format, all from one resolved document model) and streams the files
+  into a single ZIP as each one finishes
+
+Usage:
+    from export_worker import get_export_queue
+    job = get_export_queue().submit('pdf', itinerary=..., hop_kms=..., ...)
+    job.status, job.fraction        # poll from the UI
+    job.result                      # bytes, once job.status == 'done'
+    get_export_queue().cancel(job.job_id)
+    get_export_queue().submit('pdf', resubmit=True, ...)   # retry after failure/cancel
+
+    # Everything in one ZIP (slideshow optional)
+    job = get_export_queue().submit('bundle', formats=['xlsx', 'pdf', 'docx', 'slideshow'],
+                                    export=dict(itinerary=..., ...), slideshow=dict(result=...))
+"""
+
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.connection import Connection, wait as wait_connections
+from typing import Dict, Optional
+
+# Concurrent export processes (override with EXPORT_MAX_WORKERS)
+EXPORT_MAX_WORKERS = int(os.environ.get('EXPORT_MAX_WORKERS', '2'))
+
+# Per-kind time limits in seconds
+EXPORT_TIMEOUT_SECONDS = {
+    'pdf': 120,
+    'docx': 120,
+    'xlsx': 60,
+    'slideshow': 600,
+    'bundle': 660,
+}
+
+# Progress unit reported by each exporter
+EXPORT_UNITS = {
+    'pdf': 'pages',
+    'docx': 'days',
+    'xlsx': 'sheets',
+    'slideshow': 'frames',
+    'bundle': 'files',
+}
+
+# Bundle contents: default formats and the file name of each inside the ZIP
+BUNDLE_FORMATS = ('xlsx', 'pdf', 'docx')
+BUNDLE_FILENAMES = {
+    'xlsx': 'itinerary.xlsx',
+    'pdf': 'itinerary.pdf',
+    'docx': 'itinerary.docx',
+    'slideshow': 'slideshow.mp4',
+}
+
+# Bundle format processes are forked from the (single-threaded) bundle worker
+# after it has imported the exporters, so they start without re-importing
+BUNDLE_START_METHOD = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Modules imported for each bundle format before forking
+BUNDLE_PRELOAD = {
+    'pdf': ('pdf_generator',),
+    'docx': ('document_generator',),
+    'xlsx': ('excel_generator', 'pandas', 'xlsxwriter'),
+    'slideshow': ('poi_video_generator',),
+}
+
+# build_excel keywords (the shared export kwargs also carry parsed_requests)
+EXCEL_ARGS = ('itinerary', 'hop_kms', 'maps_link', 'ordered_cities', 'days', 'prefs', 'is_car_mode', 'result')
+
+# Directory of this module (put on the workers' PYTHONPATH for `python -m export_worker`)
+EXPORT_WORKER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Finished jobs kept for download / deduplication
+FINISHED_JOBS_KEPT = 32
+FINISHED_JOB_TTL_SECONDS = 1800
+
+FINISHED_STATES = ('done', 'failed', 'cancelled', 'timed_out')
+
+
+# ============================================================================
+# EXPORTERS (run inside the worker process)
+# ============================================================================
+
+def write_export(kind: str, kwargs: Dict, output_path: str, progress=None, workdir: str = None) -> str:
+    """
+    Produce one export in the current process and write it to output_path.
+
+    Args:
+        kind: 'pdf', 'docx', 'xlsx', 'slideshow' or 'bundle'
+        kwargs: Exporter arguments (build_pdf / build_word_doc / build_excel keywords;
+            for the slideshow: result, config (SlideshowConfig fields), photos_dir;
+            for a bundle: formats, export (shared exporter keywords), slideshow)
+        output_path: Where to write the file
+        progress: Optional callback(done, total=None)
+        workdir: Directory for intermediate files (slideshow, bundle)
+
+    Returns:
+        str: output_path
+    """
+    if kind == 'bundle':
+        return build_bundle(kwargs, output_path, progress, workdir)
+
+    if kind == 'slideshow':
+        from poi_video_generator import SlideshowConfig, generate_poi_slideshow
+        workdir = workdir or tempfile.mkdtemp(prefix='slideshow_')
+        config = SlideshowConfig(**(kwargs.get('config') or {}))
+        video_path = generate_poi_slideshow(
+            kwargs['result'], os.path.join(workdir, 'trip_slideshow.mp4'), config,
+            kwargs.get('photos_dir'), progress=progress
+        )
+        if not video_path or not os.path.exists(video_path):
+            raise RuntimeError("Slideshow generation failed (no photos or video writer unavailable)")
+        shutil.move(video_path, output_path)
+        return output_path
+
+    if kind == 'pdf':
+        from pdf_generator import build_pdf
+        buffer = build_pdf(**kwargs, progress=progress)
+    elif kind == 'docx':
+        from document_generator import build_word_doc
+        buffer = build_word_doc(**kwargs, progress=progress)
+    elif kind == 'xlsx':
+        from excel_generator import build_excel
+        buffer = build_excel(**{key: kwargs[key] for key in EXCEL_ARGS if key in kwargs})
+    else:
+        raise ValueError(f"Unknown export kind: {kind}")
+
+    with open(output_path, 'wb') as f:
+        f.write(buffer.getbuffer())
+    return output_path
+
+
+def run_export(kind: str, kwargs: Dict, progress=None, workdir: str = None) -> bytes:
+    """write_export() into a scratch directory and return the file's bytes"""
+    scratch = tempfile.mkdtemp(prefix=f'export_{kind}_')
+    try:
+        output_path = write_export(kind, kwargs, os.path.join(scratch, 'output'), progress, workdir or scratch)
+        with open(output_path, 'rb') as f:
+            return f.read()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+# ============================================================================
+# BUNDLE (all formats in one ZIP)
+# ============================================================================
+
+def _bundle_member_kwargs(kind, kwargs):
+    export_kwargs = kwargs.get('export') or {}
+    if kind != 'slideshow':
+        return export_kwargs
+    slideshow_kwargs = dict(kwargs.get('slideshow') or {})
+    slideshow_kwargs.setdefault('result', {'itinerary': export_kwargs.get('itinerary', [])})
+    return slideshow_kwargs
+
+
+def _default_terminate():
+    """Bundle child initializer: forked children inherit the bundle's SIGTERM handler; restore the default"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _bundle_member(kind, kwargs, output_path, model):
+    """Bundle child process: render one format from the parent's resolved document model"""
+    if model is not None:
+        from document_model import put_document_model
+        put_document_model(model)
+    workdir = os.path.join(os.path.dirname(output_path), f'{kind}_work')
+    os.makedirs(workdir, exist_ok=True)
+    return write_export(kind, kwargs, output_path, workdir=workdir)
+
+
+def build_bundle(kwargs: Dict, output_path: str, progress=None, workdir: str = None) -> str:
+    """
+    Render several formats concurrently and stream them into one ZIP.
+
+    The itinerary is resolved and the exporters imported once here; each
+    format then renders in its own forked child process (so the CPU-bound PDF
+    and Word builders really run in parallel) and writes its file to disk. Files are added to the ZIP as they
+    finish and deleted right after, so no process ever holds all artifacts.
+    Already-compressed formats are stored, not deflated again.
+
+    A format that fails is listed in export_errors.txt instead of failing the
+    whole bundle (e.g. no video writer for the slideshow).
+
+    Args:
+        kwargs: formats (default BUNDLE_FORMATS), export (shared exporter keywords),
+            slideshow (slideshow keywords, default: the export itinerary)
+        output_path: ZIP file to write
+        progress: Optional callback(files_done, files_total)
+        workdir: Directory for the per-format files
+
+    Returns:
+        str: output_path
+    """
+    formats = [kind for kind in (kwargs.get('formats') or BUNDLE_FORMATS) if kind in BUNDLE_FILENAMES]
+    if not formats:
+        raise ValueError("Bundle needs at least one of: " + ", ".join(BUNDLE_FILENAMES))
+    workdir = workdir or tempfile.mkdtemp(prefix='export_bundle_')
+    export_kwargs = kwargs.get('export') or {}
+
+    model = None
+    if set(formats) & {'pdf', 'docx', 'xlsx'}:
+        from document_model import get_document_model
+        model = get_document_model(export_kwargs['itinerary'], result=export_kwargs.get('result'))
+
+    import importlib
+    for kind in formats:
+        for module in BUNDLE_PRELOAD[kind]:
+            importlib.import_module(module)
+
+    if progress:
+        progress(0, len(formats))
+    pool = ProcessPoolExecutor(
+        max_workers=len(formats),
+        mp_context=multiprocessing.get_context(BUNDLE_START_METHOD),
+        initializer=_default_terminate,
+    )
+    errors = []
+    try:
+        futures = {
+            pool.submit(
+                _bundle_member, kind, _bundle_member_kwargs(kind, kwargs),
+                os.path.join(workdir, BUNDLE_FILENAMES[kind]), model,
+            ): kind
+            for kind in formats
+        }
+        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_STORED) as bundle:
+            for done, future in enumerate(as_completed(futures), 1):
+                kind = futures[future]
+                try:
+                    member_path = future.result()
+                except Exception as e:
+                    print(f"⚠️ Bundle: {kind} export failed: {e}")
+                    errors.append(f"{BUNDLE_FILENAMES[kind]}: {type(e).__name__}: {e}")
+                else:
+                    bundle.write(member_path, BUNDLE_FILENAMES[kind])
+                    os.remove(member_path)
+                if progress:
+                    progress(done, len(formats))
+            if len(errors) == len(formats):
+                raise RuntimeError("; ".join(errors))
+            if errors:
+                bundle.writestr('export_errors.txt', "\n".join(errors) + "\n")
+    except BaseException:
+        # Cancelled, timed out or failed: stop the format processes still rendering
+        for child in multiprocessing.active_children():
+            child.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return output_path
+
+
+def _exit_on_terminate(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _worker_main(kind, kwargs, workdir, conn):
+    """Worker process entry point: run the export, report over the pipe"""
+    def progress(done, total=None):
+        conn.send(('progress', done, total))
+
+    if kind == 'bundle':
+        # terminate() → SystemExit, so the bundle stops its format processes too
+        signal.signal(signal.SIGTERM, _exit_on_terminate)
+
+    try:
+        output_path = write_export(kind, kwargs, os.path.join(workdir, 'output'), progress, workdir)
+        conn.send(('done', output_path))
+    except BaseException as e:
+        conn.send(('error', f"{type(e).__name__}: {e}", traceback.format_exc(limit=5)))
+    finally:
+        conn.close()
+
+
+def _serve_worker(conn_fd):
+    """Worker process entry point (`python -m export_worker FD`): read the job from stdin and run it"""
+    kind, kwargs, workdir, sys_path = pickle.load(sys.stdin.buffer)
+    sys.path[:] = sys_path
+    _worker_main(kind, kwargs, workdir, Connection(int(conn_fd), readable=False))
+
+
+class WorkerProcess:
+    """
+    One export worker process: a fresh interpreter running this module.
+
+    Under Streamlit the server's __main__ is the app script (re-installed on
+    every rerun), which spawned multiprocessing workers would re-import and
+    run. Starting `python -m export_worker` instead gives the worker an
+    import-safe __main__ without touching the server's.
+    """
+
+    def __init__(self, command, kind, kwargs, workdir):
+        read_fd, write_fd = os.pipe()
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(p for p in (EXPORT_WORKER_DIR, env.get('PYTHONPATH')) if p)
+        try:
+            self._popen = subprocess.Popen(command + [str(write_fd)], stdin=subprocess.PIPE,
+                                           pass_fds=(write_fd,), env=env)
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self.conn = Connection(read_fd, writable=False)
+        try:
+            with self._popen.stdin as stdin:
+                pickle.dump((kind, kwargs, workdir, list(sys.path)), stdin, protocol=pickle.HIGHEST_PROTOCOL)
+        except BrokenPipeError:
+            pass    # Worker died on startup: the monitor sees it exit
+
+    @property
+    def exitcode(self):
+        return self._popen.poll()
+
+    def is_alive(self):
+        return self._popen.poll() is None
+
+    def terminate(self):
+        if self.is_alive():
+            self._popen.terminate()
+
+    def join(self, timeout=None):
+        try:
+            self._popen.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+def export_job_id(kind: str, kwargs: Dict) -> str:
+    """Stable ID for an export request: kind + hash of the (JSON-normalized) arguments"""
+    payload = json.dumps(kwargs, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=12).hexdigest()
+    return f"{kind}-{digest}"
+
+
+class ExportJob:
+    """State of one export, updated by the queue's monitor thread"""
+
+    def __init__(self, job_id, kind, kwargs, timeout):
+        self.job_id = job_id
+        self.kind = kind
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.unit = EXPORT_UNITS.get(kind, 'steps')
+        self.status = 'queued'
+        self.done = 0
+        self.total = None
+        self.result: Optional[bytes] = None
+        self.error = ''
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Worker bookkeeping (monitor thread only)
+        self._process = None
+        self._conn = None
+        self._workdir = None
+        self._stop_requested = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def fraction(self):
+        """Progress in [0, 1] (0 while the total is unknown)"""
+        if self.status == 'done':
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(1.0, self.done / self.total)
+
+    def describe(self):
+        """Short progress text for the UI"""
+        if self.status == 'queued':
+            return "Waiting for a free export slot..."
+        if self.status == 'running':
+            total = f"/{self.total}" if self.total else ""
+            return f"{self.done}{total} {self.unit}"
+        if self.status == 'failed':
+            return f"Failed: {self.error}"
+        return self.status.replace('_', ' ').capitalize()
+
+    def __repr__(self):
+        return f"ExportJob({self.job_id}, {self.status}, {self.describe()})"
+
+
+class ExportQueue:
+    """Bounded pool of export worker processes with a FIFO queue"""
+
+    def __init__(self, max_workers=EXPORT_MAX_WORKERS, timeouts=None):
+        self.max_workers = max(1, max_workers)
+        self.timeouts = dict(EXPORT_TIMEOUT_SECONDS, **(timeouts or {}))
+        # Worker command, fixed once: this module as the worker's __main__
+        self._command = [sys.executable, '-m', 'export_worker']
+        self._jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._queued = []
+        self._running = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._monitor = threading.Thread(target=self._monitor_loop, name='export-monitor', daemon=True)
+        self._monitor.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, timeout: float = None, resubmit: bool = False, **kwargs) -> ExportJob:
+        """
+        Queue an export, or return the existing job for the same request.
+
+        A failed, cancelled or timed-out job is returned as is (so a rerun
+        does not restart an export the user cancelled, or retry a failing
+        one forever); it is replaced by a fresh job only with resubmit=True
+        (an explicit retry).
+        """
+        if kind not in EXPORT_UNITS:
+            raise ValueError(f"Unknown export kind: {kind}")
+        job_id = export_job_id(kind, kwargs)
+        with self._lock:
+            self._forget_expired()
+            job = self._jobs.get(job_id)
+            if job is not None and not (resubmit and job.status in ('failed', 'cancelled', 'timed_out')):
+                self._jobs.move_to_end(job_id)
+                return job
+            job = ExportJob(job_id, kind, kwargs, timeout or self.timeouts.get(kind, 300))
+            self._jobs[job_id] = job
+            self._queued.append(job)
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job (the worker process is terminated)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            if job in self._queued:
+                self._queued.remove(job)
+                self._finish(job, 'cancelled')
+                return True
+            # Running: the monitor thread terminates the worker
+            job._stop_requested = 'cancelled'
+        self._wakeup.set()
+        return True
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self):
+        """Terminate running workers and stop the monitor thread"""
+        with self._lock:
+            queued, self._queued = self._queued, []
+            for job in queued:
+                self._finish(job, 'cancelled')
+            for job in self._running:
+                job._stop_requested = 'cancelled'
+        self._closed = True
+        self._wakeup.set()
+        self._monitor.join(timeout=10)
+
+    # ------------------------------------------------------------------
+    # Monitor thread
+    # ------------------------------------------------------------------
+
+    def _monitor_loop(self):
+        while True:
+            if self._closed:
+                with self._lock:
+                    running = list(self._running)
+                for job in running:
+                    self._stop(job, 'cancelled')
+                return
+
+            self._start_queued()
+
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+
+            ready = wait_connections([job._conn for job in running], timeout=0.2)
+            for job in running:
+                if job._conn in ready:
+                    self._receive(job)
+
+            now = time.time()
+            for job in running:
+                if job.finished:
+                    continue
+                if job._stop_requested:
+                    self._stop(job, job._stop_requested)
+                elif now - job.started_at > job.timeout:
+                    self._stop(job, 'timed_out', f"exceeded {job.timeout:g}s")
+                elif not job._process.is_alive() and not job._conn.poll():
+                    self._stop(job, 'failed', f"worker exited with code {job._process.exitcode}")
+
+    def _start_queued(self):
+        with self._lock:
+            while self._queued and len(self._running) < self.max_workers:
+                job = self._queued.pop(0)
+                job._workdir = tempfile.mkdtemp(prefix=f'export_{job.kind}_')
+                job.status = 'running'
+                job.started_at = time.time()
+                try:
+                    job._process = WorkerProcess(self._command, job.kind, job.kwargs, job._workdir)
+                except OSError as e:
+                    job.error = f"could not start worker: {e}"
+                    self._finish(job, 'failed')
+                    shutil.rmtree(job._workdir, ignore_errors=True)
+                    job._workdir = None
+                    continue
+                job._conn = job._process.conn
+                self._running.append(job)
+
+    def _receive(self, job):
+        """Drain messages from one worker"""
+        try:
+            while job._conn.poll():
+                message = job._conn.recv()
+                if message[0] == 'progress':
+                    job.done, job.total = message[1], message[2]
+                elif message[0] == 'done':
+                    with open(message[1], 'rb') as f:
+                        job.result = f.read()
+                    self._stop(job, 'done')
+                    return
+                elif message[0] == 'error':
+                    print(f"⚠️ Export {job.job_id} failed:\n{message[2]}")
+                    self._stop(job, 'failed', message[1])
+                    return
+        except (EOFError, OSError):
+            if not job.finished:
+                self._stop(job, 'failed', 'worker connection lost')
+
+    def _stop(self, job, status, error=''):
+        """End a running job: terminate its worker if needed, release its slot"""
+        process = job._process
+        if process is not None and process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
+        with self._lock:
+            if job in self._running:
+                self._running.remove(job)
+            if not job.finished:
+                job.error = error
+                self._finish(job, status)
+        if job._conn is not None:
+            job._conn.close()
+        if job._workdir:
+            shutil.rmtree(job._workdir, ignore_errors=True)
+        job._process = job._conn = job._workdir = None
+        self._wakeup.set()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+
+    def _forget_expired(self):
+        """Drop old finished jobs (and their result bytes); lock held"""
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished:
+            if now - job.finished_at > FINISHED_JOB_TTL_SECONDS:
+                del self._jobs[job.job_id]
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self._jobs[job.job_id]
+
+
+_QUEUE = {}
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_export_queue() -> ExportQueue:
+    """Process-wide export queue (shared by all Streamlit sessions)"""
+    with _QUEUE_LOCK:
+        if 'queue' not in _QUEUE:
+            _QUEUE['queue'] = ExportQueue()
+            # Workers are separate interpreters: stop them when the server exits
+            atexit.register(_QUEUE['queue'].shutdown)
+        return _QUEUE['queue']
+
+
+if __name__ == '__main__':
+    _serve_worker(sys.argv[1])
@@ -0,0 +1,245 @@
+"""
+Feed Cache - persistent TTL cache for remote event feeds
+
+Raw feed responses (Junta records, Eventbrite results) are stored as JSON
+files so a process restart or a Streamlit cache clear does not re-download
+them:
+- fresh entry (younger than the source TTL): served from disk
+- stale entry (older than the TTL, younger than STALE_MAX_AGE): served
+  immediately while a background thread refreshes it (stale-while-revalidate)
+- failed download with an older entry on disk: the older entry is served
+- offline snapshot mode: entries come from a captured snapshot file only,
+  the network is never touched
+
+Usage:
+    from feed_cache import cached_fetch
+    records = cached_fetch('junta', 'datastore_search', fetch_junta_records)
+
+    # Capture the current cache as a snapshot, then run offline from it
+    python feed_cache.py --capture event_feeds_snapshot.json
+    EVENTS_OFFLINE_SNAPSHOT=event_feeds_snapshot.json streamlit run app.py
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cache directory (override with EVENTS_FEED_CACHE_DIR)
+FEED_CACHE_DIR = os.environ.get('EVENTS_FEED_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'event_feeds'))
+
+# Per-source time-to-live in seconds (unknown sources use DEFAULT_TTL_SECONDS)
+SOURCE_TTL_SECONDS = {
+    'junta': 6 * 3600,
+    'eventbrite': 3600,
+}
+DEFAULT_TTL_SECONDS = 3600
+
+# Entries older than this are never served while online (refetched synchronously)
+STALE_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+_STATE = {
+    'cache_dir': FEED_CACHE_DIR,
+    'snapshot': None,       # {(source, key): data} when offline
+}
+_LOCK = threading.Lock()
+_REFRESHING = set()
+
+
+class OfflineFeedMissing(LookupError):
+    """Offline snapshot mode is on and the snapshot has no entry for this feed"""
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+def set_cache_dir(path):
+    """Use another cache directory (e.g. a temp dir in benchmarks)"""
+    _STATE['cache_dir'] = path
+
+
+def load_offline_snapshot(path):
+    """
+    Switch to offline snapshot mode: serve feeds only from a captured snapshot.
+
+    Args:
+        path: Snapshot file written by capture_snapshot()
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    _STATE['snapshot'] = {
+        (entry['source'], entry['key']): entry['data'] for entry in payload.get('entries', [])
+    }
+
+
+def disable_offline_snapshot():
+    """Leave offline snapshot mode"""
+    _STATE['snapshot'] = None
+
+
+def is_offline():
+    return _STATE['snapshot'] is not None
+
+
+# ============================================================================
+# DISK ENTRIES
+# ============================================================================
+
+def _entry_path(source, key):
+    digest = hashlib.blake2b(f"{source}|{key}".encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(_STATE['cache_dir'], source, f"{digest}.json")
+
+
+def read_entry(source, key):
+    """Cached entry {'source', 'key', 'fetched_at', 'data'} or None"""
+    try:
+        with open(_entry_path(source, key), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_entry(source, key, data):
+    """Store data for (source, key) atomically (write temp file, then rename)"""
+    path = _entry_path(source, key)
+    entry = {'source': source, 'key': key, 'fetched_at': time.time(), 'data': data}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not write feed cache {path}: {e}")
+    return entry
+
+
+def _refresh_in_background(source, key, fetch):
+    """Refetch (source, key) on a daemon thread, at most once at a time"""
+    with _LOCK:
+        if (source, key) in _REFRESHING:
+            return
+        _REFRESHING.add((source, key))
+
+    def run():
+        try:
+            write_entry(source, key, fetch())
+        except Exception as e:
+            print(f"⚠️ Background refresh of {source} feed failed: {e}")
+        finally:
+            with _LOCK:
+                _REFRESHING.discard((source, key))
+
+    threading.Thread(target=run, name=f"feed-refresh-{source}", daemon=True).start()
+
+
+# ============================================================================
+# PUBLIC API
+# ============================================================================
+
+def cached_fetch(source, key, fetch, ttl=None):
+    """
+    Feed data for (source, key) from the disk cache, fetching when needed.
+
+    Args:
+        source: Feed name ('junta', 'eventbrite', ...) - selects the TTL
+        key: String identifying the request within the source
+        fetch: Zero-argument callable returning JSON-serializable data (may raise)
+        ttl: Override of the source TTL in seconds
+
+    Returns:
+        Feed data
+
+    Raises:
+        OfflineFeedMissing: offline mode and no snapshot entry
+        Whatever fetch raises, when no usable entry is on disk
+    """
+    snapshot = _STATE['snapshot']
+    if snapshot is not None:
+        if (source, key) not in snapshot:
+            raise OfflineFeedMissing(f"No {source} feed for {key!r} in offline snapshot")
+        return snapshot[(source, key)]
+
+    ttl = SOURCE_TTL_SECONDS.get(source, DEFAULT_TTL_SECONDS) if ttl is None else ttl
+    entry = read_entry(source, key)
+    age = time.time() - entry['fetched_at'] if entry else None
+
+    if entry and age < ttl:
+        return entry['data']
+
+    if entry and age < STALE_MAX_AGE_SECONDS:
+        # Stale-while-revalidate: answer now, refresh for the next caller
+        _refresh_in_background(source, key, fetch)
+        return entry['data']
+
+    try:
+        return write_entry(source, key, fetch())['data']
+    except Exception:
+        if entry:
+            # Stale-if-error: an old feed beats no feed
+            return entry['data']
+        raise
+
+
+def capture_snapshot(path):
+    """
+    Write every cached feed entry to one snapshot file (for offline mode).
+
+    Returns:
+        int: Number of entries captured
+    """
+    entries = []
+    cache_dir = _STATE['cache_dir']
+    for root, _, files in os.walk(cache_dir):
+        for name in sorted(files):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.append({k: entry[k] for k in ('source', 'key', 'fetched_at', 'data')})
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'captured_at': time.time(), 'entries': entries}, f, ensure_ascii=False)
+    return len(entries)
+
+
+def clear_disk_cache():
+    """Delete all cached feed files"""
+    for root, _, files in os.walk(_STATE['cache_dir']):
+        for name in files:
+            if name.endswith('.json'):
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+
+
+# Offline mode from the environment (e.g. EVENTS_OFFLINE_SNAPSHOT=data/event_feeds_snapshot.json)
+if os.environ.get('EVENTS_OFFLINE_SNAPSHOT'):
+    try:
+        load_offline_snapshot(os.environ['EVENTS_OFFLINE_SNAPSHOT'])
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not load offline event snapshot: {e}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Event feed cache tools")
+    parser.add_argument('--capture', metavar='PATH', help="Write the current disk cache to a snapshot file")
+    parser.add_argument('--clear', action='store_true', help="Delete all cached feed files")
+    args = parser.parse_args()
+
+    if args.capture:
+        print(f"Captured {capture_snapshot(args.capture)} feed entries to {args.capture}")
+    if args.clear:
+        clear_disk_cache()
+        print(f"Cleared {_STATE['cache_dir']}")
@@ -0,0 +1,158 @@
+"""
+Slideshow frame compositor
+==========================
+
+Builds slideshow frames into buffers allocated once per video:
+- crossfades blend two frames into the output buffer (cv2.addWeighted with dst)
+- Ken Burns motion renders each frame with one affine warp from a slide's
+  pre-upscaled photo, then lays the static title overlay on top with
+  fixed-point alpha blending into preallocated scratch
+
+The returned frame is the compositor's own buffer: write it out (or copy it)
+before asking for the next one.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Ken Burns pan directions (fraction of the free space, from → to), cycled per slide
+PAN_PATHS = (
+    ((-0.5, -0.5), (0.5, 0.5)),
+    ((0.5, -0.5), (-0.5, 0.5)),
+    ((0.0, 0.5), (0.0, -0.5)),
+    ((-0.5, 0.0), (0.5, 0.0)),
+)
+
+
+# ============================================================================
+# SLIDES
+# ============================================================================
+
+@dataclass
+class Overlay:
+    """Static RGBA layer cropped to its visible box, prepared for fixed-point blending"""
+    box: Tuple[int, int, int, int]      # x0, y0, x1, y1
+    premultiplied: np.ndarray           # uint16 rgb * a (a in 0..256)
+    inverse_alpha: np.ndarray           # uint16 256 - a, same shape (no broadcasting per frame)
+
+    @classmethod
+    def from_rgba(cls, layer: np.ndarray) -> Optional['Overlay']:
+        alpha = layer[:, :, 3]
+        ys, xs = np.nonzero(alpha)
+        if not len(ys):
+            return None
+        y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        a = alpha[y0:y1, x0:x1].astype(np.uint16)[:, :, None]
+        a += a >> 7                                     # 0..255 → 0..256
+        premultiplied = layer[y0:y1, x0:x1, :3].astype(np.uint16) * a
+        inverse_alpha = np.ascontiguousarray(np.broadcast_to(256 - a, premultiplied.shape))
+        return cls((int(x0), int(y0), int(x1), int(y1)), premultiplied, inverse_alpha)
+
+
+@dataclass
+class Slide:
+    """
+    One prepared slide.
+
+    Static: `frame` is the finished RGB frame.
+    Moving (Ken Burns): `source` is the photo upscaled by the zoom factor,
+    `overlay` the title/map layer drawn on every frame, and zoom/pan go from
+    the *_from to the *_to values over the slide's frames.
+    """
+    frame: Optional[np.ndarray] = None
+    source: Optional[np.ndarray] = None
+    overlay: Optional[Overlay] = None
+    zoom_from: float = 1.0
+    zoom_to: float = 1.0
+    pan_from: Tuple[float, float] = (0.0, 0.0)
+    pan_to: Tuple[float, float] = (0.0, 0.0)
+
+    @property
+    def moving(self):
+        return self.source is not None
+
+    @classmethod
+    def ken_burns(cls, source: np.ndarray, overlay_layer: Optional[np.ndarray], index: int, zoom: float):
+        """Moving slide: alternately zooms in and out, panning along PAN_PATHS"""
+        pan_from, pan_to = PAN_PATHS[index % len(PAN_PATHS)]
+        zoom_from, zoom_to = (1.0, zoom) if index % 2 == 0 else (zoom, 1.0)
+        overlay = Overlay.from_rgba(overlay_layer) if overlay_layer is not None else None
+        return cls(source=np.ascontiguousarray(source), overlay=overlay, zoom_from=zoom_from,
+                   zoom_to=zoom_to, pan_from=pan_from, pan_to=pan_to)
+
+
+# ============================================================================
+# COMPOSITOR
+# ============================================================================
+
+class FrameCompositor:
+    """Frame buffers for one video size, reused for every frame"""
+
+    def __init__(self, width: int, height: int):
+        import cv2
+
+        self._cv2 = cv2
+        self.width = width
+        self.height = height
+        self.frame = np.empty((height, width, 3), np.uint8)        # Output
+        self._outgoing = np.empty_like(self.frame)                 # Crossfade sources (moving slides)
+        self._incoming = np.empty_like(self.frame)
+        self._matrix = np.zeros((2, 3), np.float64)
+        self._scratch = np.empty(height * width * 3, np.uint16)     # Overlay blending
+
+    def blend(self, a: np.ndarray, b: np.ndarray, alpha: float) -> np.ndarray:
+        """a → b crossfade at alpha (0..1), into the output buffer"""
+        self._cv2.addWeighted(a, 1.0 - alpha, b, alpha, 0.0, dst=self.frame)
+        return self.frame
+
+    def render(self, slide: Slide, progress: float, out: np.ndarray = None) -> np.ndarray:
+        """Slide at progress (0..1 over its frames); static slides return their frame as is"""
+        if not slide.moving:
+            return slide.frame
+        out = self.frame if out is None else out
+
+        # Viewport in source pixels: zoom 1 shows the whole (upscaled) source,
+        # zoom == source scale shows it 1:1
+        src_h, src_w = slide.source.shape[:2]
+        scale_max = src_w / self.width
+        zoom = slide.zoom_from + (slide.zoom_to - slide.zoom_from) * progress
+        view_w = src_w / zoom
+        view_h = src_h / zoom
+        pan_x = slide.pan_from[0] + (slide.pan_to[0] - slide.pan_from[0]) * progress
+        pan_y = slide.pan_from[1] + (slide.pan_to[1] - slide.pan_from[1]) * progress
+        x0 = (src_w - view_w) * (0.5 + pan_x)
+        y0 = (src_h - view_h) * (0.5 + pan_y)
+
+        # One affine warp: source → output
+        s = zoom / scale_max
+        m = self._matrix
+        m[0, 0] = m[1, 1] = s
+        m[0, 2] = -s * x0
+        m[1, 2] = -s * y0
+        self._cv2.warpAffine(slide.source, m, (self.width, self.height), dst=out,
+                             flags=self._cv2.INTER_LINEAR, borderMode=self._cv2.BORDER_REPLICATE)
+
+        if slide.overlay is not None:
+            self._apply_overlay(out, slide.overlay)
+        return out
+
+    def crossfade(self, outgoing: Slide, outgoing_progress: float, incoming: Slide,
+                  incoming_progress: float, alpha: float) -> np.ndarray:
+        """Transition frame between two (possibly moving) slides"""
+        a = self.render(outgoing, outgoing_progress, out=self._outgoing)
+        b = self.render(incoming, incoming_progress, out=self._incoming)
+        return self.blend(a, b, alpha)
+
+    def _apply_overlay(self, out, overlay: Overlay):
+        x0, y0, x1, y1 = overlay.box
+        region = out[y0:y1, x0:x1]
+        # Contiguous uint16 scratch: in-place ufuncs on strided or mixed-type
+        # operands would allocate iteration buffers
+        acc = self._scratch[:overlay.premultiplied.size].reshape(overlay.premultiplied.shape)
+        np.copyto(acc, region)
+        np.multiply(acc, overlay.inverse_alpha, out=acc)
+        np.add(acc, overlay.premultiplied, out=acc)
+        np.right_shift(acc, 8, out=acc)
+        np.copyto(region, acc, casting='unsafe')
@@ -5,15 +5,16 @@ WITH OPTIMIZED ROUTE ALGORITHM (No Backtracking!)
 
 import streamlit as st
 import math
+import numpy as np
 import unicodedata
-from collections import Counter
 from urllib.parse import quote_plus
 from text_norm import canonicalize_city, norm_key # ✅ NEW: Import text normalization
 # from semantic_merge import merge_city_pois # ⚠️ DISABLED: Too aggressive, removing valid POIs
 
 # ✅ NEW: Import weighted scoring and must-see landmarks
 from must_see_landmarks import is_must_see, get_must_see_count, get_missing_must_sees
-from weighted_poi_scoring import calculate_weighted_score, score_and_sort_pois
+from weighted_poi_scoring import score_and_sort_pois, scores_by_city
+from category_mapping import raw_category_codes
 
 
 # ============================================================================
@@ -328,21 +329,24 @@ def apply_diversity(pois, quota, max_same_category):
     if not pois:
         return []
     
-    # ✅ Calculate weighted scores for all POIs
+    # ✅ Calculate weighted scores for all POIs (cached ranking per city)
     # This prioritizes landmarks with high popularity over obscure 5-star venues
-    for poi in pois:
-        city_name = poi.get('city_label', poi.get('city', ''))
-        poi['weighted_score'] = calculate_weighted_score(poi, city_name)
+    scores = scores_by_city(pois)
+    for poi, score in zip(pois, scores.tolist()):
+        poi['weighted_score'] = score
+    
+    # ✅ Sort by weighted score (highest first, ties keep input order)
+    sorted_pois = [pois[i] for i in np.argsort(-scores, kind='stable')]
     
-    # ✅ Sort by weighted score (highest first)
-    sorted_pois = sorted(pois, key=lambda x: x.get('weighted_score', 0), reverse=True)
+    # ✅ Category caps run on integer codes (one per raw database category)
+    codes, n_categories = raw_category_codes(sorted_pois)
+    category_count = np.zeros(n_categories, dtype=np.int64)
     
     selected = []
-    category_count = Counter()
     total_duration = 0
     max_duration_minutes = 8 * 60 # 8 hours max sightseeing per day
     
-    for poi in sorted_pois:
+    for poi, category in zip(sorted_pois, codes):
         if len(selected) >= quota:
             break
         
@@ -350,8 +354,6 @@ def apply_diversity(pois, quota, max_same_category):
         if total_duration + duration > max_duration_minutes:
             continue
         
-        category = poi.get('category', 'Other')
-        
         if category_count[category] < max_same_category:
             selected.append(poi)
             category_count[category] += 1
@@ -5,23 +5,25 @@ WITH OPTIMIZED ROUTE ALGORITHM (No Backtracking!)
 
 import streamlit as st
 import math
+import numpy as np
 import unicodedata
 import json
 import os
-from collections import Counter
 from urllib.parse import quote_plus
-from text_norm import canonicalize_city, norm_key  # ✅ NEW: Import text normalization
+from city_registry import get_city_registry
 # from semantic_merge import merge_city_pois  # ⚠️ DISABLED: Too aggressive, removing valid POIs
 
 # ✅ NEW: Import weighted scoring and must-see landmarks
-from must_see_landmarks import is_must_see, get_must_see_count, get_missing_must_sees
-from weighted_poi_scoring import calculate_weighted_score, score_and_sort_pois
+from must_see_landmarks import is_must_see, get_must_see_count, get_missing_must_sees, poi_landmarks
+from weighted_poi_scoring import score_and_sort_pois, scores_by_city
+from category_mapping import category_filter_mask, raw_category_codes
+from special_requests import parse_special_requests
+from restaurant_service import RouteRestaurantAssigner
 
 # ✅ NEW: Import day allocation for recommended days per city
 try:
     from day_allocation import (
         allocate_days_for_route,
-        parse_user_duration_requests,
         get_recommended_days_for_city,
         get_allocation_summary,
         get_max_intermediate_cities,  # NEW: For route building
@@ -217,6 +219,12 @@ def cities_match(city1, city2):
     return False
 
 
+def _did_you_mean(city_registry, user_city):
+    """Suffix for 'city not found' errors with ranked suggestions (or empty)"""
+    suggestions = city_registry.suggest(user_city, limit=3)
+    return f". Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+
+
 def parse_start_end(text, trip_type):
     """Parse start and end cities from text input"""
     if not text:
@@ -532,21 +540,24 @@ def apply_diversity(pois, quota, max_same_category, city=None):
     if not pois:
         return []
     
-    # ✅ Calculate weighted scores for all POIs
+    # ✅ Calculate weighted scores for all POIs (cached ranking per city)
     # This prioritizes landmarks with high popularity over obscure 5-star venues
-    for poi in pois:
-        city_name = poi.get('city_label', poi.get('city', ''))
-        poi['weighted_score'] = calculate_weighted_score(poi, city_name)
+    scores = scores_by_city(pois)
+    for poi, score in zip(pois, scores.tolist()):
+        poi['weighted_score'] = score
     
-    # ✅ Sort by weighted score (highest first)
-    sorted_pois = sorted(pois, key=lambda x: x.get('weighted_score', 0), reverse=True)
+    # ✅ Sort by weighted score (highest first, ties keep input order)
+    sorted_pois = [pois[i] for i in np.argsort(-scores, kind='stable')]
+    
+    # ✅ Category caps run on integer codes (one per raw database category)
+    codes, n_categories = raw_category_codes(sorted_pois)
+    category_count = np.zeros(n_categories, dtype=np.int64)
     
     selected = []
-    category_count = Counter()
     total_duration = 0
     max_duration_minutes = 8 * 60  # 8 hours max sightseeing per day
     
-    for poi in sorted_pois:
+    for poi, category in zip(sorted_pois, codes):
         if len(selected) >= quota:
             break
         
@@ -554,8 +565,6 @@ def apply_diversity(pois, quota, max_same_category, city=None):
         if total_duration + duration > max_duration_minutes:
             continue
         
-        category = poi.get('category', 'Other')
-        
         if category_count[category] < max_same_category:
             selected.append(poi)
             category_count[category] += 1
@@ -1366,11 +1375,11 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
         known_cities.discard('')
         
         # Canonicalize base city
-        base_city_canonical = canonicalize_city(base_city, known_cities)
+        city_registry = get_city_registry(known_cities)
+        base_city_canonical = city_registry.canonicalize(base_city)
         
         if not base_city_canonical:
-            cities_list = ', '.join(sorted(known_cities)[:10])
-            st.error(f"❌ Base city '{base_city}' not found in data")
+            st.error(f"❌ Base city '{base_city}' not found in data{_did_you_mean(city_registry, base_city)}")
             return None
         
         # Route to Star/Hub generator
@@ -1395,17 +1404,17 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
         return None
     
     # ✅ NEW: Canonicalize city names to match dataset
-    start_city_canonical = canonicalize_city(start_city, known_cities)
-    end_city_canonical = canonicalize_city(end_city, known_cities) if end_city else None
+    city_registry = get_city_registry(known_cities)
+    start_city_canonical = city_registry.canonicalize(start_city)
+    end_city_canonical = city_registry.canonicalize(end_city) if end_city else None
     
     # ✅ NEW: Better error handling
     if not start_city_canonical:
-        cities_list = ', '.join(sorted(known_cities)[:10])
-        st.error(f"❌ Start city '{start_city}' not found in data")
+        st.error(f"❌ Start city '{start_city}' not found in data{_did_you_mean(city_registry, start_city)}")
         return None
     
     if end_city and not end_city_canonical:
-        st.error(f"❌ End city '{end_city}' not found in data")
+        st.error(f"❌ End city '{end_city}' not found in data{_did_you_mean(city_registry, end_city)}")
         return None
     
     # ✅ NEW: Use canonical names going forward
@@ -1493,15 +1502,9 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
     preferred_categories = prefs.get('poi_categories', [])
     if preferred_categories:
         # ✅ FIX: Use category mapping to match app UI categories to database categories
-        from category_mapping import get_database_categories_for_filter
-        
-        # Convert app UI categories (e.g. "history") to database categories (e.g. "Historic Site")
-        database_categories = get_database_categories_for_filter(preferred_categories)
-        database_categories_lower = [cat.lower() for cat in database_categories]
-        
-        
-        attractions_after_category = [a for a in attractions 
-                      if a.get('category', '').lower() in database_categories_lower]
+        # Preferred categories become one bitmask; POIs are matched by integer category code
+        keep = category_filter_mask(attractions, preferred_categories)
+        attractions_after_category = [a for a, ok in zip(attractions, keep) if ok]
         
         # ⚠️ Safety check: Don't over-filter!
         if len(attractions_after_category) < 200:
@@ -1565,47 +1568,17 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
     start_city_norm = normalize_city_name(start_city)
     end_city_norm = normalize_city_name(end_city) if end_city else None
     
-    # ✅ NEW: Parse special requests for avoid/must-see cities
-    notes = prefs.get('notes', '').lower()
-    avoid_cities = []
-    must_see_cities = []
-    
-    # Parse "avoid X" patterns
-    import re
-    avoid_patterns = [
-        r'avoid\s+([a-záéíóúñ\s]+?)(?:\s*[,.]|$)',
-        r'skip\s+([a-záéíóúñ\s]+?)(?:\s*[,.]|$)',
-        r'no\s+([a-záéíóúñ\s]+?)(?:\s*[,.]|$)',
-        r"don'?t\s+(?:go\s+to\s+|visit\s+)?([a-záéíóúñ\s]+?)(?:\s*[,.]|$)",
-    ]
-    for pattern in avoid_patterns:
-        matches = re.findall(pattern, notes)
-        for match in matches:
-            city = match.strip()
-            if city and len(city) > 2:
-                avoid_cities.append(city)
-                # print(f"🚫 User wants to avoid: {city}")
-    
-    # Parse "must see X" patterns
-    must_see_patterns = [
-        r'must\s+(?:see|visit)\s+([a-záéíóúñ\s]+?)(?:\s*[,.]|$)',
-        r'definitely\s+(?:see|visit)\s+([a-záéíóúñ\s]+?)(?:\s*[,.]|$)',
-        r'include\s+([a-záéíóúñ\s]+?)(?:\s*[,.]|$)',
-    ]
-    for pattern in must_see_patterns:
-        matches = re.findall(pattern, notes)
-        for match in matches:
-            city = match.strip()
-            if city and len(city) > 2:
-                must_see_cities.append(city)
-                # print(f"⭐ User must see: {city}")
+    # ✅ NEW: Parse special requests (avoid/must-see cities, stay durations) once
+    constraints = parse_special_requests(prefs.get('notes', ''), city_name_map.values())
+    avoid_cities = list(constraints.avoid_cities)
+    must_see_cities = list(constraints.must_see_cities)
     
     # ✅ NEW: Parse duration overrides BEFORE route optimization
     # to calculate if we need extra cities
     user_duration_overrides = {}
     extra_cities_needed = 0
     if DAY_ALLOCATION_AVAILABLE:
-        user_duration_overrides = parse_user_duration_requests(prefs.get('notes', ''))
+        user_duration_overrides = constraints.durations()
         if user_duration_overrides:
             # print(f"📅 User duration overrides: {user_duration_overrides}")
             
@@ -1677,6 +1650,9 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
     # Track which POIs have been used per city (for multi-day visits)
     used_pois_by_city = {}
     
+    # ✅ Route-aware restaurants: spatial index built once, no repeats across the trip
+    restaurant_assigner = RouteRestaurantAssigner(restaurants, prefs.get('budget', 'mid-range')) if restaurants else None
+    
     for i, city_norm in enumerate(route):
         city_original = city_name_map.get(city_norm, city_norm)
         
@@ -1788,9 +1764,10 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
                 if missing and len(missing) > 2:
                     # Try to force-add top missing landmark
                     if len(selected) < quota:
+                        missing_set = set(missing)
                         for poi in available_pois:
                             poi_name = poi.get('name', '')
-                            if any(m.lower() in poi_name.lower() for m in missing):
+                            if poi_landmarks(poi, city_original) & missing_set:
                                 selected.append(poi)
                                 used_pois_by_city[city_original].add(poi_name)
                                 break
@@ -1854,34 +1831,10 @@ def generate_simple_trip(start_end_text, days, prefs, trip_type, attractions, ho
                 # Not first day - no hotels to show (already booked)
                 top_hotels = []
             
-            # Get restaurants for this city
-            city_restaurants = []
-            if restaurants:
-                city_restaurants = [r for r in restaurants if cities_match(r.get("city", ""), city_original)]
-                
-                # Filter restaurants with few reviews
-                filtered_restaurants = []
-                for r in city_restaurants:
-                    reviews_count = r.get("reviews_count", 0) or r.get("user_ratings_total", 0)
-                    
-                    if reviews_count == 0:
-                        topic = r.get("topic", "")
-                        if topic:
-                            parts = topic.split()
-                            if parts and parts[0].isdigit():
-                                reviews_count = int(parts[0])
-                    
-                    if reviews_count == 0 or reviews_count >= 20:
-                        filtered_restaurants.append(r)
-                
-                top_restaurants = sorted(filtered_restaurants, key=lambda x: x.get("rating") or 0, reverse=True)
-            else:
-                top_restaurants = []
-            
-            # Vary restaurant selection for multi-day visits
-            restaurant_offset = day_in_city * 2
-            lunch_restaurant = top_restaurants[restaurant_offset] if len(top_restaurants) > restaurant_offset else None
-            dinner_restaurant = top_restaurants[restaurant_offset + 1] if len(top_restaurants) > restaurant_offset + 1 else None
+            # Lunch near the middle of the day's POI path, dinner near its end
+            lunch_restaurant = dinner_restaurant = None
+            if restaurant_assigner:
+                lunch_restaurant, dinner_restaurant = restaurant_assigner.assign_day(city_original, selected)
             
             # ✅ NEW: Get route stops for last day in city (when traveling to next city)
             route_stops = []
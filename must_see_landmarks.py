@@ -1,8 +1,17 @@
 """
 Must-see landmarks database for major Andalusian cities.
 Ensures world-famous attractions are prioritized in itineraries.
+
+The landmark lists are compiled at import into per-city lookup tables keyed
+by city name (exact match, like the MUST_SEE_LANDMARKS keys).
+compile_must_see_flags() resolves each POI's must-see status once when the
+dataset is loaded into a side table keyed by place_id, so runtime checks are
+dict lookups and missing-landmark checks are set differences. The POI dicts
+themselves are left untouched.
 """
 
+from functools import lru_cache
+
 MUST_SEE_LANDMARKS = {
     "Granada": [
         "Alhambra",
@@ -116,6 +125,101 @@ MUST_SEE_LANDMARKS = {
 }
 
 
+# ============================================================================
+# COMPILED LOOKUP TABLES
+# ============================================================================
+
+# city name → ((landmark, landmark_lower), ...)
+_COMPILED_LANDMARKS = {
+    city: tuple((landmark, landmark.lower()) for landmark in landmarks)
+    for city, landmarks in MUST_SEE_LANDMARKS.items()
+}
+
+# place_id → (city name, frozenset of matched landmarks), filled by compile_must_see_flags()
+_MUST_SEE_BY_PLACE = {}
+
+
+@lru_cache(maxsize=8192)
+def match_landmarks(poi_name, city_name):
+    """
+    Get the must-see landmarks of a city that a POI name matches.
+    
+    Args:
+        poi_name: Name of the POI
+        city_name: Name of the city
+    
+    Returns:
+        frozenset: Matched landmark names (empty if none or unknown city)
+    """
+    compiled = _COMPILED_LANDMARKS.get(city_name)
+    if not compiled or not poi_name:
+        return frozenset()
+    
+    poi_lower = poi_name.lower()
+    # Substring match (e.g., "Alhambra Palace" matches "Alhambra")
+    return frozenset(landmark for landmark, landmark_lower in compiled if landmark_lower in poi_lower)
+
+
+def compile_must_see_flags(pois):
+    """
+    Resolve must-see status for every POI once (run when the dataset is loaded).
+    
+    Results go to a side table keyed by place_id (replacing the previous
+    dataset's), so no fields are added to the POI dicts and nothing leaks
+    into itineraries, exports or saved trips. POIs without a place_id are
+    matched on demand (match_landmarks() is cached).
+    
+    Args:
+        pois: List of POI dictionaries with 'name' and 'city' fields
+    
+    Returns:
+        list: The same POI list (unchanged)
+    """
+    _MUST_SEE_BY_PLACE.clear()
+    for poi in pois:
+        place_id = poi.get('place_id')
+        if not place_id:
+            continue
+        city = poi.get('city_label', poi.get('city', ''))
+        _MUST_SEE_BY_PLACE[place_id] = (city, match_landmarks(poi.get('name', ''), city))
+    return pois
+
+
+def poi_landmarks(poi, city_name):
+    """
+    Get the must-see landmarks a POI dict covers, using compiled results when present.
+    
+    Args:
+        poi: POI dictionary
+        city_name: Name of the city
+    
+    Returns:
+        frozenset: Matched landmark names
+    """
+    compiled = _MUST_SEE_BY_PLACE.get(poi.get('place_id'))
+    if compiled is not None and compiled[0] == city_name:
+        return compiled[1]
+    return match_landmarks(poi.get('name', ''), city_name)
+
+
+def poi_is_must_see(poi, city_name):
+    """
+    Check if a POI dict is a must-see landmark (O(1) when compiled).
+    
+    Args:
+        poi: POI dictionary
+        city_name: Name of the city
+    
+    Returns:
+        bool: True if the POI is a must-see landmark
+    """
+    return bool(poi_landmarks(poi, city_name))
+
+
+# ============================================================================
+# PUBLIC HELPERS
+# ============================================================================
+
 def is_must_see(poi_name, city_name):
     """
     Check if a POI is a must-see landmark for the given city.
@@ -127,14 +231,7 @@ def is_must_see(poi_name, city_name):
     Returns:
         bool: True if the POI is a must-see landmark
     """
-    if city_name not in MUST_SEE_LANDMARKS:
-        return False
-    
-    landmarks = MUST_SEE_LANDMARKS[city_name]
-    poi_lower = poi_name.lower()
-    
-    # Check for substring matches (e.g., "Alhambra Palace" matches "Alhambra")
-    return any(landmark.lower() in poi_lower for landmark in landmarks)
+    return bool(match_landmarks(poi_name, city_name))
 
 
 def get_must_see_count(pois, city_name):
@@ -148,15 +245,10 @@ def get_must_see_count(pois, city_name):
     Returns:
         int: Number of must-see landmarks found
     """
-    if city_name not in MUST_SEE_LANDMARKS:
+    if city_name not in _COMPILED_LANDMARKS:
         return 0
     
-    count = 0
-    for poi in pois:
-        if is_must_see(poi.get('name', ''), city_name):
-            count += 1
-    
-    return count
+    return sum(1 for poi in pois if poi_is_must_see(poi, city_name))
 
 
 def get_missing_must_sees(pois, city_name):
@@ -170,18 +262,16 @@ def get_missing_must_sees(pois, city_name):
     Returns:
         list: Names of missing must-see landmarks
     """
-    if city_name not in MUST_SEE_LANDMARKS:
+    compiled = _COMPILED_LANDMARKS.get(city_name)
+    if not compiled:
         return []
     
-    included_names = [poi.get('name', '').lower() for poi in pois]
-    missing = []
-    
-    for landmark in MUST_SEE_LANDMARKS[city_name]:
-        landmark_found = any(landmark.lower() in name for name in included_names)
-        if not landmark_found:
-            missing.append(landmark)
+    covered = set()
+    for poi in pois:
+        covered |= poi_landmarks(poi, city_name)
     
-    return missing
+    # Set difference, keeping the landmark list order
+    return [landmark for landmark, _ in compiled if landmark not in covered]
 
 
 def get_city_landmarks(city_name):
@@ -4,11 +4,16 @@ Features: Photos, Colors, Hyperlinks, styled like the Word document
 """
 
 from fpdf import FPDF
-from datetime import datetime, timedelta
+from dataclasses import replace
+from datetime import timedelta
+from functools import lru_cache
+import contextvars
 import os
 import io
 from urllib.parse import quote_plus
 from poi_cards_pdf import render_poi_cards
+from document_model import as_date, get_document_model
+from photo_derivatives import DerivativeSpec, get_derivative, px
 
 # ============================================================================
 # CONFIGURATION
@@ -28,6 +33,34 @@ COLOR_HOTEL = (46, 204, 113)      # Green
 COLOR_FOOD = (230, 126, 34)       # Orange
 COLOR_ATTR = (155, 89, 182)       # Purple
 
+# Unicode text font (TrueType, embedded as a subset of the glyphs used).
+# PDF_FONT_PATH overrides the search; without any font the PDF falls back to
+# Helvetica and safe_text() transliterates to latin-1.
+PDF_FONT_PATH = os.environ.get('PDF_FONT_PATH')
+PDF_FONT_CANDIDATES = [
+    os.path.join(BASE_DIR, 'fonts', 'DejaVuSans.ttf'),
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf',
+]
+PDF_FONT_FAMILY = 'TripSans'
+# File name suffixes of the bold / italic variants next to the regular font
+FONT_STYLE_SUFFIXES = {
+    'B': ('-Bold', 'bd'),
+    'I': ('-Oblique', '-Italic', 'i'),
+    'BI': ('-BoldOblique', '-BoldItalic', 'bi', 'z'),
+}
+
+# Size budget: default target in MB (PDF_TARGET_SIZE_MB, unset = no budget) and
+# the JPEG qualities tried for embedded photos, best first
+PDF_TARGET_SIZE_MB = float(os.environ.get('PDF_TARGET_SIZE_MB', '0')) or None
+PDF_PHOTO_QUALITIES = (82, 72, 62, 52, 42, 32)
+
+# Set while a PDF with a Unicode font is rendered (safe_text keeps accents)
+_UNICODE_TEXT = contextvars.ContextVar('pdf_unicode_text', default=False)
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -38,69 +71,51 @@ def safe_text(text, max_length=300):
         return ""
     text = str(text)
     
-    # Replace problematic characters
-    replacements = {
-        "'": "'", "'": "'", "–": "-", "—": "-", 
-        """: '"', """: '"', "€": "EUR ", "…": "...",
-        "é": "e", "è": "e", "ê": "e", "ë": "e",
-        "á": "a", "à": "a", "â": "a", "ä": "a", "ã": "a",
-        "í": "i", "ì": "i", "î": "i", "ï": "i",
-        "ó": "o", "ò": "o", "ô": "o", "ö": "o", "õ": "o",
-        "ú": "u", "ù": "u", "û": "u", "ü": "u",
-        "ñ": "n", "ç": "c", "°": " deg",
-        "★": "*", "☆": "*", "●": "*", "•": "*",
-    }
-    for old, new in replacements.items():
+    # Symbols missing from most text fonts
+    for old, new in {"★": "*", "☆": "*", "●": "*", "•": "*"}.items():
         text = text.replace(old, new)
-    
-    # Encode to latin-1, replacing unknown chars
-    text = text.encode('latin-1', errors='replace').decode('latin-1')
+
+    if not _UNICODE_TEXT.get():
+        # Helvetica: replace problematic characters
+        replacements = {
+            "'": "'", "'": "'", "–": "-", "—": "-", 
+            """: '"', """: '"', "€": "EUR ", "…": "...",
+            "é": "e", "è": "e", "ê": "e", "ë": "e",
+            "á": "a", "à": "a", "â": "a", "ä": "a", "ã": "a",
+            "í": "i", "ì": "i", "î": "i", "ï": "i",
+            "ó": "o", "ò": "o", "ô": "o", "ö": "o", "õ": "o",
+            "ú": "u", "ù": "u", "û": "u", "ü": "u",
+            "ñ": "n", "ç": "c", "°": " deg",
+        }
+        for old, new in replacements.items():
+            text = text.replace(old, new)
+        
+        # Encode to latin-1, replacing unknown chars
+        text = text.encode('latin-1', errors='replace').decode('latin-1')
     
     if len(text) > max_length:
         return text[:max_length-3] + "..."
     return text
 
 
-def get_photo_path(attr):
-    """Find photo using same logic as Word generator"""
-    # 1. Try local_photo_path
-    if attr.get('local_photo_path'):
-        rel_path = attr['local_photo_path'].replace('\\', '/')
-        if os.path.isabs(rel_path):
-            full_path = rel_path
-        else:
-            # Try relative to DATA_DIR
-            full_path = os.path.join(DATA_DIR, rel_path)
-            if not os.path.exists(full_path):
-                # Try just the filename in PHOTOS_DIR
-                filename = os.path.basename(rel_path)
-                full_path = os.path.join(PHOTOS_DIR, filename)
-        
-        if os.path.exists(full_path):
-            return full_path
-
-    # 2. Try place_id
-    if attr.get('place_id'):
-        photo_filename = f"{attr['place_id']}.jpg"
-        full_path = os.path.join(PHOTOS_DIR, photo_filename)
-        if os.path.exists(full_path):
-            return full_path
-    
-    # 3. Try name-based filename
-    name = attr.get('name', '')
-    if name:
-        # Try various filename formats
-        for ext in ['.jpg', '.jpeg', '.png']:
-            # Try exact name
-            test_path = os.path.join(PHOTOS_DIR, f"{name}{ext}")
-            if os.path.exists(test_path):
-                return test_path
-            # Try normalized name
-            norm_name = name.lower().replace(' ', '_').replace("'", "")
-            test_path = os.path.join(PHOTOS_DIR, f"{norm_name}{ext}")
-            if os.path.exists(test_path):
-                return test_path
-
+@lru_cache(maxsize=8)
+def find_text_font(path=None):
+    """
+    Unicode TTF for the PDF text: {style: file} for '', and 'B' / 'I' / 'BI' when
+    the variants sit next to the regular file. None if no font is installed.
+    """
+    candidates = [path or PDF_FONT_PATH] if (path or PDF_FONT_PATH) else PDF_FONT_CANDIDATES
+    for regular in candidates:
+        if not regular or not os.path.isfile(regular):
+            continue
+        stem, ext = os.path.splitext(regular)
+        styles = {'': regular}
+        for style, suffixes in FONT_STYLE_SUFFIXES.items():
+            for suffix in suffixes:
+                if os.path.isfile(stem + suffix + ext):
+                    styles[style] = stem + suffix + ext
+                    break
+        return styles
     return None
 
 
@@ -109,10 +124,72 @@ def get_photo_path(attr):
 # ============================================================================
 
 class TravelPDF(FPDF):
-    def __init__(self):
+    def __init__(self, progress=None, photo_quality=None, text_font=None):
         super().__init__()
         self.set_auto_page_break(auto=True, margin=15)
         self.set_margins(15, 15, 15)
+        self.progress = progress  # Optional callback(pages_done, total=None)
+        self.photo_quality = photo_quality  # JPEG quality override for photos (size budget)
+        self.embedded_photos = {}  # Embedded file -> (original photo, spec), one image object each
+        self.photo_placements = 0
+
+        # Unicode font ({style: ttf} from find_text_font) replaces Helvetica
+        self.text_font = None
+        self.text_font_styles = ()
+        if text_font:
+            for style, path in text_font.items():
+                self.add_font(PDF_FONT_FAMILY, style, path)
+            self.text_font = PDF_FONT_FAMILY
+            self.text_font_styles = tuple(text_font)
+    
+    def add_page(self, *args, **kwargs):
+        super().add_page(*args, **kwargs)
+        if self.progress:
+            self.progress(self.page_no())
+
+    def set_font(self, family=None, style='', size=0):
+        """Helvetica maps to the Unicode font when one is loaded (missing bold/italic variants use regular)"""
+        if self.text_font and family and family.lower() in ('helvetica', 'arial'):
+            family = self.text_font
+            style = style.upper()
+            weight = ''.join(c for c in 'BI' if c in style)
+            if weight not in self.text_font_styles:
+                weight = weight[:1] if weight[:1] in self.text_font_styles else ''
+            style = weight + ''.join(c for c in 'SU' if c in style)
+        super().set_font(family, style, size)
+
+    def photo_derivative(self, photo_path, spec):
+        """
+        File to embed for a photo placement.
+
+        fpdf2 stores each distinct file once and references it from every page
+        that places it; a width-only placement reuses an already embedded wider
+        copy of the same photo instead of adding a second, smaller one.
+        """
+        if self.photo_quality:
+            spec = replace(spec, quality=self.photo_quality)
+        path = None
+        if spec.height is None:
+            for embedded_path, (source, embedded) in self.embedded_photos.items():
+                if source == photo_path and embedded.height is None and embedded.width >= spec.width:
+                    path = embedded_path
+                    break
+        if path is None:
+            path = get_derivative(photo_path, spec)
+            if path is None:
+                return None
+            self.embedded_photos.setdefault(path, (photo_path, spec))
+        self.photo_placements += 1
+        return path
+
+    def photo_bytes(self, quality=None):
+        """Size of the distinct embedded photos, or what they would take at another JPEG quality"""
+        total = 0
+        for path, (photo_path, spec) in self.embedded_photos.items():
+            if quality is not None:
+                path = get_derivative(photo_path, replace(spec, quality=quality)) or path
+            total += os.path.getsize(path)
+        return total
         
     def header(self):
         if self.page_no() > 1:
@@ -154,9 +231,11 @@ class TravelPDF(FPDF):
         if not photo_path or not os.path.exists(photo_path):
             return False
         try:
+            # Embed a print-sized copy (150 dpi), not the full-size original
+            image_path = self.photo_derivative(photo_path, DerivativeSpec('pdf', px(max_width))) or photo_path
             # Center the image (A4 width is 210mm, minus margins)
             x_pos = (210 - max_width) / 2
-            self.image(photo_path, x=x_pos, w=max_width)
+            self.image(image_path, x=x_pos, w=max_width)
             self.ln(3)
             return True
         except Exception as e:
@@ -168,8 +247,63 @@ class TravelPDF(FPDF):
 # MAIN BUILDER
 # ============================================================================
 
-def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed_requests, is_car_mode=False, result=None):
-    pdf = TravelPDF()
+def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed_requests, is_car_mode=False, result=None, progress=None, target_size_mb=None, unicode_font=True):
+    """
+    Build the trip PDF.
+
+    target_size_mb: size budget (default PDF_TARGET_SIZE_MB). If the PDF comes out
+        larger, photos are re-encoded at the highest JPEG quality in
+        PDF_PHOTO_QUALITIES whose estimated total fits, and the PDF is rendered once more.
+    unicode_font: use a Unicode TTF (subset to the glyphs used) when one is
+        installed, instead of transliterating text to latin-1 for Helvetica
+    """
+    args = (itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed_requests, is_car_mode, result)
+    text_font = find_text_font() if unicode_font else None
+    target_mb = target_size_mb if target_size_mb is not None else PDF_TARGET_SIZE_MB
+
+    token = _UNICODE_TEXT.set(bool(text_font))
+    try:
+        pdf = _render_pdf(*args, progress=progress, text_font=text_font)
+        data = bytes(pdf.output())
+        target_bytes = int(target_mb * 1e6) if target_mb else None
+        if target_bytes and len(data) > target_bytes:
+            quality = choose_photo_quality(pdf, len(data), target_bytes)
+            if quality is not None:
+                pdf = _render_pdf(*args, photo_quality=quality, text_font=text_font)
+                data = bytes(pdf.output())
+                print(f"[PDF] Size budget {target_mb:g} MB: photos at JPEG quality {quality}, {len(data) / 1e6:.1f} MB")
+            if len(data) > target_bytes:
+                print(f"⚠️ PDF is {len(data) / 1e6:.1f} MB, over the {target_mb:g} MB budget even at the lowest photo quality")
+    finally:
+        _UNICODE_TEXT.reset(token)
+
+    print(f"[PDF] {pdf.photo_placements} photo placements, {len(pdf.embedded_photos)} distinct images "
+          f"({pdf.photo_bytes() / 1e6:.1f} MB)")
+    return io.BytesIO(data)
+
+
+def choose_photo_quality(pdf, pdf_bytes, target_bytes):
+    """
+    Highest JPEG quality in PDF_PHOTO_QUALITIES for which the PDF should fit target_bytes.
+
+    Everything but the photos (text, fonts, layout) is taken as fixed; photos are
+    embedded as-is (JPEG passthrough), so their file sizes are their share of the PDF.
+
+    Returns:
+        int quality (the lowest one if nothing fits), or None if the PDF has no photos
+    """
+    if not pdf.embedded_photos:
+        return None
+    other_bytes = pdf_bytes - pdf.photo_bytes()
+    for quality in PDF_PHOTO_QUALITIES:
+        if other_bytes + pdf.photo_bytes(quality) <= target_bytes:
+            return quality
+    return PDF_PHOTO_QUALITIES[-1]
+
+
+def _render_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed_requests, is_car_mode=False, result=None, progress=None, photo_quality=None, text_font=None):
+    """Lay out the whole PDF (build_pdf handles fonts, size budget and output)"""
+    pdf = TravelPDF(progress=progress, photo_quality=photo_quality, text_font=text_font)
     
     # Date handling - support date, datetime, and string
     start_date = None
@@ -178,18 +312,8 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
         # Debug
         print(f"[PDF] Raw start_date: {raw_date}, type: {type(raw_date)}")
         
-        # Convert string to date
-        if isinstance(raw_date, str):
-            try:
-                start_date = datetime.strptime(raw_date, "%Y-%m-%d").date()
-            except:
-                try:
-                    start_date = datetime.strptime(raw_date, "%d/%m/%Y").date()
-                except:
-                    start_date = None
-        # If it's already a date or datetime
-        elif hasattr(raw_date, 'year'):
-            start_date = raw_date
+        # Convert string ("YYYY-MM-DD" or "DD/MM/YYYY") or datetime to date
+        start_date = as_date(raw_date)
         
         print(f"[PDF] Processed start_date: {start_date}, type: {type(start_date)}")
     
@@ -202,6 +326,9 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
     trip_type = prefs.get('trip_type', 'Point-to-point') if prefs else 'Point-to-point'
     is_hub_trip = trip_type == 'Star/Hub'
 
+    # Photos, videos, routes and links resolved once (shared with Word/Excel)
+    model = get_document_model(itinerary, result=result, start_date=start_date)
+
     # ========================================================================
     # COVER PAGE
     # ========================================================================
@@ -312,7 +439,8 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
     # DAILY ITINERARY
     # ========================================================================
     
-    for day in itinerary:
+    for entry in model.days:
+        day = entry.day
         pdf.add_page()
         
         day_num = day.get('day', 0)
@@ -322,14 +450,8 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
         total_days_in_city = day.get('total_days_in_city', 1)
         
         # Calculate date
-        current_date_obj = None
-        date_str = ""
-        if start_date:
-            try:
-                current_date_obj = start_date + timedelta(days=day_num - 1)
-                date_str = f" - {current_date_obj.strftime('%a, %d %b')}"
-            except:
-                pass
+        current_date_obj = entry.date
+        date_str = f" - {current_date_obj.strftime('%a, %d %b')}" if current_date_obj else ""
 
         # Day header
         pdf.chapter_title(f"DAY {day_num}: {city.upper()}{date_str}", COLOR_DAY_HEADER)
@@ -344,42 +466,7 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
         # ---------------------------------------------------------
         # Daily Google Maps Link - Use name+city search (same as restaurants)
         # ---------------------------------------------------------
-        waypoints = []
-        seen_names = set()  # Track unique names to avoid duplicates
-        
-        for city_stop in day.get('cities', []):
-            for attr in city_stop.get('attractions', []):
-                attr_name = attr.get('name', '')
-                if attr_name and attr_name not in seen_names:
-                    seen_names.add(attr_name)
-                    attr_city = city_stop.get('city', city)
-                    # Build search query: "Attraction Name City"
-                    search_query = f"{attr_name} {attr_city}".strip()
-                    waypoints.append(search_query)
-        
-        # Limit to 10 waypoints (Google Maps limit)
-        if len(waypoints) > 10:
-            waypoints = waypoints[:10]
-        
-        day_map_url = None
-        if waypoints:
-            if len(waypoints) == 1:
-                # Single destination - use search API
-                day_map_url = f"https://www.google.com/maps/search/?api=1&query={quote_plus(waypoints[0])}"
-            else:
-                # Multiple waypoints - use directions API with name-based waypoints
-                # Join all locations with " / " separator for directions
-                origin = waypoints[0]
-                destination = waypoints[-1]
-                
-                # Build URL with origin, destination, and middle waypoints
-                day_map_url = f"https://www.google.com/maps/dir/?api=1&origin={quote_plus(origin)}&destination={quote_plus(destination)}&travelmode=walking"
-                
-                # Add middle waypoints if any
-                if len(waypoints) > 2:
-                    middle = waypoints[1:-1]
-                    waypoints_param = "|".join(middle)
-                    day_map_url += f"&waypoints={quote_plus(waypoints_param)}"
+        day_map_url = entry.walking_route_url
         
         if day_map_url:
             pdf.add_link("Open Today's Route in Google Maps", day_map_url, COLOR_PRIMARY)
@@ -389,36 +476,21 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
         # YouTube Video Link (first day in city only)
         # ---------------------------------------------------------
         if day_in_city == 1:
-            video_added = False
-            try:
-                from youtube_helper import get_video_for_city
-                videos = get_video_for_city(city, max_videos=1)
-                if videos and len(videos) > 0:
-                    video = videos[0]
-                    video_title = safe_text(video.get('title', f'{city} Travel Guide'), 45)
-                    video_url = video.get('watch_url', '')
-                    if video_url:
-                        pdf.add_link(f"Watch: {video_title}", video_url, COLOR_ACCENT)
-                        video_added = True
-            except:
-                pass
-            
-            if not video_added:
-                query = quote_plus(f"{city} Spain travel guide 4K")
-                fallback_url = f"https://www.youtube.com/results?search_query={query}"
-                pdf.add_link(f"Watch {city} Travel Videos", fallback_url, COLOR_ACCENT)
+            city_info = model.city(entry)
+            video = city_info.video or {}
+            if video.get('watch_url'):
+                video_title = safe_text(video.get('title', f'{city} Travel Guide'), 45)
+                pdf.add_link(f"Watch: {video_title}", video['watch_url'], COLOR_ACCENT)
+            else:
+                pdf.add_link(f"Watch {city} Travel Videos", city_info.video_search_url, COLOR_ACCENT)
 
         pdf.ln(4)  # Increased spacing before highlights section
 
         # ---------------------------------------------------------
         # ATTRACTIONS WITH PHOTOS (NO individual Google Maps links)
         # ---------------------------------------------------------
-        cities_data = day.get('cities', [])
-        if not cities_data:
-            cities_data = [{'city': city, 'attractions': day.get('attractions', [])}]
-        
-        for city_stop in cities_data:
-            attractions = city_stop.get('attractions', [])
+        for stop in entry.stops:
+            attractions = [poi.poi for poi in stop.pois]
             if attractions:
                 pdf.section_title("TODAY'S HIGHLIGHTS", COLOR_ATTR)
                 pdf.ln(1)
@@ -433,7 +505,7 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
                 
                         pois=attractions[:6],
                 
-                        get_photo_path=get_photo_path,
+                        get_photo_path=entry.photo_path,
                 
                         safe_text=safe_text,
                 
@@ -469,7 +541,7 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
                 
                                         # PHOTO
                 
-                                        photo_path = get_photo_path(attr)
+                                        photo_path = entry.photo_path(attr)
                 
                                         if photo_path:
                 
@@ -526,24 +598,8 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
         # ---------------------------------------------------------
         # EVENTS (check multiple possible locations)
         # ---------------------------------------------------------
-        events = day.get('events', [])
-        
-        # Also check if events are in city_stop
-        if not events:
-            for city_stop in day.get('cities', []):
-                city_events = city_stop.get('events', [])
-                if city_events:
-                    events = city_events
-                    break
-        
-        # Also check result for events matching this day/city
-        if not events and result:
-            all_events = result.get('events', [])
-            if all_events:
-                # Filter events for this city
-                city_lower = city.lower()
-                events = [e for e in all_events if city_lower in str(e.get('city', '')).lower() 
-                          or city_lower in str(e.get('location', '')).lower()]
+        # Day, then city stop, then trip events matching the city
+        events = entry.events
         
         if events:
             pdf.ln(3)
@@ -578,38 +634,23 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
         # ---------------------------------------------------------
         # HOTELS
         # ---------------------------------------------------------
-        hotels = day.get('hotels', [])
-        if hotels and day_in_city == 1 and not is_hub_trip:
+        if entry.hotels and day_in_city == 1 and not is_hub_trip:
             pdf.ln(3)
             pdf.section_title('WHERE TO STAY', COLOR_HOTEL)
             pdf.ln(1)
             
-            # Calculate dates
-            checkin_str = ""
-            checkout_str = ""
+            # Stay dates (first night in the city)
             nights = total_days_in_city
-            if current_date_obj:
-                try:
-                    checkout_date = current_date_obj + timedelta(days=nights)
-                    checkin_str = current_date_obj.strftime('%Y-%m-%d')
-                    checkout_str = checkout_date.strftime('%Y-%m-%d')
-                except:
-                    pass
-            
-            # Show stay info
-            if checkin_str and checkout_str:
+            if entry.checkin:
                 pdf.set_font('Helvetica', 'I', 9)
                 pdf.set_text_color(*COLOR_LIGHT)
-                stay_info = f"{nights} night{'s' if nights > 1 else ''}: {current_date_obj.strftime('%d %b')} - {checkout_date.strftime('%d %b %Y')}"
+                stay_info = f"{nights} night{'s' if nights > 1 else ''}: {entry.checkin.strftime('%d %b')} - {entry.checkout.strftime('%d %b %Y')}"
                 pdf.cell(0, 5, stay_info, new_x="LMARGIN", new_y="NEXT")
                 pdf.ln(2)
             
-            for hotel in hotels[:3]:
-                hotel_name_raw = hotel.get('name', 'Hotel')
-                if 'Hotels in' in hotel_name_raw:
-                    continue
-                
-                hotel_name_display = safe_text(hotel_name_raw, 50)
+            for hotel_entry in entry.hotels:
+                hotel = hotel_entry.hotel
+                hotel_name_display = safe_text(hotel_entry.name, 50)
                 
                 pdf.set_font('Helvetica', 'B', 10)
                 pdf.set_text_color(*COLOR_TEXT)
@@ -623,56 +664,36 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
                     pdf.set_x(pdf.get_x() + 5)
                     pdf.cell(0, 5, safe_text(address, 60), new_x="LMARGIN", new_y="NEXT")
                 
-                # Booking link - use RAW hotel name for URL (not safe_text)
-                # Get city name without safe_text processing for URL
-                overnight_raw = day.get('overnight_city', '') or day.get('city', '')
-                hotel_search = quote_plus(f"{hotel_name_raw} {overnight_raw}"[:100])
-                
-                if checkin_str and checkout_str:
-                    booking_url = f"https://www.booking.com/searchresults.html?ss={hotel_search}&checkin={checkin_str}&checkout={checkout_str}"
+                # Booking link (raw hotel name, dated when the stay dates are known)
+                if entry.checkin:
                     link_text = f"Book {hotel_name_display} ({nights} night{'s' if nights > 1 else ''})"
                 else:
-                    booking_url = f"https://www.booking.com/searchresults.html?ss={hotel_search}"
                     link_text = f"Book {hotel_name_display}"
                 
                 pdf.set_x(pdf.get_x() + 5)
-                pdf.add_link(link_text, booking_url, COLOR_HOTEL)
+                pdf.add_link(link_text, hotel_entry.booking_url, COLOR_HOTEL)
                 pdf.ln(1)
 
         # ---------------------------------------------------------
         # RESTAURANTS
         # ---------------------------------------------------------
-        lunch = day.get('lunch_restaurant')
-        dinner = day.get('dinner_restaurant')
-        
-        if lunch or dinner:
+        if entry.restaurants:
             pdf.ln(3)
             pdf.section_title('WHERE TO EAT', COLOR_FOOD)
             pdf.ln(1)
             
-            for meal_type, restaurant in [('Lunch', lunch), ('Dinner', dinner)]:
-                if restaurant:
-                    rest_name = safe_text(restaurant.get('name', 'Restaurant'), 50)
-                    
-                    pdf.set_font('Helvetica', 'B', 10)
-                    pdf.set_text_color(*COLOR_TEXT)
-                    pdf.cell(0, 6, f'{meal_type}: {rest_name}', new_x="LMARGIN", new_y="NEXT")
-                    
-                    # Google Maps link - prefer place_id, fallback to name search
-                    place_id = restaurant.get('place_id')
-                    if place_id:
-                        # Use place_id for accurate location
-                        rest_url = f"https://www.google.com/maps/search/?api=1&query={quote_plus(rest_name)}&query_place_id={place_id}"
-                    else:
-                        # Fallback: search by name + city (more accurate than coordinates)
-                        city = restaurant.get('city', '')
-                        search_query = f"{rest_name} {city}".strip()
-                        rest_url = f"https://www.google.com/maps/search/?api=1&query={quote_plus(search_query)}"
-                    
-                    pdf.set_x(pdf.get_x() + 5)
-                    pdf.add_link('View on Google Maps', rest_url, COLOR_FOOD)
-                    
-                    pdf.ln(1)
+            for restaurant_entry in entry.restaurants:
+                rest_name = safe_text(restaurant_entry.name, 50)
+                
+                pdf.set_font('Helvetica', 'B', 10)
+                pdf.set_text_color(*COLOR_TEXT)
+                pdf.cell(0, 6, f'{restaurant_entry.meal}: {rest_name}', new_x="LMARGIN", new_y="NEXT")
+                
+                # Google Maps link - place_id when known, else name + city search
+                pdf.set_x(pdf.get_x() + 5)
+                pdf.add_link('View on Google Maps', restaurant_entry.maps_url, COLOR_FOOD)
+                
+                pdf.ln(1)
 
         # ---------------------------------------------------------
         # STOPS ALONG THE WAY (scenic detours on travel days)
@@ -1086,10 +1107,4 @@ def build_pdf(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, parsed
     pdf.set_text_color(*COLOR_TEXT)
     pdf.cell(0, 6, 'Generated with love by Your Personal Travel Planner', new_x="LMARGIN", new_y="NEXT", align='C')
 
-    # ========================================================================
-    # OUTPUT
-    # ========================================================================
-    pdf_buffer = io.BytesIO()
-    pdf.output(pdf_buffer)
-    pdf_buffer.seek(0)
-    return pdf_buffer
+    return pdf
@@ -11,6 +11,7 @@ from urllib.parse import quote_plus
 
 # NEW: POI cards renderer (keeps rest of PDF unchanged)
 from poi_cards_pdf_v4 import render_poi_cards
+from photo_manifest import get_photo_path
 
 # ============================================================================
 # CONFIGURATION
@@ -63,49 +64,6 @@ def safe_text(text, max_length=300):
     return text
 
 
-def get_photo_path(attr):
-    """Find photo using same logic as Word generator"""
-    # 1. Try local_photo_path
-    if attr.get('local_photo_path'):
-        rel_path = attr['local_photo_path'].replace('\\', '/')
-        if os.path.isabs(rel_path):
-            full_path = rel_path
-        else:
-            # Try relative to DATA_DIR
-            full_path = os.path.join(DATA_DIR, rel_path)
-            if not os.path.exists(full_path):
-                # Try just the filename in PHOTOS_DIR
-                filename = os.path.basename(rel_path)
-                full_path = os.path.join(PHOTOS_DIR, filename)
-        
-        if os.path.exists(full_path):
-            return full_path
-
-    # 2. Try place_id
-    if attr.get('place_id'):
-        photo_filename = f"{attr['place_id']}.jpg"
-        full_path = os.path.join(PHOTOS_DIR, photo_filename)
-        if os.path.exists(full_path):
-            return full_path
-    
-    # 3. Try name-based filename
-    name = attr.get('name', '')
-    if name:
-        # Try various filename formats
-        for ext in ['.jpg', '.jpeg', '.png']:
-            # Try exact name
-            test_path = os.path.join(PHOTOS_DIR, f"{name}{ext}")
-            if os.path.exists(test_path):
-                return test_path
-            # Try normalized name
-            norm_name = name.lower().replace(' ', '_').replace("'", "")
-            test_path = os.path.join(PHOTOS_DIR, f"{norm_name}{ext}")
-            if os.path.exists(test_path):
-                return test_path
-
-    return None
-
-
 # ============================================================================
 # PDF CLASS
 # ============================================================================
@@ -0,0 +1,398 @@
+"""
+Photo Derivatives - content-addressed cache of resized POI photos
+
+Exporters never embed the full-size originals (data/photos holds ~120 MB of
+JPEGs). Each photo is rendered once per target - DOCX width, PDF width, POI
+card crop, slideshow frame - and stored under its content hash plus the
+target spec, so renamed or duplicated photos share derivatives and edited
+photos get new ones.
+
+The cache is filled lazily (first export that needs a size renders it) or
+ahead of time by the batch job below. It is bounded in bytes: least
+recently used files are evicted first. Writes are atomic and eviction
+tolerates other worker processes sharing the directory.
+
+Usage:
+    from photo_derivatives import DOCX_PHOTO, get_derivative
+    run.add_picture(get_derivative(photo_path, DOCX_PHOTO) or photo_path, width=Inches(4.5))
+
+    # Pre-render every photo for the document exporters
+    python photo_derivatives.py --warm docx pdf
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from photo_manifest import get_manifest, get_photo_info
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cache directory and size budget (override with PHOTO_DERIVATIVE_CACHE_DIR / _MAX_MB)
+DERIVATIVE_CACHE_DIR = os.environ.get(
+    'PHOTO_DERIVATIVE_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'photo_derivatives')
+)
+DERIVATIVE_CACHE_MAX_BYTES = int(os.environ.get('PHOTO_DERIVATIVE_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Several worker processes may share the cache directory:
+# - files used this recently are never evicted (another worker may be embedding them)
+# - the running byte total is re-measured this often (other workers write too)
+EVICTION_GRACE_SECONDS = 60
+RESCAN_SECONDS = 60
+
+_STATE = {
+    'cache_dir': DERIVATIVE_CACHE_DIR,
+    'max_bytes': DERIVATIVE_CACHE_MAX_BYTES,
+    'bytes': None,          # Running total, measured on first write
+    'scanned_at': 0.0,
+}
+_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DerivativeSpec:
+    """
+    One target rendition.
+
+    width only: scaled to that width (never upscaled), aspect kept.
+    width + height: cover-cropped to exactly width × height.
+    radius: rounded corners, flattened onto `background` (JPEG has no alpha).
+    """
+    name: str
+    width: int
+    height: Optional[int] = None
+    quality: int = 82
+    radius: int = 0
+    background: tuple = (255, 255, 255)
+
+    @property
+    def key(self):
+        parts = [self.name, f"{self.width}x{self.height or 0}", f"q{self.quality}"]
+        if self.radius:
+            parts.append(f"r{self.radius}-" + '-'.join(str(c) for c in self.background))
+        return '_'.join(parts)
+
+
+def px(mm: float, dpi: int = 150) -> int:
+    """Millimetres → pixels at the given print resolution"""
+    return max(1, int(round(mm * dpi / 25.4)))
+
+
+# Word document photos: 4.5 in wide (event photos 5 in) at 120 dpi - Word
+# itineraries are read on screen far more often than printed
+DOCX_PHOTO = DerivativeSpec('docx', 540, quality=72)
+DOCX_EVENT_PHOTO = DerivativeSpec('docx', 600, quality=72)
+
+# PDF day-page photos: 90 mm wide at 150 dpi
+PDF_PHOTO = DerivativeSpec('pdf', px(90))
+
+# Slideshow frames (SlideshowConfig default size)
+VIDEO_FRAME = DerivativeSpec('video', 1280, 720, quality=90)
+
+
+def poi_card_spec(width_mm: float, height_mm: float, radius_mm: float, dpi: int = 150) -> DerivativeSpec:
+    """POI card photo: cover crop with rounded corners on the white card background"""
+    return DerivativeSpec('card', px(width_mm, dpi), px(height_mm, dpi), radius=px(radius_mm, dpi))
+
+
+def video_frame_spec(width: int, height: int) -> DerivativeSpec:
+    return DerivativeSpec('video', width, height, quality=VIDEO_FRAME.quality)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+def set_cache_dir(path, max_bytes=None):
+    """Use another cache directory (e.g. a temp dir in benchmarks)"""
+    with _LOCK:
+        _STATE['cache_dir'] = path
+        _STATE['bytes'] = None
+        if max_bytes is not None:
+            _STATE['max_bytes'] = max_bytes
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+# Bump when rendering changes so old derivatives are not reused
+RENDER_VERSION = 2
+
+EXIF_ORIENTATION = 0x0112
+_ROTATED_ORIENTATIONS = (5, 6, 7, 8)     # Width and height swap when made upright
+
+
+def _decode_size(src_size, spec):
+    """Smallest decoded size that still covers the spec (None = full size needed)"""
+    src_w, src_h = src_size
+    if spec.height is None:
+        scale = spec.width / src_w
+    else:
+        scale = max(spec.width / src_w, spec.height / src_h)
+    if scale >= 1:
+        return None
+    return (math.ceil(src_w * scale), math.ceil(src_h * scale))
+
+
+def open_for_spec(path: str, spec: DerivativeSpec):
+    """
+    Open a photo for rendering: reduced-size JPEG decode, upright per EXIF.
+
+    JPEG DCT scaling (Image.draft) decodes at 1/2, 1/4 or 1/8 size when the
+    target is that much smaller than the source, so the full-size pixels are
+    never materialized. render_derivative() finishes with a LANCZOS resample.
+
+    Returns:
+        PIL.Image (caller closes)
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(path)
+    orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+    rotated = orientation in _ROTATED_ORIENTATIONS
+
+    # Decode size is computed for the upright image, then mapped back to stored orientation
+    upright = img.size[::-1] if rotated else img.size
+    needed = _decode_size(upright, spec)
+    if needed is not None:
+        img.draft(None, needed[::-1] if rotated else needed)     # No-op for non-JPEG
+
+    if orientation != 1:
+        upright_img = ImageOps.exif_transpose(img)
+        img.close()
+        img = upright_img
+    return img
+
+
+def render_derivative(img, spec: DerivativeSpec):
+    """
+    Resize an open PIL image to a spec.
+
+    Returns:
+        PIL.Image in RGB mode
+    """
+    from PIL import Image
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    src_w, src_h = img.size
+
+    if spec.height is None:
+        if src_w <= spec.width:
+            return img
+        size = (spec.width, max(1, round(src_h * spec.width / src_w)))
+        return img.resize(size, Image.LANCZOS)
+
+    # Cover crop to the target aspect ratio, then resize
+    target_ratio = spec.width / spec.height
+    if src_w / src_h > target_ratio:
+        new_w = int(round(src_h * target_ratio))
+        left = max(0, (src_w - new_w) // 2)
+        box = (left, 0, left + new_w, src_h)
+    else:
+        new_h = int(round(src_w / target_ratio))
+        top = max(0, (src_h - new_h) // 2)
+        box = (0, top, src_w, top + new_h)
+    img = img.resize((spec.width, spec.height), Image.LANCZOS, box=box)
+
+    if spec.radius:
+        flat = Image.new('RGB', img.size, spec.background)
+        flat.paste(img, (0, 0), mask=_rounded_mask(spec.width, spec.height, spec.radius))
+        img = flat
+    return img
+
+
+@lru_cache(maxsize=32)
+def _rounded_mask(width, height, radius):
+    """Rounded-rectangle alpha mask, shared by every photo of the same card size"""
+    from PIL import Image, ImageDraw
+
+    mask = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, width - 1, height - 1), radius=radius, fill=255)
+    return mask
+
+
+def _derivative_path(content_hash, spec):
+    return os.path.join(_STATE['cache_dir'], content_hash[:2], f"{content_hash}_{spec.key}_v{RENDER_VERSION}.jpg")
+
+
+def _cache_bytes():
+    """Current cache size in bytes (scanned, then tracked; re-scanned every RESCAN_SECONDS)"""
+    now = time.time()
+    if _STATE['bytes'] is None or now - _STATE['scanned_at'] > RESCAN_SECONDS:
+        _STATE['bytes'] = sum(size for _, size, _ in _scan_cache())
+        _STATE['scanned_at'] = now
+    return _STATE['bytes']
+
+
+def _scan_cache():
+    """(path, size, last use) for every cached derivative"""
+    files = []
+    for root, _, names in os.walk(_STATE['cache_dir']):
+        for name in names:
+            if not name.endswith('.jpg'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, st.st_size, st.st_mtime))
+    return files
+
+
+def evict(max_bytes=None, grace_seconds=None):
+    """
+    Delete least recently used derivatives until the cache fits max_bytes.
+
+    Files used within grace_seconds (default EVICTION_GRACE_SECONDS) are kept
+    even if the cache stays over budget.
+
+    Returns:
+        int: Number of files removed
+    """
+    max_bytes = _STATE['max_bytes'] if max_bytes is None else max_bytes
+    grace_seconds = EVICTION_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    with _LOCK:
+        files = _scan_cache()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        in_use_after = time.time() - grace_seconds
+        for path, size, used_at in sorted(files, key=lambda f: f[2]):
+            if total <= max_bytes or used_at > in_use_after:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue    # Another worker evicted it first
+            total -= size
+            removed += 1
+        _STATE['bytes'] = total
+        _STATE['scanned_at'] = time.time()
+    return removed
+
+
+def _store(img, path, spec):
+    """Write a rendered derivative atomically and account for its size"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            img.save(f, format='JPEG', quality=spec.quality, optimize=True, progressive=True)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    with _LOCK:
+        total = _cache_bytes() + os.path.getsize(path)
+        _STATE['bytes'] = total
+    if total > _STATE['max_bytes']:
+        # Evict down to 90% so eviction does not run on every write
+        evict(int(_STATE['max_bytes'] * 0.9))
+
+
+# ============================================================================
+# PUBLIC API
+# ============================================================================
+
+def get_derivative(photo_path: str, spec: DerivativeSpec) -> Optional[str]:
+    """
+    Path of the photo rendered for a target, rendering it on first use.
+
+    Args:
+        photo_path: Original photo (as returned by photo_manifest.get_photo_path)
+        spec: Target rendition
+
+    Returns:
+        str: Cached JPEG path, or None if the photo cannot be read (use the original)
+    """
+    info = get_photo_info(photo_path) if photo_path else None
+    if info is None:
+        return None
+
+    path = _derivative_path(info.content_hash, spec)
+    try:
+        os.utime(path)      # Cache hit: mark as recently used
+        return path
+    except OSError:
+        pass
+
+    try:
+        with open_for_spec(info.path, spec) as img:
+            rendered = render_derivative(img, spec)
+            _store(rendered, path, spec)
+        return path
+    except Exception as e:
+        print(f"⚠️ Could not render {spec.name} photo for {info.filename}: {e}")
+        return None
+
+
+def open_derivative(photo_path: str, spec: DerivativeSpec):
+    """
+    The rendered photo as an open PIL image (e.g. slideshow frames).
+
+    Returns:
+        PIL.Image in RGB mode, or None
+    """
+    path = get_derivative(photo_path, spec)
+    if path is None:
+        return None
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.convert('RGB')
+    except Exception:
+        return None
+
+
+def warm_cache(specs: Iterable[DerivativeSpec], photos_dir: str = None, workers: int = 4):
+    """
+    Batch job: render every photo of the manifest for each spec.
+
+    Returns:
+        int: Number of derivatives available afterwards
+    """
+    specs = list(specs)
+    paths = [info.path for info in get_manifest(photos_dir).by_filename.values()]
+    jobs = [(path, spec) for path in paths for spec in specs]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: get_derivative(*job), jobs))
+    return sum(1 for r in results if r)
+
+
+def clear_derivative_cache():
+    """Delete all cached derivatives"""
+    evict(0, grace_seconds=0)
+
+
+NAMED_SPECS = {'docx': DOCX_PHOTO, 'pdf': PDF_PHOTO, 'video': VIDEO_FRAME}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Photo derivative cache tools")
+    parser.add_argument('--warm', nargs='+', choices=sorted(NAMED_SPECS), help="Pre-render photos for these targets")
+    parser.add_argument('--clear', action='store_true', help="Delete all cached derivatives")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.clear:
+        clear_derivative_cache()
+        print(f"Cleared {_STATE['cache_dir']}")
+    if args.warm:
+        started = time.perf_counter()
+        count = warm_cache([NAMED_SPECS[name] for name in args.warm], workers=args.workers)
+        print(f"{count} derivatives ready in {time.perf_counter() - started:.1f}s "
+              f"({_cache_bytes() / 1e6:.1f} MB in {_STATE['cache_dir']})")
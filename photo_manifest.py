@@ -0,0 +1,309 @@
+"""
+Photo Manifest - one in-memory index of the POI photo directory
+
+Every exporter (Word, PDF, POI cards, slideshow) resolves POI photos from
+this manifest instead of probing the filesystem per POI. The manifest maps
+filenames, place_ids and name keys to the photo path, pixel size, byte size
+and content hash.
+
+The manifest is saved next to the photo directory (data/photos_manifest.json)
+and checked against one directory scan at startup: only new or changed files
+(different byte size, or modified since the manifest was saved) are re-read.
+
+Usage:
+    from photo_manifest import get_photo_path, get_manifest
+    path = get_photo_path(poi)            # str or None
+    info = get_manifest().resolve(poi)    # PhotoInfo or None
+
+    # Rebuild the saved manifest after adding photos
+    python photo_manifest.py --build
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+PHOTOS_DIR = os.path.join(DATA_DIR, 'photos')
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PhotoInfo:
+    """One photo file"""
+    path: str
+    filename: str
+    width: int
+    height: int
+    size: int              # Bytes
+    content_hash: str      # blake2b-128 hex digest of the file contents
+
+
+def manifest_path_for(photos_dir: str) -> str:
+    """Saved manifest location: sibling of the photo directory (data/photos → data/photos_manifest.json)"""
+    return os.path.normpath(photos_dir) + '_manifest.json'
+
+
+def name_key(name: str) -> str:
+    """Normalized name filename stem ("Torre del Oro" → "torre_del_oro")"""
+    return name.lower().replace(' ', '_').replace("'", "")
+
+
+def describe_photo(path: str) -> PhotoInfo:
+    """Read one photo's pixel size (header only), byte size and content hash"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    width = height = 0
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            width, height = img.size
+    except Exception:
+        pass  # Unreadable image: keep it listed, dimensions unknown
+
+    return PhotoInfo(
+        path=path,
+        filename=os.path.basename(path),
+        width=width,
+        height=height,
+        size=os.path.getsize(path),
+        content_hash=digest.hexdigest(),
+    )
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+class PhotoManifest:
+    """Photos of one directory, indexed by filename, stem and lower-case stem"""
+
+    def __init__(self, photos_dir: str, photos=()):
+        self.photos_dir = photos_dir
+        self.by_filename: Dict[str, PhotoInfo] = {}
+        self._by_stem: Dict[str, PhotoInfo] = {}
+        for info in sorted(photos, key=lambda p: p.filename):
+            self.by_filename[info.filename] = info
+            stem, ext = os.path.splitext(info.filename)
+            # Same preference as the old probing order: .jpg, then .jpeg, then .png
+            for key in (stem, stem.lower()):
+                current = self._by_stem.get(key)
+                if current is None or _ext_rank(ext) < _ext_rank(os.path.splitext(current.filename)[1]):
+                    self._by_stem[key] = info
+
+    def __len__(self):
+        return len(self.by_filename)
+
+    def __contains__(self, filename):
+        return filename in self.by_filename
+
+    def get(self, filename: str) -> Optional[PhotoInfo]:
+        return self.by_filename.get(filename)
+
+    def resolve(self, poi: Dict) -> Optional[PhotoInfo]:
+        """
+        Photo for a POI: local_photo_path, then place_id, then name.
+
+        Args:
+            poi: POI dictionary
+
+        Returns:
+            PhotoInfo or None
+        """
+        # 1. local_photo_path ("photos\\ChIJ....jpg", relative or absolute)
+        local_path = poi.get('local_photo_path')
+        if local_path:
+            local_path = local_path.replace('\\', '/')
+            info = self.by_filename.get(os.path.basename(local_path))
+            if info is not None:
+                return info
+            if os.path.isabs(local_path):
+                info = _external_photo(os.path.normpath(local_path))
+                if info is not None:
+                    return info
+
+        # 2. place_id
+        place_id = poi.get('place_id')
+        if place_id:
+            info = self._by_stem.get(place_id)
+            if info is not None:
+                return info
+
+        # 3. Name, exact then normalized
+        name = poi.get('name')
+        if name:
+            return self._by_stem.get(name) or self._by_stem.get(name_key(name))
+
+        return None
+
+    def resolve_path(self, poi: Dict) -> Optional[str]:
+        info = self.resolve(poi)
+        return info.path if info else None
+
+
+def _ext_rank(ext):
+    ext = ext.lower()
+    return PHOTO_EXTENSIONS.index(ext) if ext in PHOTO_EXTENSIONS else len(PHOTO_EXTENSIONS)
+
+
+@lru_cache(maxsize=256)
+def _external_photo(path):
+    """Photo outside the manifest directory (absolute local_photo_path)"""
+    if not os.path.isfile(path):
+        return None
+    try:
+        return describe_photo(path)
+    except OSError:
+        return None
+
+
+def _scan(photos_dir):
+    """{filename: os.stat_result} for the photos in a directory"""
+    try:
+        with os.scandir(photos_dir) as entries:
+            return {
+                entry.name: entry.stat()
+                for entry in entries
+                if entry.name.lower().endswith(PHOTO_EXTENSIONS) and entry.is_file()
+            }
+    except OSError:
+        return {}
+
+
+def _load_saved(photos_dir):
+    """
+    Saved manifest entries (paths re-rooted at photos_dir).
+
+    Returns:
+        tuple: ({filename: PhotoInfo}, manifest file mtime in ns or None)
+    """
+    path = manifest_path_for(photos_dir)
+    try:
+        saved_at = os.stat(path).st_mtime_ns
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return {}, None
+
+    saved = {}
+    for entry in payload.get('photos', []):
+        try:
+            saved[entry['filename']] = PhotoInfo(
+                path=os.path.join(photos_dir, entry['filename']),
+                filename=entry['filename'],
+                width=entry['width'],
+                height=entry['height'],
+                size=entry['size'],
+                content_hash=entry['content_hash'],
+            )
+        except (KeyError, TypeError):
+            continue
+    return saved, saved_at
+
+
+def build_manifest(photos_dir: str = PHOTOS_DIR, use_saved: bool = True) -> PhotoManifest:
+    """
+    Index a photo directory.
+
+    Saved entries are reused when the file's byte size still matches and the
+    file was not modified after the manifest was saved (an edit that keeps
+    the size would otherwise keep a stale content_hash); other files are
+    read (header + hash).
+
+    Args:
+        photos_dir: Directory to index
+        use_saved: Reuse the saved manifest next to the directory
+
+    Returns:
+        PhotoManifest
+    """
+    photos_dir = os.path.abspath(photos_dir)
+    saved, saved_at = _load_saved(photos_dir) if use_saved else ({}, None)
+
+    photos = []
+    for filename, stat in _scan(photos_dir).items():
+        info = saved.get(filename)
+        if info is None or info.size != stat.st_size or stat.st_mtime_ns >= saved_at:
+            try:
+                info = describe_photo(os.path.join(photos_dir, filename))
+            except OSError:
+                continue
+        photos.append(info)
+    return PhotoManifest(photos_dir, photos)
+
+
+def save_manifest(manifest: PhotoManifest, path: str = None) -> str:
+    """Write the manifest as JSON (filenames only - paths are re-rooted on load)"""
+    path = path or manifest_path_for(manifest.photos_dir)
+    photos = []
+    for info in manifest.by_filename.values():
+        entry = asdict(info)
+        del entry['path']
+        photos.append(entry)
+    # One photo per line keeps diffs readable when photos are added
+    lines = ',\n'.join(json.dumps(entry, ensure_ascii=False) for entry in photos)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"photos": [\n' + lines + '\n]}\n')
+    return path
+
+
+_MANIFESTS: Dict[str, PhotoManifest] = {}
+
+
+def get_manifest(photos_dir: str = None) -> PhotoManifest:
+    """Process-wide manifest for a photo directory (built on first use)"""
+    key = os.path.abspath(photos_dir or PHOTOS_DIR)
+    manifest = _MANIFESTS.get(key)
+    if manifest is None:
+        with _LOCK:
+            manifest = _MANIFESTS.get(key)
+            if manifest is None:
+                manifest = _MANIFESTS[key] = build_manifest(key)
+    return manifest
+
+
+def clear_manifests():
+    """Forget built manifests (e.g. after adding photos at runtime)"""
+    with _LOCK:
+        _MANIFESTS.clear()
+    _external_photo.cache_clear()
+
+
+def get_photo_path(poi: Dict, photos_dir: str = None) -> Optional[str]:
+    """Photo file path for a POI, or None"""
+    return get_manifest(photos_dir).resolve_path(poi)
+
+
+def get_photo_info(path: str) -> Optional[PhotoInfo]:
+    """PhotoInfo for a photo path (manifest entry, or read once for files outside it)"""
+    path = os.path.abspath(path)
+    info = get_manifest(os.path.dirname(path)).get(os.path.basename(path))
+    return info if info is not None else _external_photo(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Photo manifest tools")
+    parser.add_argument('--build', action='store_true', help="Rebuild and save the manifest")
+    parser.add_argument('--photos-dir', default=PHOTOS_DIR)
+    args = parser.parse_args()
+
+    if args.build:
+        manifest = build_manifest(args.photos_dir, use_saved=False)
+        print(f"Indexed {len(manifest)} photos → {save_manifest(manifest)}")
+    else:
+        manifest = get_manifest(args.photos_dir)
+        total = sum(info.size for info in manifest.by_filename.values())
+        print(f"{len(manifest)} photos in {manifest.photos_dir} ({total / 1e6:.1f} MB)")
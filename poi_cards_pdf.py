@@ -30,8 +30,8 @@ from __future__ import annotations
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import os
 import re
-import hashlib
-import tempfile
+
+from photo_derivatives import get_derivative, poi_card_spec
 
 try:
     from PIL import Image, ImageDraw
@@ -44,6 +44,13 @@ except Exception:  # pragma: no cover
 # helpers
 # ----------------------------
 
+# Card grid layout (mm)
+CARD_COLS = 2
+CARD_GAP_X = 6.0
+CARD_PAD = 4.0
+CARD_PHOTO_H = 48.0
+CARD_PHOTO_RADIUS = 5.0
+
 _PLACEHOLDER_TIP_RE = re.compile(r"(go early|go late|fewer crowds|better photos)", re.I)
 
 def _first_nonempty(*vals: Any) -> Any:
@@ -216,10 +223,6 @@ def _as_tip_list(tips: Any, max_items: int = 2) -> List[str]:
     return cleaned[:max_items]
 
 
-def _mm_to_px(mm: float, dpi: int = 150) -> int:
-    return max(1, int(round(mm * dpi / 25.4)))
-
-
 def _rounded_png_from_image(
     img_path: str,
     target_w_mm: float,
@@ -228,55 +231,39 @@ def _rounded_png_from_image(
     dpi: int = 150,
 ) -> Optional[str]:
     """
-    Create (and cache) a rounded-corners PNG version of the image sized to the target.
-    Returns the path to the PNG, or None if Pillow isn't available or image can't be processed.
+    Rounded-corners version of the image sized to the target, from the shared photo derivative cache.
+    (Corners are flattened onto the white card background, so the result is a small JPEG.)
+    Returns the cached path, or None if Pillow isn't available or image can't be processed.
     """
     if Image is None:
         return None
     if not img_path or not os.path.exists(img_path):
         return None
 
-    cache_dir = os.path.join(tempfile.gettempdir(), "otravel_poi_card_cache")
-    os.makedirs(cache_dir, exist_ok=True)
+    return get_derivative(img_path, poi_card_spec(target_w_mm, target_h_mm, radius_mm, dpi))
 
-    key = f"{img_path}|{target_w_mm:.2f}|{target_h_mm:.2f}|{radius_mm:.2f}|{dpi}"
-    fn = hashlib.md5(key.encode("utf-8")).hexdigest() + ".png"
-    out_path = os.path.join(cache_dir, fn)
-    if os.path.exists(out_path):
-        return out_path
 
-    try:
-        w_px = _mm_to_px(target_w_mm, dpi)
-        h_px = _mm_to_px(target_h_mm, dpi)
-        r_px = _mm_to_px(radius_mm, dpi)
-
-        im = Image.open(img_path).convert("RGBA")
-        src_w, src_h = im.size
-        target_ratio = w_px / float(h_px)
-        src_ratio = src_w / float(src_h)
-
-        # cover-crop to target aspect ratio
-        if src_ratio > target_ratio:
-            new_w = int(round(src_h * target_ratio))
-            left = max(0, (src_w - new_w) // 2)
-            im = im.crop((left, 0, left + new_w, src_h))
-        else:
-            new_h = int(round(src_w / target_ratio))
-            top = max(0, (src_h - new_h) // 2)
-            im = im.crop((0, top, src_w, top + new_h))
+def card_photo_spec(page_w: float = 210.0, l_margin: float = 15.0, r_margin: float = 15.0):
+    """Derivative spec of the card photo for a page layout (defaults: A4, 15 mm margins as in pdf_generator)"""
+    card_w = (page_w - l_margin - r_margin - CARD_GAP_X) / CARD_COLS
+    return poi_card_spec(card_w - 2 * CARD_PAD, CARD_PHOTO_H, CARD_PHOTO_RADIUS)
 
-        im = im.resize((w_px, h_px), Image.LANCZOS)
 
-        mask = Image.new("L", (w_px, h_px), 0)
-        draw = ImageDraw.Draw(mask)
-        draw.rounded_rectangle((0, 0, w_px - 1, h_px - 1), radius=r_px, fill=255)
+def warm_card_cache(pois: Sequence[Dict[str, Any]], top_n: int = 200, workers: int = 4, **layout: float) -> int:
+    """
+    Pre-render card photos for the top-N POIs by weighted score (batch job).
 
-        rounded = Image.new("RGBA", (w_px, h_px), (255, 255, 255, 0))
-        rounded.paste(im, (0, 0), mask=mask)
-        rounded.save(out_path, format="PNG")
-        return out_path
-    except Exception:
-        return None
+    Returns the number of card photos available afterwards.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from photo_manifest import get_photo_path
+    from weighted_poi_scoring import get_top_pois_by_score
+
+    spec = card_photo_spec(**layout)
+    paths = {get_photo_path(poi) for poi in get_top_pois_by_score(list(pois), top_n=top_n)}
+    paths.discard(None)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(1 for path in pool.map(lambda p: get_derivative(p, spec), sorted(paths)) if path)
 
 
 def _wrap_lines(pdf: Any, text: str, max_w: float, font_name: str, font_style: str, font_size: int) -> List[str]:
@@ -354,19 +341,19 @@ def render_poi_cards(
     x0 = l_margin
     usable_w = page_w - l_margin - r_margin
 
-    cols = 2
-    gap_x = 6.0
+    cols = CARD_COLS
+    gap_x = CARD_GAP_X
     gap_y = 8.0
 
     card_w = (usable_w - gap_x) / cols
     # height tuned to match your "enclosed" template
     card_h = 108.0
-    pad = 4.0
+    pad = CARD_PAD
 
     # Photo area
-    photo_h = 48.0
+    photo_h = CARD_PHOTO_H
     radius = 5.0  # card rounding for border (if supported)
-    photo_radius = 5.0
+    photo_radius = CARD_PHOTO_RADIUS
 
     def ensure_row_space(row_h: float) -> None:
         y = float(pdf.get_y())
@@ -396,7 +383,11 @@ def render_poi_cards(
             photo_path = None
 
         if photo_path and os.path.exists(photo_path):
-            rounded = _rounded_png_from_image(photo_path, photo_w, photo_h, radius_mm=photo_radius)
+            if hasattr(pdf, "photo_derivative"):
+                # TravelPDF: one image object per distinct photo, size-budget quality
+                rounded = pdf.photo_derivative(photo_path, poi_card_spec(photo_w, photo_h, photo_radius))
+            else:
+                rounded = _rounded_png_from_image(photo_path, photo_w, photo_h, radius_mm=photo_radius)
             try:
                 pdf.image(rounded or photo_path, x=photo_x, y=photo_y, w=photo_w, h=photo_h)
             except Exception:
@@ -470,7 +461,7 @@ def render_poi_cards(
         pdf.set_text_color(*c_text)
 
         avg_label = "Avg time:"
-        avg_val = avg_time if avg_time else "—"
+        avg_val = avg_time if avg_time else "-"
         if est and avg_time:
             avg_val = f"{avg_time} (est.)"
 
@@ -527,3 +518,22 @@ def render_poi_cards(
 
     # small spacing after section
     pdf.ln(1)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Pre-render POI card photos for the top-N attractions")
+    parser.add_argument("--top", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--attractions", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              "data", "andalusia_attractions_filtered.json"))
+    args = parser.parse_args()
+
+    with open(args.attractions, "r", encoding="utf-8") as f:
+        attractions = json.load(f)
+    started = time.perf_counter()
+    count = warm_card_cache(attractions, top_n=args.top, workers=args.workers)
+    print(f"{count} card photos ready in {time.perf_counter() - started:.1f}s")
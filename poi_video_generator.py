@@ -24,6 +24,12 @@ import json
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+
+from photo_manifest import get_manifest
+from photo_derivatives import open_derivative, video_frame_spec
+from video_encoder import open_video_writer
+from frame_compositor import FrameCompositor, Slide
 
 # ============================================================================
 # CONFIGURATION
@@ -38,6 +44,19 @@ class SlideshowConfig:
     height: int = 720                     # Video height
     transition_frames: int = 8            # Frames for fade transition (reduced)
     
+    # Encoder: 'auto' (ffmpeg if installed, else OpenCV), 'ffmpeg' or 'opencv'
+    encoder: str = 'auto'
+    crf: int = 23                         # H.264 quality (ffmpeg; lower = better, larger)
+    preset: str = 'superfast'             # x264 speed/size trade-off (ffmpeg)
+    
+    # Ken Burns: slow zoom/pan on each photo (every frame is encoded, so larger files)
+    ken_burns: bool = False
+    ken_burns_zoom: float = 1.15          # Photos are prepared this much larger; zoom 1x ↔ this
+    
+    # Slide preparation (photo decode, resize, overlays) runs ahead of the encoder
+    prefetch_slides: int = 4              # Slides prepared ahead (bounded memory)
+    prefetch_workers: int = 2             # Preparation threads
+    
     # Text overlay settings
     font_size: int = 32
     title_font_size: int = 48
@@ -77,8 +96,9 @@ ALTERNATIVE_PHOTOS_DIRS = [
     './data/photos',
 ]
 
+@lru_cache(maxsize=16)
 def get_photos_dir(photos_dir: str = None) -> str:
-    """Find the photos directory, trying multiple locations."""
+    """Find the photos directory, trying multiple locations (resolved once per argument)."""
     if photos_dir and os.path.isdir(photos_dir):
         return photos_dir
     
@@ -88,11 +108,10 @@ def get_photos_dir(photos_dir: str = None) -> str:
     
     for d in all_dirs:
         if d and os.path.isdir(d):
-            # Check if it actually has photos
-            files = os.listdir(d)
-            jpg_files = [f for f in files if f.endswith(('.jpg', '.jpeg', '.png'))]
-            if jpg_files:
-                print(f"📁 Found photos directory: {d} ({len(jpg_files)} photos)")
+            # Check if it actually has photos (the manifest scans the directory once)
+            photo_count = len(get_manifest(d))
+            if photo_count:
+                print(f"📁 Found photos directory: {d} ({photo_count} photos)")
                 return d
     
     print(f"⚠️ Photos directory not found. Tried: {all_dirs}")
@@ -166,67 +185,16 @@ ANDALUSIA_BOUNDS = {
 # ============================================================================
 
 def find_photo_path(poi: Dict, photos_dir: str = None) -> Optional[str]:
-    """Find the photo file for a POI."""
-    photos_dir = get_photos_dir(photos_dir)
-    
-    # Option 1: Use local_photo_path directly
-    local_path = poi.get('local_photo_path', '')
-    if local_path:
-        local_path = local_path.replace('\\', os.sep).replace('/', os.sep)
-        
-        if os.path.exists(local_path):
-            return local_path
-        
-        filename = os.path.basename(local_path)
-        full_path = os.path.join(photos_dir, filename)
-        if os.path.exists(full_path):
-            return full_path
-    
-    # Option 2: Use place_id to construct filename
-    place_id = poi.get('place_id', '')
-    if place_id:
-        for ext in ['.jpg', '.png', '.jpeg']:
-            photo_path = os.path.join(photos_dir, f"{place_id}{ext}")
-            if os.path.exists(photo_path):
-                return photo_path
-    
-    return None
+    """Find the photo file for a POI (from the photo manifest, no filesystem probing)."""
+    return get_manifest(get_photos_dir(photos_dir)).resolve_path(poi)
 
 
 def load_and_resize_image(image_path: str, target_width: int, target_height: int):
-    """Load an image and resize it to fit the target dimensions (center crop)."""
-    try:
-        from PIL import Image
-        
-        img = Image.open(image_path)
-        
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        img_aspect = img.width / img.height
-        target_aspect = target_width / target_height
-        
-        if img_aspect > target_aspect:
-            new_height = target_height
-            new_width = int(target_height * img_aspect)
-        else:
-            new_width = target_width
-            new_height = int(target_width / img_aspect)
-        
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        left = (new_width - target_width) // 2
-        top = (new_height - target_height) // 2
-        right = left + target_width
-        bottom = top + target_height
-        
-        img = img.crop((left, top, right, bottom))
-        
-        return img
-        
-    except Exception as e:
-        print(f"⚠️ Error loading image {image_path}: {e}")
-        return None
+    """Load an image resized to the target dimensions (center crop), via the photo derivative cache."""
+    img = open_derivative(image_path, video_frame_spec(target_width, target_height))
+    if img is None:
+        print(f"⚠️ Error loading image {image_path}")
+    return img
 
 
 def create_placeholder_image(width: int, height: int, text: str = "No Photo"):
@@ -769,6 +737,7 @@ def add_mini_map_to_image(img, mini_map: 'Image', config: SlideshowConfig):
     if mini_map is None:
         return img
     
+    keep_alpha = img.mode == 'RGBA'     # Overlay layer for Ken Burns slides
     img = img.copy()
     width, height = img.size
     
@@ -810,7 +779,102 @@ def add_mini_map_to_image(img, mini_map: 'Image', config: SlideshowConfig):
         width=2
     )
     
-    return img.convert('RGB')
+    return img if keep_alpha else img.convert('RGB')
+
+
+# ============================================================================
+# SLIDE PREPARATION
+# ============================================================================
+
+# Window size for sliding mini-map (show ~12 POIs at a time for good context)
+MINI_MAP_WINDOW_SIZE = 12
+
+
+def prepare_slide(pois: List[Dict], idx: int, all_coords, config: SlideshowConfig,
+                  photos_dir: str = None, base_mini_map=None):
+    """
+    Slide idx: photo (or placeholder) with the title and mini-map overlays.
+    
+    Static slides are one finished RGB frame. With config.ken_burns the photo is
+    prepared ken_burns_zoom times larger and the overlays as a separate layer,
+    for the compositor to move the photo underneath them.
+    
+    Returns:
+        (Slide, has_photo)
+    """
+    import numpy as np
+    from PIL import Image
+    
+    poi = pois[idx]
+    poi_name = poi.get('name', 'Unknown')
+    city = poi.get('city', 'Andalusia')
+    
+    width, height = config.width, config.height
+    if config.ken_burns:
+        width, height = round(width * config.ken_burns_zoom), round(height * config.ken_burns_zoom)
+    
+    # Find and load photo
+    img = None
+    photo_path = find_photo_path(poi, photos_dir)
+    if photo_path:
+        img = load_and_resize_image(photo_path, width, height)
+    has_photo = img is not None
+    if img is None:
+        img = create_placeholder_image(width, height, poi_name[:30])
+    
+    # Overlays go on the photo, or on a transparent layer over the moving photo
+    layer = Image.new('RGBA', (config.width, config.height), (0, 0, 0, 0)) if config.ken_burns else img
+    
+    # Add text overlay (bottom-left)
+    layer = add_text_overlay(layer, city, poi_name, config)
+    
+    # Add mini-map overlay (bottom-right) with SLIDING WINDOW bounds
+    if config.show_mini_map and base_mini_map:
+        # Calculate window bounds for current position (shows 2-3 nearby cities)
+        window_bounds = calculate_window_bounds(all_coords, idx, window_size=MINI_MAP_WINDOW_SIZE)
+        
+        # Crop map to window bounds
+        cropped_map = crop_map_to_bounds(base_mini_map, window_bounds, config)
+        
+        if cropped_map:
+            # Draw route on cropped map
+            mini_map_with_route = create_mini_map_overlay(cropped_map, all_coords, idx, config, window_bounds)
+            layer = add_mini_map_to_image(layer, mini_map_with_route, config)
+    
+    if config.ken_burns:
+        source = np.asarray(img.convert('RGB'))
+        return Slide.ken_burns(source, np.asarray(layer), idx, config.ken_burns_zoom), has_photo
+    return Slide(frame=np.asarray(layer.convert('RGB'))), has_photo
+
+
+def prefetch(produce, count: int, depth: int = 4, workers: int = 2):
+    """
+    Yield produce(0) ... produce(count - 1) in order, computed on a thread pool.
+    
+    At most `depth` results are in flight or waiting, so memory stays bounded
+    while the consumer (the encoder) is the slowest stage. Closing the generator
+    cancels what has not started and waits for the rest.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='slideshow-prefetch')
+    pending = deque()
+    submitted = 0
+    try:
+        while submitted < count and len(pending) < max(1, depth):
+            pending.append(pool.submit(produce, submitted))
+            submitted += 1
+        while pending:
+            result = pending.popleft().result()
+            if submitted < count:
+                pending.append(pool.submit(produce, submitted))
+                submitted += 1
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
 
 
 # ============================================================================
@@ -821,19 +885,25 @@ def generate_poi_slideshow_from_pois(
     pois: List[Dict],
     output_file: str = "trip_slideshow.mp4",
     config: SlideshowConfig = None,
-    photos_dir: str = None
+    photos_dir: str = None,
+    progress=None
 ) -> Optional[str]:
-    """Generate a slideshow video from a list of POIs with sliding window mini-map."""
+    """
+    Generate a slideshow video from a list of POIs with sliding window mini-map.
+    
+    progress: optional callback(frames_done, total_frames), called after each slide
+    """
     if config is None:
         config = SlideshowConfig()
     
     # Use helper to find valid photos directory
     photos_dir = get_photos_dir(photos_dir)
     
+    # Dependency check only: slides are built with Pillow/NumPy and composited with cv2
     try:
-        from PIL import Image
-        import cv2
-        import numpy as np
+        import PIL  # noqa: F401
+        import cv2  # noqa: F401
+        import numpy  # noqa: F401
     except ImportError as e:
         print(f"❌ Missing dependencies: {e}")
         print("   Install with: pip install pillow opencv-python numpy")
@@ -864,101 +934,70 @@ def generate_poi_slideshow_from_pois(
     
     # Calculate frames per slide
     frames_per_slide = int(config.duration_per_slide * config.fps)
+    expected_frames = len(pois) * frames_per_slide + (len(pois) - 1) * config.transition_frames
     
-    # Setup video writer
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_file, fourcc, config.fps, (config.width, config.height))
+    # Setup video writer (static slides are written once with a hold of frames_per_slide)
+    hold_frames = 1 if config.ken_burns else frames_per_slide
+    out = open_video_writer(output_file, config, hold_frames, config.transition_frames)
     
-    if not out.isOpened():
+    if out is None:
         print("❌ Failed to create video writer")
         return None
+    print(f"   Encoder: {out.name}")
     
-    total_frames = 0
     pois_with_photos = 0
     
-    # Window size for sliding mini-map (show ~12 POIs at a time for good context)
-    WINDOW_SIZE = 12
+    # Slides are prepared once, ahead of the encoder, and each is used for its hold
+    # and for the fade into it
+    slides = prefetch(
+        lambda idx: prepare_slide(pois, idx, all_coords, config, photos_dir, base_mini_map),
+        len(pois), config.prefetch_slides, config.prefetch_workers
+    )
     
-    for idx, poi in enumerate(pois):
-        poi_name = poi.get('name', 'Unknown')
-        city = poi.get('city', 'Andalusia')
-        
-        print(f"   [{idx + 1}/{len(pois)}] {city} - {poi_name}")
-        
-        # Find and load photo
-        photo_path = find_photo_path(poi, photos_dir)
-        
-        if photo_path:
-            img = load_and_resize_image(photo_path, config.width, config.height)
-            if img:
+    # Frame buffers reused for every frame. A moving slide spans its fade-in, hold and
+    # fade-out (motion_frames); static slides are written once per hold
+    compositor = FrameCompositor(config.width, config.height)
+    fade = config.transition_frames
+    motion_frames = max(1, frames_per_slide + 2 * fade - 1)
+    
+    try:
+        slide, has_photo = next(slides)
+        for idx, poi in enumerate(pois):
+            print(f"   [{idx + 1}/{len(pois)}] {poi.get('city', 'Andalusia')} - {poi.get('name', 'Unknown')}")
+            if has_photo:
                 pois_with_photos += 1
             else:
-                img = create_placeholder_image(config.width, config.height, poi_name[:30])
-        else:
-            print(f"      ⚠️ No photo found")
-            img = create_placeholder_image(config.width, config.height, poi_name[:30])
-        
-        # Add text overlay (bottom-left)
-        img_with_text = add_text_overlay(img, city, poi_name, config)
-        
-        # Add mini-map overlay (bottom-right) with SLIDING WINDOW bounds
-        if config.show_mini_map and base_mini_map:
-            # Calculate window bounds for current position (shows 2-3 nearby cities)
-            window_bounds = calculate_window_bounds(all_coords, idx, window_size=WINDOW_SIZE)
+                print(f"      ⚠️ No photo found")
             
-            # Crop map to window bounds
-            cropped_map = crop_map_to_bounds(base_mini_map, window_bounds, config)
-            
-            if cropped_map:
-                # Draw route on cropped map
-                mini_map_with_route = create_mini_map_overlay(cropped_map, all_coords, idx, config, window_bounds)
-                img_with_text = add_mini_map_to_image(img_with_text, mini_map_with_route, config)
-        
-        # Convert PIL to OpenCV format
-        frame = cv2.cvtColor(np.array(img_with_text), cv2.COLOR_RGB2BGR)
-        
-        # Write frames for this slide
-        for _ in range(frames_per_slide):
-            out.write(frame)
-            total_frames += 1
-        
-        # Add fade transition
-        if idx < len(pois) - 1 and config.transition_frames > 0:
-            next_poi = pois[idx + 1]
-            next_photo_path = find_photo_path(next_poi, photos_dir)
-            
-            if next_photo_path:
-                next_img = load_and_resize_image(next_photo_path, config.width, config.height)
-                if not next_img:
-                    next_img = create_placeholder_image(config.width, config.height)
+            # Held for the whole slide
+            if slide.moving:
+                for k in range(fade, fade + frames_per_slide):
+                    out.write(compositor.render(slide, k / motion_frames))
             else:
-                next_img = create_placeholder_image(config.width, config.height)
-            
-            next_img_with_text = add_text_overlay(
-                next_img, 
-                next_poi.get('city', 'Andalusia'),
-                next_poi.get('name', 'Unknown'),
-                config
-            )
+                out.write(slide.frame, repeat=frames_per_slide)
             
-            if config.show_mini_map and base_mini_map:
-                # Window bounds for next POI
-                next_window_bounds = calculate_window_bounds(all_coords, idx + 1, window_size=WINDOW_SIZE)
-                next_cropped_map = crop_map_to_bounds(base_mini_map, next_window_bounds, config)
+            if idx < len(pois) - 1:
+                next_slide, has_photo = next(slides)
                 
-                if next_cropped_map:
-                    next_mini_map = create_mini_map_overlay(next_cropped_map, all_coords, idx + 1, config, next_window_bounds)
-                    next_img_with_text = add_mini_map_to_image(next_img_with_text, next_mini_map, config)
-            
-            next_frame = cv2.cvtColor(np.array(next_img_with_text), cv2.COLOR_RGB2BGR)
+                # Add fade transition
+                for t in range(fade):
+                    out.write(compositor.crossfade(
+                        slide, (fade + frames_per_slide + t) / motion_frames,
+                        next_slide, t / motion_frames,
+                        t / fade
+                    ))
+                slide = next_slide
             
-            for t in range(config.transition_frames):
-                alpha = t / config.transition_frames
-                blended = cv2.addWeighted(frame, 1 - alpha, next_frame, alpha, 0)
-                out.write(blended)
-                total_frames += 1
+            if progress:
+                progress(out.frames, expected_frames)
+    except BaseException:
+        out.abort()
+        raise
+    finally:
+        slides.close()
     
-    out.release()
+    out.close()
+    total_frames = out.frames
     
     duration = total_frames / config.fps
     print(f"\n✅ Video saved: {output_file}")
@@ -973,7 +1012,8 @@ def generate_poi_slideshow(
     result: Dict,
     output_file: str = "trip_slideshow.mp4",
     config: SlideshowConfig = None,
-    photos_dir: str = None
+    photos_dir: str = None,
+    progress=None
 ) -> Optional[str]:
     """Generate a slideshow video from an itinerary result."""
     pois = []
@@ -1004,7 +1044,7 @@ def generate_poi_slideshow(
     
     print(f"📍 Found {len(pois)} POIs in itinerary")
     
-    return generate_poi_slideshow_from_pois(pois, output_file, config, photos_dir)
+    return generate_poi_slideshow_from_pois(pois, output_file, config, photos_dir, progress)
 
 
 # ============================================================================
@@ -7,6 +7,10 @@ import unicodedata
 import math
 from typing import List, Dict, Optional
 
+import numpy as np
+
+from text_norm import CITY_ALIASES
+
 
 def normalize_city_name(city_name):
     """Normalize city name by removing accents and converting to lowercase"""
@@ -90,24 +94,18 @@ def categorize_restaurant_by_time(restaurant):
     Categorize restaurant as suitable for lunch, dinner, or both
     Based on cuisine type, price range, and ambiance
     """
-    name = restaurant.get('name', '').lower()
-    cuisine = restaurant.get('cuisine', '').lower()
-    price_range = restaurant.get('price_range', '$')
-    
-    # Keywords that suggest lunch spots
-    lunch_keywords = ['tapas', 'cafe', 'cafeteria', 'market', 'mercado', 'bistro', 'casual']
-    
-    # Keywords that suggest fine dining (dinner)
-    dinner_keywords = ['fine dining', 'gourmet', 'michelin', 'starred', 'upscale', 'elegant']
+    name = (restaurant.get('name') or '').lower()
+    cuisine = (restaurant.get('cuisine') or restaurant.get('topic') or '').lower()
+    price_tier = restaurant_price_tier(restaurant)
     
     # Check name and cuisine
-    is_casual = any(keyword in name or keyword in cuisine for keyword in lunch_keywords)
-    is_fine = any(keyword in name or keyword in cuisine for keyword in dinner_keywords)
+    is_casual = any(keyword in name or keyword in cuisine for keyword in LUNCH_KEYWORDS)
+    is_fine = any(keyword in name or keyword in cuisine for keyword in DINNER_KEYWORDS)
     
     # Price-based classification
-    if price_range in ['$$$', '$$$$']:
+    if price_tier >= 3:
         is_fine = True
-    elif price_range == '$':
+    elif price_tier == 1:
         is_casual = True
     
     if is_fine:
@@ -118,6 +116,134 @@ def categorize_restaurant_by_time(restaurant):
         return 'both'  # Can work for both meals
 
 
+# ============================================================================
+# COMPILED RESTAURANT ATTRIBUTES
+# ============================================================================
+
+# Keywords that suggest lunch spots
+LUNCH_KEYWORDS = ('tapas', 'cafe', 'cafeteria', 'market', 'mercado', 'bistro', 'casual')
+
+# Keywords that suggest fine dining (dinner)
+DINNER_KEYWORDS = ('fine dining', 'gourmet', 'michelin', 'starred', 'upscale', 'elegant')
+
+# Fields stamped on each restaurant by compile_restaurant_attributes()
+LUNCH_OK_FIELD = '_lunch_ok'
+DINNER_OK_FIELD = '_dinner_ok'
+REVIEWS_FIELD = '_reviews'
+PRICE_TIER_FIELD = '_price_tier'
+QUALITY_FIELD = '_quality'
+COMPILED_FIELDS = (LUNCH_OK_FIELD, DINNER_OK_FIELD, REVIEWS_FIELD, PRICE_TIER_FIELD, QUALITY_FIELD)
+
+# Quality = rating shrunk towards PRIOR_RATING for restaurants with few reviews
+PRIOR_RATING = 4.0
+PRIOR_REVIEWS = 20
+
+
+def restaurant_review_count(restaurant):
+    """Integer review count (reviews_count, user_ratings_total, or a leading number in 'topic')"""
+    for field in ('reviews_count', 'user_ratings_total'):
+        try:
+            count = int(restaurant.get(field) or 0)
+        except (TypeError, ValueError):
+            count = 0
+        if count:
+            return count
+    
+    parts = (restaurant.get('topic') or '').split()
+    if parts and parts[0].isdigit():
+        return int(parts[0])
+    return 0
+
+
+def restaurant_price_tier(restaurant):
+    """Price tier 1-4 from google_price_level or a '$'-style price_range (0 = unknown)"""
+    try:
+        level = int(restaurant.get('google_price_level') or 0)
+    except (TypeError, ValueError):
+        level = 0
+    if 1 <= level <= 4:
+        return level
+    
+    price_range = restaurant.get('price_range')
+    if isinstance(price_range, str) and price_range and set(price_range) == {'$'}:
+        return min(len(price_range), 4)
+    return 0
+
+
+def restaurant_quality(rating, reviews):
+    """Rating adjusted for review volume (unknown review count keeps the raw rating)"""
+    if reviews <= 0:
+        return rating
+    return (rating * reviews + PRIOR_RATING * PRIOR_REVIEWS) / (reviews + PRIOR_REVIEWS)
+
+
+def compile_restaurant_attributes(restaurants):
+    """
+    Derive per-restaurant attributes once (run when the dataset is loaded).
+    
+    Stores on each restaurant:
+        _lunch_ok / _dinner_ok: meal suitability (see categorize_restaurant_by_time)
+        _reviews: integer review count
+        _price_tier: 1-4, 0 = unknown
+        _quality: review-adjusted rating
+    
+    The fields stay on the dataset records: copies handed to itineraries go
+    through strip_compiled_fields().
+    
+    Args:
+        restaurants: List of restaurant dictionaries
+    
+    Returns:
+        list: The same list (modified in place)
+    """
+    for restaurant in restaurants:
+        category = categorize_restaurant_by_time(restaurant)
+        reviews = restaurant_review_count(restaurant)
+        try:
+            rating = float(restaurant.get('rating') or 0)
+        except (TypeError, ValueError):
+            rating = 0.0
+        
+        restaurant[LUNCH_OK_FIELD] = category != 'dinner'
+        restaurant[DINNER_OK_FIELD] = category != 'lunch'
+        restaurant[REVIEWS_FIELD] = reviews
+        restaurant[PRICE_TIER_FIELD] = restaurant_price_tier(restaurant)
+        restaurant[QUALITY_FIELD] = round(restaurant_quality(rating, reviews), 4)
+    return restaurants
+
+
+def strip_compiled_fields(restaurant):
+    """Copy of a restaurant without the compiled fields (for itineraries and exports)"""
+    return {k: v for k, v in restaurant.items() if k not in COMPILED_FIELDS}
+
+
+def restaurant_columns(restaurants):
+    """
+    Restaurant attributes as NumPy arrays (compiled fields when present, derived otherwise).
+    
+    Returns:
+        dict: 'rating', 'quality' (float), 'reviews', 'price_tier' (int),
+              'lunch_ok', 'dinner_ok' (bool) arrays aligned with restaurants
+    """
+    compiled = [
+        r if QUALITY_FIELD in r else compile_restaurant_attributes([dict(r)])[0]
+        for r in restaurants
+    ]
+    n = len(compiled)
+    
+    def column(field, dtype):
+        return np.fromiter((r[field] for r in compiled), dtype=dtype, count=n)
+    
+    return {
+        'rating': np.fromiter((float(r.get('rating') or 0) for r in compiled), dtype=np.float64, count=n),
+        'quality': column(QUALITY_FIELD, np.float64),
+        'reviews': column(REVIEWS_FIELD, np.int64),
+        'price_tier': column(PRICE_TIER_FIELD, np.int64),
+        'lunch_ok': column(LUNCH_OK_FIELD, bool),
+        'dinner_ok': column(DINNER_OK_FIELD, bool),
+    }
+
+
 def get_restaurants_near_pois(city, all_restaurants, pois, max_distance_km=1.5):
     """
     Get restaurants near the POIs being visited (NOT just in the city)
@@ -164,7 +290,7 @@ def get_restaurants_near_pois(city, all_restaurants, pois, max_distance_km=1.5):
         
         # Only include if within walking distance
         if distance <= max_distance_km:
-            restaurant_copy = restaurant.copy()
+            restaurant_copy = strip_compiled_fields(restaurant)
             restaurant_copy['distance_from_pois'] = round(distance, 2)
             nearby_restaurants.append(restaurant_copy)
     
@@ -195,7 +321,7 @@ def get_restaurants_for_city(city, all_restaurants):
     return city_restaurants
 
 
-def select_restaurants_for_day(city, all_restaurants, pois, budget='mid-range', preferences=None):
+def select_restaurants_for_day(city, all_restaurants, pois, budget='mid-range', preferences=None, index=None):
     """
     Select lunch and dinner restaurants NEAR the POIs being visited
     
@@ -205,104 +331,352 @@ def select_restaurants_for_day(city, all_restaurants, pois, budget='mid-range',
         pois: List of POI dicts being visited this day
         budget: 'budget', 'mid-range', or 'luxury'
         preferences: Dict with user preferences (cuisine preferences, etc.)
+        index: Optional prebuilt RestaurantIndex over all_restaurants
     
     Returns:
         Dict with 'lunch' and 'dinner' restaurant recommendations
     """
     if preferences is None:
         preferences = {}
+    if index is None:
+        index = RestaurantIndex(all_restaurants)
     
     # ✅ KEY CHANGE: Get restaurants NEAR the POIs, not just in the city
-    nearby_restaurants = get_restaurants_near_pois(city, all_restaurants, pois, max_distance_km=1.5)
+    poi_center = get_poi_center(pois)
+    rows, distances = index.nearest(city, poi_center, max_km=1.5) if poi_center else ((), ())
     
-    if not nearby_restaurants:
+    if not len(rows):
         # Fallback: get all city restaurants if none near POIs
-        nearby_restaurants = get_restaurants_for_city(city, all_restaurants)
+        rows, distances = index.nearest(city)
+        poi_center = None
     
-    if not nearby_restaurants:
+    if not len(rows):
         return {
             'lunch': None,
             'dinner': None
         }
     
-    # Budget mapping to price ranges
-    budget_map = {
-        'budget': ['$', '$$'],
-        'mid-range': ['$$', '$$$'],
-        'luxury': ['$$$', '$$$$']
-    }
-    
-    allowed_prices = budget_map.get(budget, ['$$', '$$$'])
-    
-    # Filter by budget
-    filtered = [r for r in nearby_restaurants if r.get('price_range') in allowed_prices]
-    
-    # If too few after filtering, use all nearby restaurants
-    if len(filtered) < 2:
-        filtered = nearby_restaurants
-    
-    # Categorize restaurants
-    lunch_suitable = []
-    dinner_suitable = []
-    both_suitable = []
+    # Filter by budget; if too few after filtering, use all nearby restaurants
+    in_budget = budget_mask(index, budget)[rows]
+    if in_budget.sum() >= 2:
+        rows, distances = rows[in_budget], distances[in_budget]
+    
+    # Sort by quality AND distance (prefer closer restaurants)
+    scores = index.quality[rows] * 10 - (distances if poi_center else 999)
+    order = np.argsort(-scores, kind='stable')
+    rows, distances = rows[order], distances[order]
+    
+    lunch_ok = index.lunch_ok[rows]
+    dinner_ok = index.dinner_ok[rows]
+    lunch_suitable = np.flatnonzero(lunch_ok & ~dinner_ok)
+    dinner_suitable = np.flatnonzero(dinner_ok & ~lunch_ok)
+    both_suitable = np.flatnonzero(lunch_ok & dinner_ok)
+    
+    # Select lunch restaurant (positions into rows)
+    if len(lunch_suitable):
+        lunch_pos = lunch_suitable[0]
+    elif len(both_suitable):
+        lunch_pos = both_suitable[0]
+    else:
+        lunch_pos = 0
     
-    for restaurant in filtered:
-        category = categorize_restaurant_by_time(restaurant)
-        
-        if category == 'lunch':
-            lunch_suitable.append(restaurant)
-        elif category == 'dinner':
-            dinner_suitable.append(restaurant)
-        else:  # both
-            both_suitable.append(restaurant)
-    
-    # Sort by rating AND distance (prefer closer restaurants)
-    def sort_key(r):
-        rating = r.get('rating') or 0
-        distance = r.get('distance_from_pois', 999)
-        # Score: higher rating is better, lower distance is better
-        return (rating * 10 - distance)
-    
-    lunch_suitable.sort(key=sort_key, reverse=True)
-    dinner_suitable.sort(key=sort_key, reverse=True)
-    both_suitable.sort(key=sort_key, reverse=True)
-    filtered_sorted = sorted(filtered, key=sort_key, reverse=True)
-    
-    # Select lunch restaurant
-    lunch_restaurant = None
-    if lunch_suitable:
-        lunch_restaurant = lunch_suitable[0]
-    elif both_suitable:
-        lunch_restaurant = both_suitable[0]
-    elif filtered_sorted:
-        lunch_restaurant = filtered_sorted[0]
-    
-    # Select dinner restaurant (different from lunch)
-    dinner_restaurant = None
-    if dinner_suitable:
-        dinner_restaurant = dinner_suitable[0]
+    # Select dinner restaurant (different from lunch when possible)
+    if len(dinner_suitable):
+        dinner_pos = dinner_suitable[0]
     elif len(both_suitable) > 1:
         # Use second option from both_suitable
-        dinner_restaurant = both_suitable[1]
-    elif both_suitable and both_suitable[0] != lunch_restaurant:
-        dinner_restaurant = both_suitable[0]
-    elif len(filtered_sorted) > 1:
-        # Pick a different restaurant from filtered list
-        for r in filtered_sorted:
-            if r != lunch_restaurant:
-                dinner_restaurant = r
-                break
-    
-    # If still no dinner restaurant, use any available (even if same as lunch)
-    if not dinner_restaurant and filtered_sorted:
-        dinner_restaurant = filtered_sorted[1] if len(filtered_sorted) > 1 else filtered_sorted[0]
+        dinner_pos = both_suitable[1]
+    elif len(both_suitable) and both_suitable[0] != lunch_pos:
+        dinner_pos = both_suitable[0]
+    elif len(rows) > 1:
+        # Pick a different restaurant from the ranked list
+        dinner_pos = 1 if lunch_pos == 0 else 0
+    else:
+        # Only one restaurant available - use it for both meals
+        dinner_pos = 0
+    
+    def pick(pos):
+        return restaurant_copy(index, int(rows[pos]), distances[pos] if poi_center else None)
     
     return {
-        'lunch': lunch_restaurant,
-        'dinner': dinner_restaurant
+        'lunch': pick(lunch_pos),
+        'dinner': pick(dinner_pos)
     }
 
 
+# ============================================================================
+# SPATIAL INDEX + ROUTE-AWARE ASSIGNMENT
+# ============================================================================
+
+# Allowed price tiers per budget (see restaurant_price_tier)
+BUDGET_PRICE_TIERS = {
+    'budget': (1, 2),
+    'mid-range': (2, 3),
+    'luxury': (3, 4),
+}
+
+GRID_CELL_DEG = 0.01          # Grid cell size (~1.1 km of latitude)
+MEAL_RADIUS_KM = 1.5          # Walking distance from the meal position
+MEAL_CANDIDATES = 8           # Nearest candidates ranked per meal
+MIN_RESTAURANT_REVIEWS = 20   # Fewer reviews (but not zero/unknown) = not trusted
+
+
+def get_lat_lon(item):
+    """(lat, lon) floats from a POI/restaurant dict, or None"""
+    coords = item.get('coordinates') or {}
+    lat = coords.get('lat') or coords.get('latitude') or item.get('lat') or item.get('latitude')
+    lon = (coords.get('lon') or coords.get('lng') or coords.get('longitude')
+           or item.get('lon') or item.get('lng') or item.get('longitude'))
+    try:
+        return float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+
+
+def city_index_key(city_name):
+    """Normalized city key with aliases folded in ("Sevilla" and "Seville" → "seville")"""
+    key = normalize_city_name(city_name)
+    return normalize_city_name(CITY_ALIASES.get(key, key))
+
+
+def city_keys_partial_match(key1, key2):
+    """Partial city match for longer names ("granada province" ↔ "granada"), as cities_match in the generator"""
+    return len(key1) > 3 and len(key2) > 3 and (key1 in key2 or key2 in key1)
+
+
+def haversine_km_array(lat, lon, lats, lons):
+    """Distances in km from one point to arrays of coordinates"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 6371.0 * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class RestaurantIndex:
+    """
+    Restaurants as NumPy columns plus a per-city uniform grid.
+
+    A radius query only touches the grid cells covering the radius, so a
+    meal lookup costs the handful of restaurants around the point instead
+    of a scan over the whole dataset.
+    """
+
+    def __init__(self, restaurants, cell_deg=GRID_CELL_DEG):
+        self.restaurants = restaurants
+        self.cell_deg = cell_deg
+
+        coords = [get_lat_lon(r) for r in restaurants]
+        self.lat = np.array([c[0] if c else np.nan for c in coords], dtype=np.float64)
+        self.lon = np.array([c[1] if c else np.nan for c in coords], dtype=np.float64)
+        columns = restaurant_columns(restaurants)
+        self.rating = columns['rating']
+        self.quality = columns['quality']
+        self.reviews = columns['reviews']
+        self.price_tier = columns['price_tier']     # 0 = unknown
+        self.lunch_ok = columns['lunch_ok']
+        self.dinner_ok = columns['dinner_ok']
+
+        city_rows = {}
+        grid = {}
+        for i, (restaurant, coord) in enumerate(zip(restaurants, coords)):
+            city_key = city_index_key(restaurant.get('city', ''))
+            city_rows.setdefault(city_key, []).append(i)
+            if coord:
+                grid.setdefault((city_key,) + self._cell(*coord), []).append(i)
+
+        self.city_rows = {k: np.array(v, dtype=np.int64) for k, v in city_rows.items()}
+        self._grid = {k: np.array(v, dtype=np.int64) for k, v in grid.items()}
+        self._city_keys = {}
+
+    def __len__(self):
+        return len(self.restaurants)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def city_keys(self, city):
+        """
+        Index city keys a city name resolves to (memoized).
+
+        The exact (alias-folded) key when it has restaurants, else every key
+        that partially matches the name ("Granada Province", "Near Ronda",
+        "Priego de Córdoba"), like the per-restaurant cities_match scan did.
+        """
+        keys = self._city_keys.get(city)
+        if keys is None:
+            key = city_index_key(city)
+            if key in self.city_rows:
+                keys = (key,)
+            else:
+                names = {key, normalize_city_name(city)}
+                keys = tuple(k for k in self.city_rows
+                             if any(city_keys_partial_match(k, name) for name in names))
+            self._city_keys[city] = keys
+        return keys
+
+    def rows_for_city(self, city):
+        """All rows of a city's restaurants"""
+        chunks = [self.city_rows[key] for key in self.city_keys(city)]
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def city_center(self, city):
+        """Mean coordinates of a city's restaurants, or None"""
+        rows = self.rows_for_city(city)
+        if not len(rows) or not np.isfinite(self.lat[rows]).any():
+            return None
+        return (float(np.nanmean(self.lat[rows])), float(np.nanmean(self.lon[rows])))
+
+    def _rows_near(self, city_keys, lat, lon, max_km):
+        """City rows in the grid cells that cover max_km around (lat, lon)"""
+        lat_cells = math.ceil(max_km / (111.0 * self.cell_deg))
+        lon_cells = math.ceil(max_km / (111.0 * self.cell_deg * max(math.cos(math.radians(lat)), 0.1)))
+        ci, cj = self._cell(lat, lon)
+        chunks = [
+            self._grid[key]
+            for key in ((city_key, ci + di, cj + dj)
+                        for city_key in city_keys
+                        for di in range(-lat_cells, lat_cells + 1)
+                        for dj in range(-lon_cells, lon_cells + 1))
+            if key in self._grid
+        ]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def nearest(self, city, point=None, max_km=None, allowed=None):
+        """
+        City restaurants ordered by distance from point.
+
+        Args:
+            city: City name
+            point: (lat, lon) or None (no distance ordering)
+            max_km: Radius limit (None = whole city)
+            allowed: Optional bool array over all restaurants
+
+        Returns:
+            (rows, distances_km): int and float arrays, closest first
+        """
+        city_keys = self.city_keys(city)
+        if point is not None and max_km is not None:
+            rows = self._rows_near(city_keys, point[0], point[1], max_km)
+        else:
+            rows = self.rows_for_city(city)
+
+        if allowed is not None and len(rows):
+            rows = rows[allowed[rows]]
+
+        if point is None or not len(rows):
+            return rows, np.zeros(len(rows))
+
+        distances = haversine_km_array(point[0], point[1], self.lat[rows], self.lon[rows])
+        # Restaurants without coordinates sort last (NaN → inf)
+        distances = np.where(np.isnan(distances), np.inf, distances)
+        if max_km is not None:
+            keep = distances <= max_km
+            rows, distances = rows[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return rows[order], distances[order]
+
+
+def meal_positions(pois):
+    """
+    Lunch and dinner positions along a day's ordered POI path.
+
+    Lunch sits halfway along the path (between the last morning and the
+    first afternoon POI), dinner at the last POI of the day.
+
+    Returns:
+        (lunch_point, dinner_point): (lat, lon) tuples, or None when no POI has coordinates
+    """
+    points = [p for p in (get_lat_lon(poi) for poi in pois) if p]
+    if not points:
+        return None, None
+    if len(points) == 1:
+        return points[0], points[0]
+
+    mid = len(points) // 2
+    (lat1, lon1), (lat2, lon2) = points[mid - 1], points[mid]
+    return ((lat1 + lat2) / 2, (lon1 + lon2) / 2), points[-1]
+
+
+def budget_mask(index, budget):
+    """Bool array: restaurants whose price tier fits the budget (unknown tier always fits)"""
+    tiers = BUDGET_PRICE_TIERS.get(budget, BUDGET_PRICE_TIERS['mid-range'])
+    return (index.price_tier == 0) | np.isin(index.price_tier, tiers)
+
+
+def restaurant_copy(index, row, distance=None):
+    """Copy of an indexed restaurant (compiled fields removed), with 'distance_from_pois' when known"""
+    restaurant = strip_compiled_fields(index.restaurants[row])
+    if distance is not None and np.isfinite(distance):
+        restaurant['distance_from_pois'] = round(float(distance), 2)
+    return restaurant
+
+
+class RouteRestaurantAssigner:
+    """
+    Trip-wide lunch/dinner assignment near each day's POI path.
+
+    Each restaurant is used at most once per trip. Meals are picked among the
+    MEAL_CANDIDATES nearest trusted restaurants within walking distance,
+    relaxing meal suitability, then budget, then the radius if needed.
+    """
+
+    def __init__(self, restaurants, budget='mid-range', radius_km=MEAL_RADIUS_KM,
+                 candidates=MEAL_CANDIDATES):
+        self.index = restaurants if isinstance(restaurants, RestaurantIndex) else RestaurantIndex(restaurants)
+        self.radius_km = radius_km
+        self.candidates = candidates
+
+        index = self.index
+        self.in_budget = budget_mask(index, budget)
+        self.trusted = (index.reviews == 0) | (index.reviews >= MIN_RESTAURANT_REVIEWS)
+        self.used = np.zeros(len(index), dtype=bool)
+
+    def pick(self, city, point, meal='lunch'):
+        """Best unused restaurant for a meal near point (marked as used), or None"""
+        index = self.index
+        available = self.trusted & ~self.used
+        suitable = index.dinner_ok if meal == 'dinner' else index.lunch_ok
+        masks = (
+            available & suitable & self.in_budget,
+            available & suitable,
+            available & self.in_budget,
+            available,
+        )
+        for max_km in (self.radius_km, None):
+            for allowed in masks:
+                rows, distances = index.nearest(city, point, max_km, allowed)
+                if not len(rows):
+                    continue
+
+                rows, distances = rows[:self.candidates], distances[:self.candidates]
+                # Higher quality is better, lower distance is better (first max = closest)
+                scores = index.quality[rows] * 10 - np.where(np.isfinite(distances), distances, 999)
+                best = int(np.argmax(scores))
+                row = int(rows[best])
+                self.used[row] = True
+                return restaurant_copy(index, row, distances[best] if point is not None else None)
+        return None
+
+    def assign_day(self, city, pois):
+        """
+        Lunch and dinner for one day.
+
+        Args:
+            city: City the day is spent in
+            pois: The day's POIs in visiting order
+
+        Returns:
+            (lunch, dinner): restaurant dicts (copies) or None
+        """
+        lunch_point, dinner_point = meal_positions(pois)
+        if lunch_point is None:
+            lunch_point = dinner_point = self.index.city_center(city)
+        return self.pick(city, lunch_point, 'lunch'), self.pick(city, dinner_point, 'dinner')
+
+
 def get_fallback_restaurant(city, meal_type='lunch'):
     """
     Create a fallback restaurant placeholder when no data available
@@ -331,6 +705,8 @@ def add_restaurants_to_itinerary(itinerary, all_restaurants, budget='mid-range',
     """
     Add restaurant recommendations NEAR POIs to each day in the itinerary
     """
+    index = RestaurantIndex(all_restaurants)
+    
     for day in itinerary:
         city = day.get('city', '')
         
@@ -340,7 +716,7 @@ def add_restaurants_to_itinerary(itinerary, all_restaurants, budget='mid-range',
             all_pois.extend(city_stop.get('attractions', []))
         
         # Get restaurant recommendations NEAR the POIs
-        restaurants = select_restaurants_for_day(city, all_restaurants, all_pois, budget, preferences)
+        restaurants = select_restaurants_for_day(city, all_restaurants, all_pois, budget, preferences, index=index)
         
         # Add to day
         lunch = restaurants['lunch'] if restaurants['lunch'] else get_fallback_restaurant(city, 'lunch')
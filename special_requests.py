@@ -0,0 +1,236 @@
+# coding: utf-8
+"""
+Special Requests Parser - free-text trip notes → structured constraints
+
+One parser shared by the route generator, the day allocator and the
+validation system:
+- patterns compiled once at import
+- city names resolved through the city registry (aliases, accents, case)
+- result memoized on (notes text, known city labels)
+
+Usage:
+    from special_requests import parse_special_requests
+    constraints = parse_special_requests("Avoid Cádiz. 3 days in Sevilla", known_cities)
+    constraints.avoid_cities      # → ('Cádiz',)
+    constraints.durations()       # → {'seville': 3}
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+from city_registry import get_city_registry
+from day_allocation import normalize_city_for_allocation
+from text_norm import norm_key
+
+# Max number of distinct (notes, known cities) results kept
+PARSE_CACHE_SIZE = 256
+
+
+# ============================================================================
+# PATTERNS (compiled once)
+# ============================================================================
+
+# Word numbers → digits (longer phrases first, whole words only)
+WORD_NUMBERS = (
+    ('only one', '1'),
+    ('just one', '1'),
+    ('a single', '1'),
+    ('single', '1'),
+    ('one', '1'),
+    ('two', '2'),
+    ('three', '3'),
+    ('four', '4'),
+    ('five', '5'),
+    ('six', '6'),
+    ('seven', '7'),
+    ('eight', '8'),
+    ('nine', '9'),
+    ('ten', '10'),
+)
+_WORD_NUMBER_VALUES = dict(WORD_NUMBERS)
+_WORD_NUMBER_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(word) for word, _ in WORD_NUMBERS) + r')\b'
+)
+
+# A phrase runs until punctuation, a line break or the end of the notes
+_PHRASE = r"([^,.;:!?\n]+)"
+
+AVOID_PATTERNS = tuple(re.compile(p) for p in (
+    r'\bavoid\s+' + _PHRASE,
+    r'\bskip\s+' + _PHRASE,
+    r'\bno\s+' + _PHRASE,
+    r"\bdon'?t\s+(?:go\s+to\s+|visit\s+)?" + _PHRASE,
+    r'\bexclude\s+' + _PHRASE,
+    r'\bnot\s+interested\s+in\s+' + _PHRASE,
+))
+
+MUST_SEE_PATTERNS = tuple(re.compile(p) for p in (
+    r'\bmust\s+(?:see|visit)\s+' + _PHRASE,
+    r'\bdefinitely\s+(?:see|visit)\s+' + _PHRASE,
+    r'\binclude\s+' + _PHRASE,
+))
+
+# Pattern: "X days in CITY" or "CITY for X days" or "stay in CITY X days/nights"
+DURATION_PATTERNS = tuple(re.compile(p) for p in (
+    r'(\d+)\s*days?\s*(?:in|at)\s*(\w+)',  # "3 days in Seville"
+    r'(\w+)\s*(?:for|:)\s*(?:only\s*)?(\d+)\s*days?',  # "Seville for 3 days" or "Seville for only 1 day"
+    r'stay\s*(?:in|at)?\s*(\w+)\s*(?:for)?\s*(\d+)\s*(?:days?|nights?)',  # "stay in Granada 4 nights"
+    r'(\w+)\s*(\d+)\s*(?:days?|nights?)',  # "Granada 4 days"
+    r'spend\s*(\d+)\s*days?\s*(?:in|at)\s*(\w+)',  # "spend 3 days in Seville"
+    r'(\w+)\s*for\s*(?:only\s*)?(\d+)\s*day',  # "Seville for only 1 day"
+    r'only\s*(\d+)\s*days?\s*(?:in|at|for)\s*(\w+)',  # "only 1 day in Seville"
+    r'(\w+)\s*(?:just|only)\s*(\d+)\s*days?',  # "Seville just 1 day"
+))
+
+# "seville and cordoba", "ronda / nerja", "cadiz & jerez"
+_LIST_SPLIT_RE = re.compile(r'\s+(?:and|or|&)\s+|\s*[/&]\s*')
+
+# Fallback city names for duration requests when the token is not a known label
+DURATION_CITIES = ('seville', 'sevilla', 'granada', 'cordoba', 'córdoba', 'malaga', 'málaga',
+                   'ronda', 'cadiz', 'cádiz', 'jerez', 'marbella', 'nerja', 'tarifa', 'antequera')
+
+
+# ============================================================================
+# CONSTRAINTS
+# ============================================================================
+
+@dataclass(frozen=True)
+class TripConstraints:
+    """Structured result of parsing a trip's special-request notes"""
+    notes: str
+    avoid_cities: Tuple[str, ...] = ()               # Canonical labels, in order of mention
+    must_see_cities: Tuple[str, ...] = ()            # Canonical labels, in order of mention
+    stay_duration: Tuple[Tuple[str, int], ...] = ()  # (allocation city key, days)
+    unresolved: Tuple[str, ...] = ()                 # Avoid/must-see phrases naming no known city
+
+    def durations(self):
+        """Duration overrides as {allocation city key: days} (a fresh dict)"""
+        return dict(self.stay_duration)
+
+    def avoids(self, city):
+        """True if the notes ask to avoid this city"""
+        key = norm_key(city)
+        return any(norm_key(c) == key for c in self.avoid_cities)
+
+    def requires(self, city):
+        """True if the notes ask to see this city"""
+        key = norm_key(city)
+        return any(norm_key(c) == key for c in self.must_see_cities)
+
+    def __bool__(self):
+        return bool(self.avoid_cities or self.must_see_cities or self.stay_duration)
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def words_to_digits(text):
+    """Replace word numbers ("one", "only one", "a single", ...) with digits"""
+    return _WORD_NUMBER_RE.sub(lambda m: _WORD_NUMBER_VALUES[m.group(0)], text)
+
+
+def _resolve_phrase(phrase, registry):
+    """
+    City label named by a phrase: the whole phrase, else its longest leading
+    run of words ("seville for 2 days" → Seville). None if no city matches.
+    """
+    words = phrase.split()
+    for end in range(len(words), 0, -1):
+        label = registry.lookup(' '.join(words[:end]))
+        if label:
+            return label
+    return None
+
+
+def _collect_cities(patterns, text, registry, unresolved):
+    """Resolved city labels for every phrase the patterns capture (deduplicated)"""
+    found = []
+    for pattern in patterns:
+        for match in pattern.findall(text):
+            for phrase in _LIST_SPLIT_RE.split(match.strip()):
+                phrase = phrase.strip()
+                if len(phrase) <= 2:
+                    continue
+                label = _resolve_phrase(phrase, registry)
+                if label is None:
+                    unresolved.append(phrase)
+                elif label not in found:
+                    found.append(label)
+    return found
+
+
+def _duration_city_key(token, registry):
+    """Allocation key (see day_allocation) for a city token, or None"""
+    label = registry.lookup(token)
+    if label:
+        return normalize_city_for_allocation(label) or None
+
+    for known_city in DURATION_CITIES:
+        if known_city.startswith(token) or token.startswith(known_city[:4]):
+            return normalize_city_for_allocation(known_city) or None
+    return None
+
+
+def _collect_durations(text, registry):
+    """{allocation city key: days}; later patterns override earlier ones"""
+    overrides = {}
+    for pattern in DURATION_PATTERNS:
+        for first, second in pattern.findall(text):
+            # Determine which group is city and which is number
+            if first.isdigit():
+                days, city = int(first), second
+            elif second.isdigit():
+                city, days = first, int(second)
+            else:
+                continue  # Skip if no valid number
+
+            city_key = _duration_city_key(city, registry)
+            if city_key:
+                overrides[city_key] = days
+    return overrides
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(notes, known_city_labels):
+    registry = get_city_registry(known_city_labels)
+    text = notes.lower()
+    unresolved = []
+
+    avoid = _collect_cities(AVOID_PATTERNS, text, registry, unresolved)
+    must_see = _collect_cities(MUST_SEE_PATTERNS, text, registry, unresolved)
+    durations = _collect_durations(words_to_digits(text), registry)
+
+    return TripConstraints(
+        notes=notes,
+        avoid_cities=tuple(avoid),
+        must_see_cities=tuple(must_see),
+        stay_duration=tuple(durations.items()),
+        unresolved=tuple(unresolved),
+    )
+
+
+def parse_special_requests(notes, known_cities=()):
+    """
+    Parse free-text special requests into trip constraints.
+
+    Examples:
+        "Avoid Cádiz, must see Ronda" → avoid ('Cádiz',), must see ('Ronda',)
+        "Stay in Granada 4 nights"    → stay_duration (('granada', 4),)
+        "Seville for only one day"    → stay_duration (('seville', 1),)
+
+    Args:
+        notes: Free-text special requests (may be empty)
+        known_cities: City labels that avoid/must-see phrases may resolve to
+
+    Returns:
+        TripConstraints (cached, shared - treat as read-only)
+    """
+    return _parse(notes or '', frozenset(c for c in known_cities if c))
+
+
+def clear_parse_cache():
+    """Drop all memoized parse results"""
+    _parse.cache_clear()
@@ -35,6 +35,9 @@ def canonicalize_city(user_city, known_city_labels):
     """
     Convert user input to canonical city name from dataset
     
+    Resolution order: alias map → exact match (case/accent/space insensitive)
+    → prefix match. See city_registry.CityRegistry.
+    
     Args:
         user_city: City name from user input (e.g., "malaga", "Málaga", "MALAGA")
         known_city_labels: Set of actual city names in your dataset
@@ -45,27 +48,6 @@ def canonicalize_city(user_city, known_city_labels):
     if not user_city:
         return None
     
-    # Normalize the user input
-    key = norm_key(user_city)
-    
-    # 1) Check alias map first (this gives us ASCII versions)
-    if key in CITY_ALIASES:
-        alias_result = CITY_ALIASES[key]
-        # Now match the alias result against known cities
-        alias_key = norm_key(alias_result)
-        for label in known_city_labels:
-            if norm_key(label) == alias_key:
-                return label
-        # If alias doesn't match, continue to step 2
-    
-    # 2) Direct exact match (case/accent/space insensitive)
-    for label in known_city_labels:
-        if norm_key(label) == key:
-            return label
-    
-    # 3) Gentle fallback: prefix match (helps with typos)
-    for label in known_city_labels:
-        if norm_key(label).startswith(key):
-            return label
-    
-    return None
+    # Prebuilt exact map / prefix trie, cached per set of known labels
+    from city_registry import get_city_registry
+    return get_city_registry(known_city_labels).canonicalize(user_city)
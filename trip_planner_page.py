@@ -9,6 +9,7 @@ from urllib.parse import quote_plus
 # ✅ CRITICAL: Use car-based generator
 from itinerary_generator_car import generate_simple_trip
 from document_generator import build_word_doc
+from excel_generator import build_excel
 from restaurant_service import get_restaurant_tips
 from text_norm import canonicalize_city, norm_key  # ✅ NEW: Import text normalization
 from date_picker_system import create_date_picker
@@ -45,7 +46,7 @@ except Exception as e:
 
 # Import events service
 try:
-    from events_service import get_events_for_trip
+    from events_service import get_trip_events
     EVENTS_AVAILABLE = True
 except ImportError:
     EVENTS_AVAILABLE = False
@@ -85,6 +86,9 @@ def get_video_generator():
 TRIPS_DIR = "trips"
 os.makedirs(TRIPS_DIR, exist_ok=True)
 
+# "Compact PDF" size budget - small enough for most mail attachment limits
+COMPACT_PDF_SIZE_MB = 5
+
 def add_plan_again_button():
     """
     Add a 'Plan Again' button that clears the itinerary but preserves form values
@@ -1110,31 +1114,11 @@ def display_itinerary(result, prefs, days, attractions, hotels, restaurants):
                 trip_end = (datetime.now() + timedelta(days=30+days)).strftime('%Y-%m-%d')
             
             # ✅ Check ALL major Andalusia cities for events (not just user's cities)
-            all_events = []
-            
-            # Major cities to always check for events
             major_cities = ['Seville', 'Granada', 'Córdoba', 'Málaga', 'Cádiz', 'Jerez', 'Ronda']
+            cities_to_check = [c.title() for c in ordered_cities] + major_cities
             
-            # Combine user's cities with major cities (no duplicates)
-            cities_to_check = list(set([c.title() for c in ordered_cities] + major_cities))
-            
-            for city in cities_to_check:
-                city_events = get_events_for_trip(city, trip_start, trip_end)
-                all_events.extend(city_events)
-            
-            
-            # Remove duplicates based on name and date
-            seen = set()
-            unique_events = []
-            for event in all_events:
-                key = (event.get('name'), event.get('date'))
-                if key not in seen:
-                    seen.add(key)
-                    unique_events.append(event)
-            
-            # Sort by tier (tier_1 first) then by date
-            tier_order = {'tier_1': 0, 'tier_2': 1, 'tier_3': 2}
-            unique_events.sort(key=lambda x: (tier_order.get(x.get('tier', 'tier_3'), 3), x.get('date', '')))
+            # Feeds fetched once per date window, cached per (cities, dates) across reruns
+            unique_events = get_trip_events(cities_to_check, trip_start, trip_end)
             
             # ✅ Store events in session state for PDF to reuse (single source of truth)
             st.session_state['trip_events'] = unique_events
@@ -1315,6 +1299,30 @@ def display_itinerary(result, prefs, days, attractions, hotels, restaurants):
     </div>
     """, unsafe_allow_html=True)
     
+    # Get start_date from session state (same as UI uses)
+    pdf_start_date = st.session_state.get('current_trip_start_date')
+    
+    # ✅ SINGLE SOURCE OF TRUTH: Use events already fetched by UI (stored in session state)
+    # This ensures PDF shows EXACTLY the same events as the UI
+    pdf_events = st.session_state.get('trip_events', [])
+    
+    # Add start_date and events to result for PDF / Word
+    result_with_extras = dict(result) if result else {}
+    result_with_extras['start_date'] = pdf_start_date
+    result_with_extras['events'] = pdf_events
+    
+    export_kwargs = dict(
+        itinerary=itinerary,
+        hop_kms=hop_kms,
+        maps_link=maps_link,
+        ordered_cities=ordered_cities,
+        days=total_trip_days,
+        prefs=prefs,
+        parsed_requests=result.get("parsed_requests", {}),
+        is_car_mode=True,
+        result=result_with_extras
+    )
+    
     # Generate files
     with st.spinner(""):
         col1, col2 = st.columns(2)
@@ -1322,7 +1330,7 @@ def display_itinerary(result, prefs, days, attractions, hotels, restaurants):
         # Excel export
         with col1:
             try:
-                excel_file = build_excel(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, is_car_mode)
+                excel_file = build_excel(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, is_car_mode, result=result_with_extras)
                 st.download_button(
                     label="📊 Download Excel",
                     data=excel_file,
@@ -1333,130 +1341,108 @@ def display_itinerary(result, prefs, days, attractions, hotels, restaurants):
             except Exception as e:
                 st.error(f"❌ Error generating Excel: {str(e)}")
         
-        # PDF export (with photos, styling, and clickable links)
+        # PDF export (with photos, styling, and clickable links) - built by a background export worker
         with col2:
             try:
-                from pdf_generator import build_pdf
-                
-                # Get start_date from session state (same as UI uses)
-                pdf_start_date = st.session_state.get('current_trip_start_date')
-                
-                # ✅ SINGLE SOURCE OF TRUTH: Use events already fetched by UI (stored in session state)
-                # This ensures PDF shows EXACTLY the same events as the UI
-                pdf_events = st.session_state.get('trip_events', [])
-                
-                print(f"[PDF] Using {len(pdf_events)} events from session state (same as UI)")
-                
-                # Add start_date and events to result for PDF
-                result_with_extras = dict(result) if result else {}
-                result_with_extras['start_date'] = pdf_start_date
-                result_with_extras['events'] = pdf_events
-                
-                print(f"[PDF] Passing to PDF - start_date: {pdf_start_date}, events: {len(pdf_events)}")
-                
-                pdf_buffer = build_pdf(
-                    itinerary=itinerary,
-                    hop_kms=hop_kms,
-                    maps_link=maps_link,
-                    ordered_cities=ordered_cities,
-                    days=total_trip_days,
-                    prefs=prefs,
-                    parsed_requests=result.get("parsed_requests", {}),
-                    is_car_mode=True,
-                    result=result_with_extras
+                compact_pdf = st.checkbox(
+                    f"📉 Compact PDF (under {COMPACT_PDF_SIZE_MB} MB, for e-mail)",
+                    key="pdf_compact"
                 )
-                
-                st.download_button(
+                render_export_job(
+                    'pdf',
+                    dict(export_kwargs, target_size_mb=COMPACT_PDF_SIZE_MB if compact_pdf else None),
                     label="📄 Download PDF",
-                    data=pdf_buffer,
                     file_name=f"andalusia_trip_{datetime.now().strftime('%Y%m%d')}.pdf",
                     mime="application/pdf",
-                    use_container_width=True
                 )
             except Exception as e:
                 st.error(f"❌ Error generating PDF: {str(e)}")
                 import traceback
                 traceback.print_exc()
     
+    # ✅ NEW: Everything in one ZIP - formats rendered side by side by the export worker
+    # Only submitted once the user asks for it (per bundle variant), so rendering
+    # the page never starts a second full export or a slideshow on its own
+    try:
+        from export_worker import export_job_id
+        
+        include_slideshow = st.checkbox(
+            "🎬 Include POI slideshow video (takes a few minutes)",
+            key="bundle_include_slideshow"
+        )
+        bundle_formats = ['xlsx', 'pdf', 'docx'] + (['slideshow'] if include_slideshow else [])
+        bundle_kwargs = dict(
+            formats=bundle_formats,
+            export=export_kwargs,
+            slideshow=dict(result=result) if include_slideshow else None,
+        )
+        bundle_id = export_job_id('bundle', bundle_kwargs)
+        requested_bundles = st.session_state.setdefault('requested_export_bundles', set())
+        
+        if bundle_id not in requested_bundles:
+            prepare_label = "📦 Prepare ZIP with slideshow" if include_slideshow else "📦 Prepare ZIP"
+            if st.button(prepare_label, key="prepare_bundle", use_container_width=True):
+                requested_bundles.add(bundle_id)
+                st.rerun()
+        else:
+            render_export_job(
+                'bundle',
+                bundle_kwargs,
+                label="📦 Download everything (ZIP)",
+                file_name=f"andalusia_trip_{datetime.now().strftime('%Y%m%d')}.zip",
+                mime="application/zip",
+            )
+    except Exception as e:
+        st.error(f"❌ Error generating bundle: {str(e)}")
+    
     # Clear the loading message after files are ready
     loading_placeholder.empty()
     
     # Video feature removed - focusing on PDF/Excel exports
 
 
-def build_excel(itinerary, hop_kms, maps_link, ordered_cities, days, prefs, is_car_mode=False):
-    """Build Excel export with car-specific columns"""
-    import pandas as pd
-    import io
-    
-    rows = []
-    for i, d in enumerate(itinerary):
-        day_type = d.get("type", "base_city")
-        overnight = d.get("overnight_city", d.get("city", "?"))
-        city_visited = d.get("city", "?")
-        base = d.get("base", city_visited)
-        
-        cities_list = d.get("cities", [])
-        all_pois = []
-        for city_stop in cities_list:
-            all_pois.extend(city_stop.get("attractions", []))
-        
-        poi_names = ", ".join(a.get("name") or "Unknown" for a in all_pois if a.get("name"))
-        hotel_names = ", ".join(h.get("name") or "?" for h in d.get("hotels", []) if h.get("name"))
-        
-        lunch_restaurant = d.get("lunch_restaurant")
-        lunch_name = lunch_restaurant.get("name", "") if lunch_restaurant else ""
-
-        dinner_restaurant = d.get("dinner_restaurant")
-        dinner_name = dinner_restaurant.get("name", "") if dinner_restaurant else ""
-        
-        driving_km = d.get("driving_km", 0)
-        driving_hours = d.get("driving_hours", 0)
-        
-        row_data = {
-            "Day": d["day"],
-            "City": city_visited,
-            "POIs": poi_names,
-            "Hotels": hotel_names,
-            "Lunch": lunch_name,
-            "Dinner": dinner_name
-        }
-        
-        if is_car_mode:
-            row_data["Type"] = day_type.replace("_", " ").title()
-            row_data["Base"] = base
-            row_data["Driving (km)"] = driving_km
-            row_data["Drive Time (h)"] = driving_hours
-        
-        rows.append(row_data)
-    
-    df = pd.DataFrame(rows)
-    
-    # Reorder columns for car mode
-    if is_car_mode:
-        col_order = ["Day", "Type", "Base", "City", "Driving (km)", "Drive Time (h)", "POIs", "Hotels", "Lunch", "Dinner"]
-        df = df[[c for c in col_order if c in df.columns]]
+def render_export_job(kind, export_kwargs, label, file_name, mime):
+    """
+    Submit an export to the background export worker and show its progress,
+    a cancel button, and the download button once the file is ready.
     
-    bio = io.BytesIO()
-    with pd.ExcelWriter(bio, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Itinerary")
+    Identical exports (same itinerary) share one job across reruns and sessions.
+    A failed or cancelled job stays finished until "Try again" resubmits it.
+    """
+    from export_worker import get_export_queue
+    
+    queue = get_export_queue()
+    job = queue.submit(kind, **export_kwargs)
+    polling = not job.finished
+    
+    def show_job():
+        current = queue.get(job.job_id) or job
+        if current.status == 'done':
+            st.download_button(
+                label=label,
+                data=current.result,
+                file_name=file_name,
+                mime=mime,
+                use_container_width=True,
+                key=f"download_{kind}"
+            )
+        elif current.finished:
+            st.error(f"❌ Error generating {kind.upper()}: {current.describe()}")
+            if st.button("🔁 Try again", key=f"retry_{kind}", use_container_width=True):
+                queue.submit(kind, resubmit=True, **export_kwargs)
+                st.rerun()
+        else:
+            st.progress(current.fraction, text=f"⏳ Generating {kind.upper()}... {current.describe()}")
+            if st.button("✖ Cancel", key=f"cancel_{kind}", use_container_width=True):
+                queue.cancel(current.job_id)
         
-        # Summary sheet
-        summary_data = {
-            "Trip Type": ["Road Trip (Car)" if is_car_mode else "Walking/Transit"],
-            "Start": [ordered_cities[0] if ordered_cities else "?"],
-            "End": [ordered_cities[-1] if len(ordered_cities) > 1 else ordered_cities[0]],
-            "Days": [days],
-            "Base Cities": [len(ordered_cities) if is_car_mode else "N/A"],
-            "Total Driving (km)": [sum(d.get('driving_km', 0) for d in itinerary)] if is_car_mode else ["N/A"],
-            "Budget": [prefs.get("budget", "?")],
-            "Pace": [prefs.get("pace", "?")]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, index=False, sheet_name="Summary")
+        # Poll until the job finishes, then one full rerun to stop polling
+        if polling and current.finished:
+            st.rerun()
     
-    bio.seek(0)
-    return bio
+    # Only poll (fragment reruns every second) while the job is still in progress
+    st.fragment(show_job, run_every=1.0 if polling else None)()
+
 
 def save_trip(result, prefs, ordered_cities, days):
     """Save trip to file"""
@@ -6,7 +6,8 @@ Prevents impossible or conflicting trip configurations
 
 import streamlit as st
 from datetime import timedelta
-from text_norm import canonicalize_city, norm_key
+from city_registry import get_city_registry
+from special_requests import parse_special_requests
 
 # ═══════════════════════════════════════════════════════════
 # CONSTRAINTS CONFIGURATION
@@ -59,28 +60,14 @@ def validate_city_exists(city_name, known_cities, context=""):
         return False, None, None
     
     # Try to canonicalize (handles accents, aliases, typos)
-    canonical = canonicalize_city(city_name, known_cities)
+    registry = get_city_registry(known_cities)
+    canonical = registry.canonicalize(city_name)
     
     if canonical:
         return True, canonical, None
     
-    # Not found - provide helpful suggestions
-    city_key = norm_key(city_name)
-    
-    # Find similar cities (fuzzy match)
-    suggestions = []
-    for known in known_cities:
-        known_key = norm_key(known)
-        
-        # Check if user input is substring of known city
-        if city_key in known_key or known_key in city_key:
-            suggestions.append(known)
-        
-        # Check for single character difference (typo)
-        if len(city_key) == len(known_key):
-            diff_count = sum(c1 != c2 for c1, c2 in zip(city_key, known_key))
-            if diff_count <= 2:  # Allow 1-2 character difference
-                suggestions.append(known)
+    # Not found - provide helpful suggestions (edit distance + trigram ranking)
+    suggestions = registry.suggest(city_name, limit=3)
     
     if suggestions:
         suggestion_text = f"Did you mean: {', '.join(suggestions[:3])}?"
@@ -226,27 +213,19 @@ def validate_special_requests(special_requests, start_city, end_city, cities_to_
     if not special_requests:
         return errors, warnings
     
-    text_lower = special_requests.lower()
-    avoid_keywords = ['avoid', 'skip', 'no', "don't visit", 'exclude', 'not interested']
     cities_mentioned = [start_city] + ([end_city] if end_city else []) + cities_to_include
+    constraints = parse_special_requests(special_requests, cities_mentioned)
     
     for city in cities_mentioned:
-        if not city:
+        if not city or not constraints.avoids(city):
             continue
-        city_lower = city.lower()
         
-        for keyword in avoid_keywords:
-            if keyword in text_lower and city_lower in text_lower:
-                city_pos = text_lower.find(city_lower)
-                keyword_pos = text_lower.find(keyword)
-                
-                if abs(city_pos - keyword_pos) < 30:
-                    if city == start_city:
-                        errors.append(f"❌ Conflict: You want to AVOID '{city}' but it's your START city!")
-                    elif city == end_city:
-                        errors.append(f"❌ Conflict: You want to AVOID '{city}' but it's your END city!")
-                    elif city in cities_to_include:
-                        errors.append(f"❌ Conflict: You want to AVOID '{city}' but you also want to VISIT it!")
+        if city == start_city:
+            errors.append(f"❌ Conflict: You want to AVOID '{city}' but it's your START city!")
+        elif city == end_city:
+            errors.append(f"❌ Conflict: You want to AVOID '{city}' but it's your END city!")
+        elif city in cities_to_include:
+            errors.append(f"❌ Conflict: You want to AVOID '{city}' but you also want to VISIT it!")
     
     return errors, warnings
 
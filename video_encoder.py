@@ -0,0 +1,205 @@
+"""
+Video writers for the POI slideshow
+===================================
+
+Two backends behind the same interface (write(frame, repeat=1) / close()):
+
+- FFmpegPipeWriter: raw RGB frames piped to a local ffmpeg (H.264, CRF/preset).
+  A static slide is sent once and stretched with timestamps, so the encoder
+  sees each distinct frame once instead of frames_per_slide copies.
+- Cv2Writer: OpenCV VideoWriter ('mp4v'), repeats frames. Fallback when no
+  ffmpeg is installed.
+
+ffmpeg is looked up in FFMPEG_BINARY, then PATH, then the imageio-ffmpeg
+package (pip install imageio-ffmpeg) if present.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+from typing import Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY')
+FFMPEG_CODEC = 'libx264'
+FFMPEG_CLOSE_TIMEOUT = 120      # Seconds to let ffmpeg finish the file after the last frame
+
+
+@lru_cache(maxsize=1)
+def find_ffmpeg() -> Optional[str]:
+    """Path of an ffmpeg binary with the H.264 encoder, or None"""
+    candidates = [FFMPEG_BINARY, shutil.which('ffmpeg')]
+    try:
+        import imageio_ffmpeg
+        candidates.append(imageio_ffmpeg.get_ffmpeg_exe())
+    except Exception:
+        pass
+
+    for path in candidates:
+        if not path or not os.path.isfile(path):
+            continue
+        try:
+            out = subprocess.run([path, '-hide_banner', '-encoders'], capture_output=True, text=True, timeout=20)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if FFMPEG_CODEC in out.stdout:
+            return path
+    return None
+
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def _frame_buffer(frame):
+    """Raw bytes of a frame array without copying when it is contiguous"""
+    return memoryview(frame).cast('B') if frame.flags['C_CONTIGUOUS'] else frame.tobytes()
+
+
+class FFmpegPipeWriter:
+    """
+    Pipe frames to ffmpeg and encode H.264.
+
+    Slideshows follow a fixed cadence: one held frame per slide, shown for
+    hold_frames, then transition_frames single frames. Each frame is piped
+    once and ffmpeg's setpts places it on the timeline, so held slides cost
+    one encoded frame (variable frame rate MP4).
+    """
+
+    name = 'ffmpeg'
+
+    def __init__(self, output_file, width, height, fps, hold_frames, transition_frames=0,
+                 crf=23, preset='superfast', ffmpeg=None):
+        self.output_file = output_file
+        self.frame_bytes = width * height * 3
+        self.hold_frames = max(1, int(hold_frames))
+        self.cycle = int(transition_frames) + 1
+        self.sent = 0           # Frames piped
+        self.frames = 0         # Frames on the timeline
+        self._last = None
+
+        # Timeline index of piped frame N: whole cycles, then position within the cycle
+        # (the held frame takes hold_frames slots, transition frames one each)
+        step = self.hold_frames + self.cycle - 1
+        pts = f"floor(N/{self.cycle})*{step}+mod(N,{self.cycle})+{self.hold_frames - 1}*gt(mod(N,{self.cycle}),0)"
+
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [
+                ffmpeg or find_ffmpeg(), '-hide_banner', '-loglevel', 'error', '-y',
+                '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+                '-vf', f"setpts='{pts}'", '-vsync', 'vfr',
+                '-c:v', FFMPEG_CODEC, '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+                '-movflags', '+faststart', output_file,
+            ],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr,
+        )
+
+    def write(self, frame, repeat=1):
+        """frame: RGB uint8 array (height, width, 3); repeat must follow the cadence"""
+        expected = self.hold_frames if self.sent % self.cycle == 0 else 1
+        if repeat != expected:
+            raise ValueError(f"Frame {self.sent}: repeat={repeat}, cadence expects {expected}")
+        data = _frame_buffer(frame)
+        if len(data) != self.frame_bytes:
+            raise ValueError(f"Frame has {len(data)} bytes, expected {self.frame_bytes}")
+        try:
+            self.process.stdin.write(data)
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg stopped: {self._error()}")
+        self._last = frame
+        self.sent += 1
+        self.frames += repeat
+
+    def close(self):
+        if self.process.stdin.closed:
+            return
+        # A held last frame needs a successor to keep its duration: send it once more
+        if self._last is not None and (self.sent - 1) % self.cycle == 0:
+            self.process.stdin.write(_frame_buffer(self._last))
+        self.process.stdin.close()
+        try:
+            returncode = self.process.wait(timeout=FFMPEG_CLOSE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            raise RuntimeError("ffmpeg did not finish in time")
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {self._error()}")
+        self._stderr.close()
+
+    def abort(self):
+        """Stop ffmpeg without finishing the file"""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self._stderr.close()
+
+    def _error(self):
+        self._stderr.seek(0)
+        return self._stderr.read().decode('utf-8', 'replace').strip()[-500:]
+
+
+class Cv2Writer:
+    """OpenCV VideoWriter ('mp4v'): every timeline frame is encoded"""
+
+    name = 'opencv'
+
+    def __init__(self, output_file, width, height, fps):
+        import cv2
+
+        self._cv2 = cv2
+        self.output_file = output_file
+        self.frames = 0
+        self._bgr = None            # Conversion buffer, reused for every frame
+        self.writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+
+    def isOpened(self):
+        return self.writer.isOpened()
+
+    def write(self, frame, repeat=1):
+        if self._bgr is None or self._bgr.shape != frame.shape:
+            self._bgr = frame.copy()
+        bgr = self._cv2.cvtColor(frame, self._cv2.COLOR_RGB2BGR, dst=self._bgr)
+        for _ in range(repeat):
+            self.writer.write(bgr)
+        self.frames += repeat
+
+    def close(self):
+        self.writer.release()
+
+    def abort(self):
+        self.writer.release()
+
+
+def open_video_writer(output_file, config, hold_frames, transition_frames):
+    """
+    Writer for a slideshow: ffmpeg when config.encoder allows it and one is
+    installed, otherwise OpenCV.
+
+    Returns:
+        FFmpegPipeWriter / Cv2Writer, or None if no writer could be opened
+    """
+    encoder = getattr(config, 'encoder', 'auto')
+    if encoder in ('auto', 'ffmpeg'):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg:
+            try:
+                return FFmpegPipeWriter(
+                    output_file, config.width, config.height, config.fps, hold_frames, transition_frames,
+                    crf=config.crf, preset=config.preset, ffmpeg=ffmpeg,
+                )
+            except OSError as e:
+                print(f"⚠️ Could not start ffmpeg ({e}), using OpenCV")
+        elif encoder == 'ffmpeg':
+            print("⚠️ ffmpeg not found (set FFMPEG_BINARY or pip install imageio-ffmpeg), using OpenCV")
+
+    try:
+        writer = Cv2Writer(output_file, config.width, config.height, config.fps)
+    except ImportError:
+        return None
+    return writer if writer.isOpened() else None
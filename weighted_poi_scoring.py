@@ -1,13 +1,159 @@
 """
 Weighted POI scoring system that prioritizes popular landmarks over obscure high-rated venues.
 Combines rating, review volume, and landmark importance.
+
+Scores are computed as one NumPy expression over the rating, reviews_count,
+importance and must-see columns of a POI list. Each city's ranking is cached
+per (dataset version, city, weight profile), so repeated calls for the same
+POI list (every day of a multi-day stay) skip the must-see matching and sort.
+The dataset version is fingerprinted once when the dataset is loaded
+(register_dataset()); lookups then only key on the POIs' identities.
 """
 
-import math
-from must_see_landmarks import is_must_see
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+from must_see_landmarks import MUST_SEE_LANDMARKS, poi_is_must_see
+
+
+# ============================================================================
+# WEIGHT PROFILES
+# ============================================================================
+
+@dataclass(frozen=True)
+class WeightProfile:
+    """Weights for the POI score (frozen, so a profile can key the ranking cache)"""
+    rating_weight: float = 1.0            # Multiplier on rating × reviews^exponent
+    review_exponent: float = 0.5          # 0.5 = square root of review count
+    # (reviews strictly above, bonus) - highest threshold first
+    popularity_tiers: Tuple[Tuple[int, float], ...] = ((5000, 20), (1000, 10), (500, 5))
+    must_see_bonus: float = 50            # Strong boost to ensure must-sees are always included
+    # (importance at least, bonus) - highest threshold first
+    importance_tiers: Tuple[Tuple[int, float], ...] = ((9, 15), (7, 8), (5, 3))
+
+
+DEFAULT_WEIGHT_PROFILE = WeightProfile()
+
+# Max number of cached city rankings (oldest evicted first)
+RANKING_CACHE_SIZE = 256
+
+_RANKING_CACHE = OrderedDict()
+
+# Fingerprint of the loaded dataset (set by register_dataset())
+_DATASET_VERSION = None
+
+# Must-see landmark table, part of every dataset fingerprint
+_MUST_SEE_DIGEST = hashlib.blake2b(
+    repr(sorted(MUST_SEE_LANDMARKS.items())).encode('utf-8'), digest_size=8
+).hexdigest()
+
+
+# ============================================================================
+# COLUMN EXTRACTION + VECTORIZED SCORE
+# ============================================================================
+
+def _number(value):
+    """Numeric field value with None/invalid treated as 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def poi_score_columns(pois, city_name=None):
+    """
+    Extract the scoring columns from a list of POIs.
+    
+    Args:
+        pois: List of POI dictionaries
+        city_name: Optional city name to check for must-see landmarks
+    
+    Returns:
+        dict: 'rating', 'reviews_count', 'importance' (float arrays) and 'must_see' (bool array)
+    """
+    n = len(pois)
+    rating = np.fromiter((_number(p.get('rating')) for p in pois), dtype=np.float64, count=n)
+    reviews = np.fromiter((_number(p.get('reviews_count')) for p in pois), dtype=np.float64, count=n)
+    importance = np.fromiter((_number(p.get('importance')) for p in pois), dtype=np.float64, count=n)
+    
+    if city_name:
+        must_see = np.fromiter(
+            (poi_is_must_see(p, city_name) for p in pois), dtype=bool, count=n
+        )
+    else:
+        must_see = np.zeros(n, dtype=bool)
+    
+    return {
+        'rating': rating,
+        'reviews_count': reviews,
+        'importance': importance,
+        'must_see': must_see,
+    }
+
+
+def _tier_bonus(values, tiers, inclusive):
+    """Bonus for the first (highest) tier each value reaches"""
+    if not tiers:
+        return np.zeros_like(values)
+    if inclusive:
+        conditions = [values >= threshold for threshold, _ in tiers]
+    else:
+        conditions = [values > threshold for threshold, _ in tiers]
+    return np.select(conditions, [float(bonus) for _, bonus in tiers], default=0.0)
 
 
-def calculate_weighted_score(poi, city_name=None):
+def score_components(columns, profile=DEFAULT_WEIGHT_PROFILE):
+    """
+    Compute the score breakdown for every POI at once.
+    
+    Formula: score = (rating × reviews^exponent) + popularity_bonus + must_see_bonus + importance_bonus
+    
+    Args:
+        columns: Output of poi_score_columns()
+        profile: WeightProfile to apply
+    
+    Returns:
+        dict: 'base', 'popularity', 'must_see', 'importance' and 'total' float arrays
+    """
+    rating = columns['rating']
+    reviews = np.maximum(columns['reviews_count'], 0)
+    
+    # Base score: rating × √review_count
+    # The square root prevents review count from dominating but still gives weight to popularity
+    base = profile.rating_weight * rating * np.power(reviews, profile.review_exponent)
+    popularity = _tier_bonus(reviews, profile.popularity_tiers, inclusive=False)
+    must_see = np.where(columns['must_see'], float(profile.must_see_bonus), 0.0)
+    importance = _tier_bonus(columns['importance'], profile.importance_tiers, inclusive=True)
+    
+    return {
+        'base': base,
+        'popularity': popularity,
+        'must_see': must_see,
+        'importance': importance,
+        'total': base + popularity + must_see + importance,
+    }
+
+
+def weighted_scores(pois, city_name=None, profile=DEFAULT_WEIGHT_PROFILE):
+    """
+    Weighted scores for a list of POIs as a NumPy array (aligned with pois).
+    
+    Args:
+        pois: List of POI dictionaries
+        city_name: Optional city name to check for must-see landmarks
+        profile: WeightProfile to apply
+    
+    Returns:
+        np.ndarray: float scores (higher is better)
+    """
+    return score_components(poi_score_columns(pois, city_name), profile)['total']
+
+
+def calculate_weighted_score(poi, city_name=None, profile=DEFAULT_WEIGHT_PROFILE):
     """
     Calculate a weighted score for a POI that balances rating, popularity, and importance.
     
@@ -18,80 +164,185 @@ def calculate_weighted_score(poi, city_name=None):
     - Must-see landmarks get priority regardless of rating
     - Popular attractions are favored over obscure venues
     
+    Prefer weighted_scores() / score_and_sort_pois() when scoring many POIs.
+    
     Args:
         poi: POI dictionary with 'rating', 'reviews_count', 'name' fields
         city_name: Optional city name to check for must-see landmarks
+        profile: WeightProfile to apply
         
     Returns:
         float: Weighted score (higher is better)
     """
-    # Extract values with safe defaults
-    rating = poi.get('rating', 0)
-    if rating is None:
-        rating = 0
+    return float(weighted_scores([poi], city_name, profile)[0])
+
+
+# ============================================================================
+# PER-CITY RANKING CACHE
+# ============================================================================
+
+@dataclass(frozen=True)
+class CityRanking:
+    """Cached ranking for one POI list: score breakdown plus best-first order"""
+    order: np.ndarray                     # Indices into the POI list, highest score first
+    components: Dict[str, np.ndarray]     # Output of score_components()
+    
+    @property
+    def scores(self):
+        return self.components['total']
+
+
+def dataset_version(pois):
+    """
+    Fingerprint of a POI list's scoring inputs (identity, order, scored fields
+    and must-see inputs: name, city and the landmark table).
     
-    reviews_count = poi.get('reviews_count', 0)
-    if reviews_count is None:
-        reviews_count = 0
+    Hashes every POI, so compute it once per dataset (register_dataset()) or
+    pass it to rank_pois() rather than calling it per ranking.
     
-    poi_name = poi.get('name', '')
+    Args:
+        pois: List of POI dictionaries
     
-    # Base score: rating × √review_count
-    # The square root prevents review count from dominating but still gives weight to popularity
-    base_score = rating * math.sqrt(reviews_count)
+    Returns:
+        str: Short hex digest that changes when any scoring input changes
+    """
+    digest = hashlib.blake2b(_MUST_SEE_DIGEST.encode('utf-8'), digest_size=12)
+    for poi in pois:
+        digest.update(repr((
+            poi.get('place_id'),
+            poi.get('name', ''),
+            poi_city(poi),
+            poi.get('rating'),
+            poi.get('reviews_count'),
+            poi.get('importance'),
+        )).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def register_dataset(pois):
+    """
+    Fingerprint the loaded POI dataset once (run when the dataset is loaded).
+    
+    Later rank_pois() calls without an explicit version key their cache on
+    this version plus the POIs' identities, instead of re-hashing every POI.
+    Drops the rankings cached for the previous dataset.
+    
+    Args:
+        pois: Full list of POI dictionaries
+    
+    Returns:
+        str: The dataset version
+    """
+    global _DATASET_VERSION
+    version = dataset_version(pois)
+    if version != _DATASET_VERSION:
+        _RANKING_CACHE.clear()
+        _DATASET_VERSION = version
+    return version
+
+
+def _ranking_version(pois):
+    """Cache version for a POI list drawn from the registered dataset"""
+    if _DATASET_VERSION is None:
+        return dataset_version(pois)
+    return (_DATASET_VERSION, tuple(poi.get('place_id') or poi.get('name', '') for poi in pois))
+
+
+def rank_pois(pois, city_name=None, profile=DEFAULT_WEIGHT_PROFILE, version=None):
+    """
+    Rank a city's POIs, reusing the cached ranking when nothing changed.
     
-    # Popularity bonus: Extra points for high review volumes
-    popularity_bonus = 0
-    if reviews_count > 5000:
-        popularity_bonus = 20
-    elif reviews_count > 1000:
-        popularity_bonus = 10
-    elif reviews_count > 500:
-        popularity_bonus = 5
+    Args:
+        pois: List of POI dictionaries
+        city_name: Optional city name for must-see landmark checking
+        profile: WeightProfile to apply
+        version: Version of pois if already known (dataset_version()); by
+                 default the registered dataset version plus the POIs'
+                 identities, or a full fingerprint when none is registered
+    
+    Returns:
+        CityRanking: read-only order and score arrays aligned with pois
+    """
+    if version is None:
+        version = _ranking_version(pois)
+    key = (version, city_name, profile)
+    
+    ranking = _RANKING_CACHE.get(key)
+    if ranking is not None:
+        _RANKING_CACHE.move_to_end(key)
+        return ranking
     
-    # Must-see bonus: Massive boost for iconic landmarks
-    must_see_bonus = 0
-    if city_name and is_must_see(poi_name, city_name):
-        must_see_bonus = 50  # Strong boost to ensure must-sees are always included
+    components = score_components(poi_score_columns(pois, city_name), profile)
+    # Stable sort keeps the input order between equal scores
+    order = np.argsort(-components['total'], kind='stable')
+    for arr in list(components.values()) + [order]:
+        arr.flags.writeable = False
     
-    # Importance tier bonus: Boost for high-importance categories
-    importance = poi.get('importance', 0)
-    if importance is None:
-        importance = 0
+    ranking = CityRanking(order=order, components=components)
+    _RANKING_CACHE[key] = ranking
+    if len(_RANKING_CACHE) > RANKING_CACHE_SIZE:
+        _RANKING_CACHE.popitem(last=False)
+    return ranking
+
+
+def poi_city(poi):
+    """City a POI is scored against (its city_label, else its raw city)"""
+    return poi.get('city_label', poi.get('city', ''))
+
+
+def scores_by_city(pois, profile=DEFAULT_WEIGHT_PROFILE):
+    """
+    Weighted scores for a POI list that may span several cities.
     
-    importance_bonus = 0
-    if importance >= 9:  # Top-tier attractions
-        importance_bonus = 15
-    elif importance >= 7:  # Major attractions
-        importance_bonus = 8
-    elif importance >= 5:  # Moderate attractions
-        importance_bonus = 3
+    POIs are grouped by poi_city() and each group is scored through rank_pois(),
+    so every POI gets its own city's must-see boosts and repeated calls with
+    the same candidates reuse the cached rankings.
     
-    # Calculate total score
-    total_score = base_score + popularity_bonus + must_see_bonus + importance_bonus
+    Args:
+        pois: List of POI dictionaries
+        profile: WeightProfile to apply
     
-    return total_score
+    Returns:
+        np.ndarray: float scores aligned with pois
+    """
+    groups = OrderedDict()
+    for i, poi in enumerate(pois):
+        groups.setdefault(poi_city(poi), []).append(i)
+    
+    scores = np.empty(len(pois), dtype=np.float64)
+    for city_name, indices in groups.items():
+        ranking = rank_pois([pois[i] for i in indices], city_name, profile)
+        scores[indices] = ranking.scores
+    return scores
+
 
+def clear_ranking_cache():
+    """Drop all cached city rankings (e.g. after reloading the dataset)"""
+    _RANKING_CACHE.clear()
 
-def score_and_sort_pois(pois, city_name=None):
+
+# ============================================================================
+# PUBLIC HELPERS
+# ============================================================================
+
+def score_and_sort_pois(pois, city_name=None, profile=DEFAULT_WEIGHT_PROFILE):
     """
     Score all POIs and return them sorted by weighted score (highest first).
     
     Args:
         pois: List of POI dictionaries
         city_name: Optional city name for must-see landmark checking
+        profile: WeightProfile to apply
         
     Returns:
         list: POIs sorted by weighted score, each with added 'weighted_score' field
     """
-    # Calculate scores
-    for poi in pois:
-        poi['weighted_score'] = calculate_weighted_score(poi, city_name)
+    ranking = rank_pois(pois, city_name, profile)
     
-    # Sort by score (highest first)
-    sorted_pois = sorted(pois, key=lambda x: x['weighted_score'], reverse=True)
+    for poi, score in zip(pois, ranking.scores.tolist()):
+        poi['weighted_score'] = score
     
-    return sorted_pois
+    return [pois[i] for i in ranking.order]
 
 
 def filter_low_quality_pois(pois, min_reviews=10, min_rating=3.5):
@@ -106,26 +357,12 @@ def filter_low_quality_pois(pois, min_reviews=10, min_rating=3.5):
     Returns:
         list: Filtered POIs
     """
-    filtered = []
-    
-    for poi in pois:
-        rating = poi.get('rating', 0)
-        reviews_count = poi.get('reviews_count', 0)
-        
-        # Handle None values
-        if rating is None:
-            rating = 0
-        if reviews_count is None:
-            reviews_count = 0
-        
-        # Keep POI if it meets quality thresholds
-        if rating >= min_rating and reviews_count >= min_reviews:
-            filtered.append(poi)
-    
-    return filtered
+    columns = poi_score_columns(pois)
+    keep = (columns['rating'] >= min_rating) & (columns['reviews_count'] >= min_reviews)
+    return [poi for poi, ok in zip(pois, keep) if ok]
 
 
-def get_top_pois_by_score(pois, city_name=None, top_n=10, min_reviews=10):
+def get_top_pois_by_score(pois, city_name=None, top_n=10, min_reviews=10, profile=DEFAULT_WEIGHT_PROFILE):
     """
     Get the top N POIs by weighted score, filtering out low-quality venues.
     
@@ -134,6 +371,7 @@ def get_top_pois_by_score(pois, city_name=None, top_n=10, min_reviews=10):
         city_name: Optional city name for must-see landmark checking
         top_n: Number of top POIs to return
         min_reviews: Minimum review count threshold
+        profile: WeightProfile to apply
         
     Returns:
         list: Top N POIs sorted by weighted score
@@ -142,13 +380,13 @@ def get_top_pois_by_score(pois, city_name=None, top_n=10, min_reviews=10):
     quality_pois = filter_low_quality_pois(pois, min_reviews=min_reviews)
     
     # Score and sort
-    scored_pois = score_and_sort_pois(quality_pois, city_name)
+    scored_pois = score_and_sort_pois(quality_pois, city_name, profile)
     
     # Return top N
     return scored_pois[:top_n]
 
 
-def explain_score(poi, city_name=None):
+def explain_score(poi, city_name=None, profile=DEFAULT_WEIGHT_PROFILE):
     """
     Generate a human-readable explanation of a POI's weighted score.
     Useful for debugging and understanding why certain POIs are prioritized.
@@ -156,32 +394,28 @@ def explain_score(poi, city_name=None):
     Args:
         poi: POI dictionary
         city_name: Optional city name
+        profile: WeightProfile to apply
         
     Returns:
         str: Explanation of the score breakdown
     """
-    score = calculate_weighted_score(poi, city_name)
-    rating = poi.get('rating', 0) or 0
-    reviews = poi.get('reviews_count', 0) or 0
-    importance = poi.get('importance', 0) or 0
+    columns = poi_score_columns([poi], city_name)
+    parts = {k: float(v[0]) for k, v in score_components(columns, profile).items()}
+    rating = columns['rating'][0]
+    reviews = int(columns['reviews_count'][0])
+    importance = columns['importance'][0]
     name = poi.get('name', 'Unknown')
     
-    base = rating * math.sqrt(reviews)
-    
-    explanation = f"{name}: {score:.1f} points\n"
-    explanation += f"  Base (rating × √reviews): {rating} × √{reviews} = {base:.1f}\n"
+    explanation = f"{name}: {parts['total']:.1f} points\n"
+    explanation += f"  Base (rating × reviews^{profile.review_exponent:g}): {rating:g} × {reviews}^{profile.review_exponent:g} = {parts['base']:.1f}\n"
     
-    if reviews > 5000:
-        explanation += f"  Popularity bonus: +20 (>{reviews} reviews)\n"
-    elif reviews > 1000:
-        explanation += f"  Popularity bonus: +10 (>{reviews} reviews)\n"
+    if parts['popularity']:
+        explanation += f"  Popularity bonus: +{parts['popularity']:g} ({reviews} reviews)\n"
     
-    if city_name and is_must_see(name, city_name):
-        explanation += f"  Must-see bonus: +50 (iconic landmark)\n"
+    if parts['must_see']:
+        explanation += f"  Must-see bonus: +{parts['must_see']:g} (iconic landmark)\n"
     
-    if importance >= 9:
-        explanation += f"  Importance bonus: +15 (tier {importance})\n"
-    elif importance >= 7:
-        explanation += f"  Importance bonus: +8 (tier {importance})\n"
+    if parts['importance']:
+        explanation += f"  Importance bonus: +{parts['importance']:g} (tier {importance:g})\n"
     
     return explanation
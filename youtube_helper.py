@@ -229,7 +229,7 @@ def add_hyperlink(paragraph, url, text):
     return hyperlink
 
 
-def add_youtube_section_to_doc(doc, city_name, add_hyperlink_func=None):
+def add_youtube_section_to_doc(doc, city_name, add_hyperlink_func=None, video=None):
     """
     Add a YouTube video section for a city to the document
     
@@ -237,16 +237,18 @@ def add_youtube_section_to_doc(doc, city_name, add_hyperlink_func=None):
         doc: python-docx Document object
         city_name: Name of the city
         add_hyperlink_func: Optional function to add hyperlinks (from document_generator)
+        video: Video dict already looked up (e.g. from the document model); looked up if None
     
     Returns:
         True if video was added, False otherwise
     """
-    videos = get_video_for_city(city_name, max_videos=1)
-    
-    if not videos:
-        return False
-    
-    video = videos[0]
+    if video is None:
+        videos = get_video_for_city(city_name, max_videos=1)
+        
+        if not videos:
+            return False
+        
+        video = videos[0]
     
     # Use provided hyperlink function or our local one
     hyperlink_fn = add_hyperlink_func or add_hyperlink